@@ -0,0 +1,33 @@
+"""add vacancy token index
+
+Revision ID: 0007_add_vacancy_token_index
+Revises: 0006_add_saved_filters
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_add_vacancy_token_index"
+down_revision = "0006_add_saved_filters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vacancy_tokens",
+        sa.Column("token", sa.String(length=255), nullable=False),
+        sa.Column("vacancy_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(["vacancy_id"], ["vacancies.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("token", "vacancy_id"),
+    )
+    op.create_index("ix_vacancy_tokens_vacancy_id", "vacancy_tokens", ["vacancy_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vacancy_tokens_vacancy_id", table_name="vacancy_tokens")
+    op.drop_table("vacancy_tokens")
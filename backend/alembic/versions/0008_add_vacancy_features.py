@@ -0,0 +1,36 @@
+"""add vacancy feature store
+
+Revision ID: 0008_add_vacancy_features
+Revises: 0007_add_vacancy_token_index
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_add_vacancy_features"
+down_revision = "0007_add_vacancy_token_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vacancy_features",
+        sa.Column("vacancy_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("tokens", sa.JSON(), nullable=False),
+        sa.Column("title_tokens", sa.JSON(), nullable=False),
+        sa.Column("title_normalized", sa.Text(), nullable=False, server_default=""),
+        sa.Column("language_levels", sa.JSON(), nullable=False),
+        sa.Column("seniority", sa.String(length=20), nullable=True),
+        sa.Column("location_normalized", sa.Text(), nullable=False, server_default=""),
+        sa.ForeignKeyConstraint(["vacancy_id"], ["vacancies.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("vacancy_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("vacancy_features")
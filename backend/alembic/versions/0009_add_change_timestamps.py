@@ -0,0 +1,39 @@
+"""add vacancy and profile change timestamps
+
+Revision ID: 0009_add_change_timestamps
+Revises: 0008_add_vacancy_features
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_add_change_timestamps"
+down_revision = "0008_add_vacancy_features"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "vacancies",
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.add_column(
+        "vacancies",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index("ix_vacancies_updated_at", "vacancies", ["updated_at"])
+    op.add_column(
+        "profiles",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("profiles", "updated_at")
+    op.drop_index("ix_vacancies_updated_at", table_name="vacancies")
+    op.drop_column("vacancies", "updated_at")
+    op.drop_column("vacancies", "created_at")
@@ -0,0 +1,37 @@
+"""add profile version and corpus generation
+
+Revision ID: 0010_add_matching_versions
+Revises: 0009_add_change_timestamps
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_add_matching_versions"
+down_revision = "0009_add_change_timestamps"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("profiles", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("users", sa.Column("matched_profile_version", sa.Integer(), nullable=True))
+    op.add_column("users", sa.Column("matched_corpus_generation", sa.Integer(), nullable=True))
+    op.create_table(
+        "corpus_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("generation", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO corpus_state (id, generation) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table("corpus_state")
+    op.drop_column("users", "matched_corpus_generation")
+    op.drop_column("users", "matched_profile_version")
+    op.drop_column("profiles", "version")
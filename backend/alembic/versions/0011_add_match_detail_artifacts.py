@@ -0,0 +1,26 @@
+"""store match detail artifacts
+
+Revision ID: 0011_add_match_detail_artifacts
+Revises: 0010_add_matching_versions
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_add_match_detail_artifacts"
+down_revision = "0010_add_matching_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("matches", sa.Column("tokens", sa.JSON(), nullable=True))
+    op.add_column("matches", sa.Column("skill_gap_plan", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("matches", "skill_gap_plan")
+    op.drop_column("matches", "tokens")
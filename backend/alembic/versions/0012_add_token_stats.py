@@ -0,0 +1,45 @@
+"""add vacancy token document frequencies
+
+Revision ID: 0012_add_token_stats
+Revises: 0011_add_match_detail_artifacts
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0012_add_token_stats"
+down_revision = "0011_add_match_detail_artifacts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vacancy_token_stats",
+        sa.Column("token", sa.String(length=255), nullable=False),
+        sa.Column("document_frequency", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("snapshot_frequency", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("token"),
+    )
+    op.add_column("corpus_state", sa.Column("document_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("corpus_state", sa.Column("stats_version", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column(
+        "corpus_state", sa.Column("stats_document_count", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column("users", sa.Column("matched_stats_version", sa.Integer(), nullable=True))
+    op.execute(
+        "INSERT INTO vacancy_token_stats (token, document_frequency, snapshot_frequency) "
+        "SELECT token, COUNT(*), 0 FROM vacancy_tokens GROUP BY token"
+    )
+    op.execute("UPDATE corpus_state SET document_count = (SELECT COUNT(*) FROM vacancy_features)")
+
+
+def downgrade() -> None:
+    op.drop_column("users", "matched_stats_version")
+    op.drop_column("corpus_state", "stats_document_count")
+    op.drop_column("corpus_state", "stats_version")
+    op.drop_column("corpus_state", "document_count")
+    op.drop_table("vacancy_token_stats")
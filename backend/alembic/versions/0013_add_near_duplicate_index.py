@@ -0,0 +1,47 @@
+"""add near-duplicate vacancy index
+
+Revision ID: 0013_add_near_duplicate_index
+Revises: 0012_add_token_stats
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0013_add_near_duplicate_index"
+down_revision = "0012_add_token_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("vacancies", sa.Column("canonical_id", postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key("fk_vacancies_canonical_id", "vacancies", "vacancies", ["canonical_id"], ["id"])
+    op.create_index("ix_vacancies_canonical_id", "vacancies", ["canonical_id"])
+    op.create_table(
+        "vacancy_signatures",
+        sa.Column("vacancy_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("signature", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(["vacancy_id"], ["vacancies.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("vacancy_id"),
+    )
+    op.create_table(
+        "vacancy_lsh_buckets",
+        sa.Column("bucket", sa.String(length=24), nullable=False),
+        sa.Column("vacancy_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(["vacancy_id"], ["vacancies.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("bucket", "vacancy_id"),
+    )
+    op.create_index("ix_vacancy_lsh_buckets_vacancy_id", "vacancy_lsh_buckets", ["vacancy_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vacancy_lsh_buckets_vacancy_id", table_name="vacancy_lsh_buckets")
+    op.drop_table("vacancy_lsh_buckets")
+    op.drop_table("vacancy_signatures")
+    op.drop_index("ix_vacancies_canonical_id", table_name="vacancies")
+    op.drop_constraint("fk_vacancies_canonical_id", "vacancies", type_="foreignkey")
+    op.drop_column("vacancies", "canonical_id")
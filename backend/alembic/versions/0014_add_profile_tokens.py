@@ -0,0 +1,35 @@
+"""add profile token reverse index
+
+Revision ID: 0014_add_profile_tokens
+Revises: 0013_add_near_duplicate_index
+Create Date: 2026-10-16 00:00:00.000000
+
+Existing profiles are backfilled with ``python -m app.utils.reindex_profiles``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0014_add_profile_tokens"
+down_revision = "0013_add_near_duplicate_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "profile_tokens",
+        sa.Column("token", sa.String(length=255), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("token", "user_id"),
+    )
+    op.create_index("ix_profile_tokens_user_id", "profile_tokens", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_profile_tokens_user_id", table_name="profile_tokens")
+    op.drop_table("profile_tokens")
@@ -0,0 +1,41 @@
+"""add match prefilter indexes and active saved filters
+
+Revision ID: 0015_add_match_prefilter_indexes
+Revises: 0014_add_profile_tokens
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0015_add_match_prefilter_indexes"
+down_revision = "0014_add_profile_tokens"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "saved_filters",
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+    )
+    op.create_index("ix_saved_filters_user_id_is_active", "saved_filters", ["user_id", "is_active"])
+    op.create_index("ix_vacancies_remote", "vacancies", ["remote"])
+    op.create_index("ix_vacancies_salary_min", "vacancies", ["salary_min"])
+    op.create_index("ix_vacancies_salary_max", "vacancies", ["salary_max"])
+    if op.get_bind().dialect.name == "postgresql":
+        # Saved filters match locations with ILIKE '%...%', which only a trigram index can serve.
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_vacancies_location_trgm ON vacancies USING gin (location gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_vacancies_location_trgm")
+    op.drop_index("ix_vacancies_salary_max", table_name="vacancies")
+    op.drop_index("ix_vacancies_salary_min", table_name="vacancies")
+    op.drop_index("ix_vacancies_remote", table_name="vacancies")
+    op.drop_index("ix_saved_filters_user_id_is_active", table_name="saved_filters")
+    op.drop_column("saved_filters", "is_active")
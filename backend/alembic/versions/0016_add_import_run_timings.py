@@ -0,0 +1,26 @@
+"""add fetch and total timings to vacancy import runs
+
+Revision ID: 0016_add_import_run_timings
+Revises: 0015_add_match_prefilter_indexes
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0016_add_import_run_timings"
+down_revision = "0015_add_match_prefilter_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("vacancy_import_runs", sa.Column("fetch_seconds", sa.Float(), nullable=True))
+    op.add_column("vacancy_import_runs", sa.Column("duration_seconds", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("vacancy_import_runs", "duration_seconds")
+    op.drop_column("vacancy_import_runs", "fetch_seconds")
@@ -0,0 +1,28 @@
+"""add conditional fetch validators to vacancy sources
+
+Revision ID: 0017_add_source_validators
+Revises: 0016_add_import_run_timings
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0017_add_source_validators"
+down_revision = "0016_add_import_run_timings"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("vacancy_sources", sa.Column("etag", sa.String(length=512), nullable=True))
+    op.add_column("vacancy_sources", sa.Column("last_modified", sa.String(length=255), nullable=True))
+    op.add_column("vacancy_sources", sa.Column("content_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("vacancy_sources", "content_hash")
+    op.drop_column("vacancy_sources", "last_modified")
+    op.drop_column("vacancy_sources", "etag")
@@ -0,0 +1,23 @@
+"""add composite vacancy source/external id index for ingestion dedup
+
+Revision ID: 0018_add_vacancy_dedup_index
+Revises: 0017_add_source_validators
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0018_add_vacancy_dedup_index"
+down_revision = "0017_add_source_validators"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_vacancies_source_id_external_id", "vacancies", ["source_id", "external_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vacancies_source_id_external_id", table_name="vacancies")
@@ -0,0 +1,30 @@
+"""add vacancy content hashes and unchanged import counts
+
+Revision ID: 0019_add_vacancy_content_hash
+Revises: 0018_add_vacancy_dedup_index
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0019_add_vacancy_content_hash"
+down_revision = "0018_add_vacancy_dedup_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows have no hash yet; ingestion rewrites each of them once, the next time it is seen.
+    op.add_column("vacancies", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.add_column(
+        "vacancy_import_runs",
+        sa.Column("unchanged_count", sa.Float(), nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("vacancy_import_runs", "unchanged_count")
+    op.drop_column("vacancies", "content_hash")
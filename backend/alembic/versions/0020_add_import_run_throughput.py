@@ -0,0 +1,24 @@
+"""add parse throughput to vacancy import runs
+
+Revision ID: 0020_add_import_run_throughput
+Revises: 0019_add_vacancy_content_hash
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0020_add_import_run_throughput"
+down_revision = "0019_add_vacancy_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("vacancy_import_runs", sa.Column("rows_per_second", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("vacancy_import_runs", "rows_per_second")
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 import boto3
 from botocore.client import Config
 from redis import Redis
-from rq import Queue, Worker
+from rq import Queue, Retry, Worker
 from sqlalchemy import func, text
 from sqlalchemy.orm import Session
 
@@ -23,7 +23,10 @@ from app.schemas.schemas import (
     VacancySourceOut,
 )
 from app.services.ingestion import ingest_source
+from app.services.job_stats import load_job_stats
+from app.services.match_preview import preview_cache
 from app.services.storage import _use_local_storage
+from app.workers import tasks
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 settings = get_settings()
@@ -136,9 +139,27 @@ def metrics(_admin: User = Depends(require_admin)):
     return AdminMetricsOut(
         queue_size=queue.count,
         last_scheduler_run_at=datetime.fromisoformat(last_run.decode()) if last_run else None,
+        match_recompute=load_job_stats(redis_conn, "match_recompute"),
+        match_new_vacancies=load_job_stats(redis_conn, "match_new_vacancies"),
+        match_preview=preview_cache.stats(),
+        vacancy_ingestion=load_job_stats(redis_conn, "vacancy_ingestion"),
     )
 
 
+@router.post("/matching/recompute")
+def recompute_matches(
+    full: bool = Query(default=False),
+    _admin: User = Depends(require_admin),
+):
+    redis_conn = Redis.from_url(settings.redis_url)
+    Queue("default", connection=redis_conn).enqueue(
+        tasks.coordinate_match_recompute,
+        force_full=full,
+        retry=Retry(max=3, interval=[30, 60, 120]),
+    )
+    return {"status": "queued", "full": full}
+
+
 @router.get("/vacancy-sources", response_model=list[VacancySourceOut])
 def list_vacancy_sources(
     db: Session = Depends(get_db), _admin: User = Depends(require_admin)
@@ -169,7 +190,11 @@ def update_vacancy_source(
     source = db.query(VacancySourceConfig).filter(VacancySourceConfig.id == source_id).first()
     if not source:
         raise HTTPException(status_code=404, detail="Source not found")
-    for field, value in payload.dict().items():
+    data = payload.dict()
+    if any(getattr(source, field) != data[field] for field in ("type", "url", "config")):
+        # Parsing changed, so the next run must not be skipped as unchanged.
+        source.etag = source.last_modified = source.content_hash = None
+    for field, value in data.items():
         setattr(source, field, value)
     db.commit()
     db.refresh(source)
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends
+import time
+
+from fastapi import APIRouter, Depends, Query
 from redis import Redis
 from rq import Queue, Retry
 from sqlalchemy.orm import Session
@@ -6,7 +8,10 @@ from sqlalchemy.orm import Session
 from app.core.config import get_settings
 from app.core.database import get_db
 from app.core.deps import get_current_user
-from app.models.models import User
+from app.models.models import Profile, User
+from app.schemas.schemas import MatchPreviewOut
+from app.services.match_preview import preview_cache, top_matches
+from app.services.vacancy_index import active_filters
 from app.workers import tasks
 
 router = APIRouter(prefix="/matching", tags=["matching"])
@@ -24,3 +29,30 @@ def run_matching(
         retry=Retry(max=3, interval=[10, 30, 60]),
     )
     return {"status": "queued"}
+
+
+@router.get("/preview", response_model=list[MatchPreviewOut])
+def preview_matches(
+    limit: int = Query(default=10, ge=1, le=tasks.MATCH_LIMIT),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    started = time.perf_counter()
+    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
+    filters = active_filters(db, [current_user.id]).get(current_user.id, [])
+    matches, records = top_matches(db, profile, limit, filters)
+    items = [
+        MatchPreviewOut(
+            vacancy_id=match.vacancy_id,
+            score=match.score,
+            explanation=match.explanation,
+            missing_skills=match.missing_skills,
+            matched_skills=match.matched_skills,
+            reasons=match.reasons,
+            vacancy_title=records[match.vacancy_id].title,
+            vacancy_company=records[match.vacancy_id].company,
+        )
+        for match in sorted(matches, key=lambda m: m.score, reverse=True)
+    ]
+    preview_cache.record_latency(time.perf_counter() - started)
+    return items
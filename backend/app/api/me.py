@@ -49,14 +49,17 @@ from app.schemas.schemas import (
     ProfileOut,
     SavedFilterCreate,
     SavedFilterOut,
+    SavedFilterUpdate,
     ReminderCreate,
     ReminderOut,
     ReminderUpdate,
     ShareLinkResponse,
     StatsOut,
 )
+from app.services.match_daemon import PROFILES, publish_deltas
 from app.services.matching import build_match_detail
 from app.services.pdf import render_package_pdf
+from app.services.profile_index import index_profile
 from app.services.storage import download_file_content, generate_download_url, upload_file
 from app.workers import tasks
 
@@ -87,9 +90,15 @@ def update_profile(
     if not profile:
         profile = Profile(user_id=current_user.id)
         db.add(profile)
-    for field, value in payload.dict(exclude_unset=True).items():
+    updates = payload.dict(exclude_unset=True)
+    if profile.version is None or any(getattr(profile, field) != value for field, value in updates.items()):
+        profile.version = (profile.version or 0) + 1
+    for field, value in updates.items():
         setattr(profile, field, value)
+    db.flush()
+    index_profile(db, profile)
     db.commit()
+    publish_deltas(PROFILES, [current_user.id])
     db.refresh(profile)
     return profile
 
@@ -243,11 +252,17 @@ def get_match_detail(
     )
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
-    vacancy = db.query(Vacancy).filter(Vacancy.id == match.vacancy_id).first()
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    if not vacancy:
-        raise HTTPException(status_code=404, detail="Vacancy not found")
-    tokens, skill_gap_plan = build_match_detail(profile, vacancy, match)
+    tokens, skill_gap_plan = match.tokens, match.skill_gap_plan
+    if tokens is None or skill_gap_plan is None:
+        # Matches stored before detail artifacts were persisted: build once and keep.
+        vacancy = db.query(Vacancy).filter(Vacancy.id == match.vacancy_id).first()
+        profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
+        if not vacancy:
+            raise HTTPException(status_code=404, detail="Vacancy not found")
+        tokens, skill_gap_plan = build_match_detail(profile, vacancy, match)
+        match.tokens = tokens
+        match.skill_gap_plan = skill_gap_plan
+        db.commit()
     return MatchDetailOut(
         id=match.id,
         vacancy_id=match.vacancy_id,
@@ -418,13 +433,45 @@ def create_saved_filter(
         remote=payload.remote,
         salary_min=payload.salary_min,
         role_keywords=payload.role_keywords,
+        is_active=payload.is_active,
     )
     db.add(saved)
+    if saved.is_active:
+        _invalidate_matches(db, current_user.id)
+    db.commit()
+    db.refresh(saved)
+    return saved
+
+
+@router.patch("/filters/{filter_id}", response_model=SavedFilterOut)
+def update_saved_filter(
+    filter_id: str,
+    payload: SavedFilterUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    saved = (
+        db.query(SavedFilter)
+        .filter(SavedFilter.id == filter_id, SavedFilter.user_id == current_user.id)
+        .first()
+    )
+    if not saved:
+        raise HTTPException(status_code=404, detail="Filter not found")
+    if saved.is_active != payload.is_active:
+        saved.is_active = payload.is_active
+        _invalidate_matches(db, current_user.id)
     db.commit()
     db.refresh(saved)
     return saved
 
 
+def _invalidate_matches(db: Session, user_id) -> None:
+    # Active filters narrow the candidates matching scores, so the next run must start from scratch.
+    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    if profile:
+        profile.version = (profile.version or 0) + 1
+
+
 @router.get("/notifications", response_model=list[NotificationOut])
 def list_notifications(
     db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
@@ -9,6 +9,9 @@ from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.models.models import Vacancy, VacancySource
 from app.schemas.schemas import PaginatedVacanciesOut, VacancyOut
+from app.services.ingestion import enqueue_reverse_matching
+from app.services.match_daemon import VACANCIES, publish_deltas
+from app.services.vacancy_index import index_vacancies
 
 router = APIRouter(prefix="/vacancies", tags=["vacancies"])
 
@@ -43,7 +46,11 @@ def import_csv(
         )
         db.add(vacancy)
         created.append(vacancy)
+    change = index_vacancies(db, created)
     db.commit()
+    if change is not None:
+        publish_deltas(VACANCIES, change.vacancy_ids, generation=change.generation)
+    enqueue_reverse_matching([vacancy.id for vacancy in created])
     for vacancy in created:
         db.refresh(vacancy)
     return created
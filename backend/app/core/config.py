@@ -18,6 +18,13 @@ class Settings(BaseSettings):
     cors_allow_origins: str = "http://localhost:3000"
     public_rate_limit_per_minute: int = 60
     public_base_url: str = "http://localhost:8000"
+    matching_workers: int = 1
+    matching_chunk_size: int = 500
+    matching_daemon_enabled: bool = False
+    matching_daemon_timeout_seconds: float = 30.0
+    ingestion_concurrency: int = 8
+    ingestion_host_concurrency: int = 2
+    ingestion_commit_rows: int = 5000
 
     class Config:
         env_file = ".env"
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.core.config import get_settings
 
@@ -17,3 +18,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def dialect_insert(db: Session):
+    """``insert`` of the session's backend, which supports ``on_conflict_do_update``."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
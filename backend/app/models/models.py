@@ -8,6 +8,8 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
+    Integer,
     String,
     Text,
     UniqueConstraint,
@@ -76,6 +78,9 @@ class User(Base):
     is_admin = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     last_matching_run_at = Column(DateTime(timezone=True), nullable=True)
+    matched_profile_version = Column(Integer, nullable=True)
+    matched_corpus_generation = Column(Integer, nullable=True)
+    matched_stats_version = Column(Integer, nullable=True)
 
     profile = relationship("Profile", back_populates="user", uselist=False)
     documents = relationship("Document", back_populates="user")
@@ -99,6 +104,8 @@ class Profile(Base):
     languages = Column(JSON, nullable=True)
     salary_min = Column(Float, nullable=True)
     salary_max = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
 
     user = relationship("User", back_populates="profile")
 
@@ -120,6 +127,7 @@ class Document(Base):
 
 class Vacancy(Base):
     __tablename__ = "vacancies"
+    __table_args__ = (Index("ix_vacancies_source_id_external_id", "source_id", "external_id"),)
 
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     source_id = Column(GUID(), ForeignKey("vacancy_sources.id"), nullable=True)
@@ -127,18 +135,95 @@ class Vacancy(Base):
     title = Column(String(255), nullable=False)
     company = Column(String(255), nullable=True)
     location = Column(String(255), nullable=True)
-    remote = Column(Boolean, default=False)
-    salary_min = Column(Float, nullable=True)
-    salary_max = Column(Float, nullable=True)
+    remote = Column(Boolean, default=False, index=True)
+    salary_min = Column(Float, nullable=True, index=True)
+    salary_max = Column(Float, nullable=True, index=True)
     currency = Column(String(10), nullable=True)
     description = Column(Text, nullable=True)
     source = Column(Enum(VacancySource), nullable=False, default=VacancySource.manual)
     url = Column(String(512), nullable=True)
+    # Hash of the normalized fields ingestion writes, so re-seen entries that did not change are skipped.
+    content_hash = Column(String(64), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True
+    )
+    # Set when this row is a near-duplicate of another vacancy; matching scores canonical rows only.
+    canonical_id = Column(GUID(), ForeignKey("vacancies.id"), nullable=True, index=True)
 
     source_config = relationship("VacancySourceConfig", back_populates="vacancies")
     matches = relationship("Match", back_populates="vacancy")
     generated_packages = relationship("GeneratedPackage", back_populates="vacancy")
     applications = relationship("Application", back_populates="vacancy")
+    features = relationship("VacancyFeature", back_populates="vacancy", uselist=False)
+
+
+class VacancyFeature(Base):
+    __tablename__ = "vacancy_features"
+
+    vacancy_id = Column(GUID(), ForeignKey("vacancies.id", ondelete="CASCADE"), primary_key=True)
+    tokens = Column(JSON, nullable=False)
+    title_tokens = Column(JSON, nullable=False)
+    title_normalized = Column(Text, nullable=False, default="")
+    language_levels = Column(JSON, nullable=False)
+    seniority = Column(String(20), nullable=True)
+    location_normalized = Column(Text, nullable=False, default="")
+
+    vacancy = relationship("Vacancy", back_populates="features")
+
+
+class CorpusState(Base):
+    __tablename__ = "corpus_state"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    document_count = Column(Integer, nullable=False, default=0)
+    stats_version = Column(Integer, nullable=False, default=0)
+    stats_document_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class VacancyToken(Base):
+    __tablename__ = "vacancy_tokens"
+    __table_args__ = (Index("ix_vacancy_tokens_vacancy_id", "vacancy_id"),)
+
+    token = Column(String(255), primary_key=True)
+    vacancy_id = Column(GUID(), ForeignKey("vacancies.id", ondelete="CASCADE"), primary_key=True)
+
+
+class ProfileToken(Base):
+    """Reverse index entry: a user whose profile contains ``token``."""
+
+    __tablename__ = "profile_tokens"
+    __table_args__ = (Index("ix_profile_tokens_user_id", "user_id"),)
+
+    token = Column(String(255), primary_key=True)
+    user_id = Column(GUID(), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+
+class VacancySignature(Base):
+    __tablename__ = "vacancy_signatures"
+
+    vacancy_id = Column(GUID(), ForeignKey("vacancies.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(JSON, nullable=False)
+
+
+class VacancyLshBucket(Base):
+    __tablename__ = "vacancy_lsh_buckets"
+    __table_args__ = (Index("ix_vacancy_lsh_buckets_vacancy_id", "vacancy_id"),)
+
+    bucket = Column(String(24), primary_key=True)
+    vacancy_id = Column(GUID(), ForeignKey("vacancies.id", ondelete="CASCADE"), primary_key=True)
+
+
+class VacancyTokenStat(Base):
+    """Live ``document_frequency`` of a token and the ``snapshot_frequency`` published for scoring."""
+
+    __tablename__ = "vacancy_token_stats"
+
+    token = Column(String(255), primary_key=True)
+    document_frequency = Column(Integer, nullable=False, default=0)
+    snapshot_frequency = Column(Integer, nullable=False, default=0)
 
 
 class Match(Base):
@@ -153,6 +238,8 @@ class Match(Base):
     missing_skills = Column(JSON, nullable=True)
     matched_skills = Column(JSON, nullable=True)
     reasons = Column(JSON, nullable=True)
+    tokens = Column(JSON, nullable=True)
+    skill_gap_plan = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="matches")
@@ -204,6 +291,9 @@ class VacancySourceConfig(Base):
     url = Column(String(1024), nullable=True)
     config = Column(JSON, nullable=True)
     is_enabled = Column(Boolean, nullable=False, default=True)
+    etag = Column(String(512), nullable=True)
+    last_modified = Column(String(255), nullable=True)
+    content_hash = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     vacancies = relationship("Vacancy", back_populates="source_config")
@@ -219,6 +309,10 @@ class VacancyImportRun(Base):
     finished_at = Column(DateTime(timezone=True), nullable=True)
     inserted_count = Column(Float, nullable=False, default=0)
     updated_count = Column(Float, nullable=False, default=0)
+    unchanged_count = Column(Float, nullable=False, default=0)
+    fetch_seconds = Column(Float, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    rows_per_second = Column(Float, nullable=True)
     status = Column(String(50), nullable=False, default="running")
     error = Column(Text, nullable=True)
 
@@ -243,6 +337,7 @@ class Reminder(Base):
 
 class SavedFilter(Base):
     __tablename__ = "saved_filters"
+    __table_args__ = (Index("ix_saved_filters_user_id_is_active", "user_id", "is_active"),)
 
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
@@ -251,6 +346,8 @@ class SavedFilter(Base):
     remote = Column(Boolean, nullable=True)
     salary_min = Column(Float, nullable=True)
     role_keywords = Column(JSON, nullable=True)
+    # Active filters restrict which vacancies matching considers for the user.
+    is_active = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="saved_filters")
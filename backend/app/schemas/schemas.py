@@ -109,6 +109,17 @@ class MatchOut(BaseModel):
         orm_mode = True
 
 
+class MatchPreviewOut(BaseModel):
+    vacancy_id: uuid.UUID
+    score: float
+    explanation: Optional[str] = None
+    missing_skills: Optional[List[str]] = None
+    matched_skills: Optional[List[str]] = None
+    reasons: Optional[List[str]] = None
+    vacancy_title: Optional[str] = None
+    vacancy_company: Optional[str] = None
+
+
 class MatchDetailOut(MatchOut):
     tokens: Optional[List[str]] = None
     skill_gap_plan: Optional[List[Dict[str, str]]] = None
@@ -242,6 +253,10 @@ class AdminHealthOut(BaseModel):
 class AdminMetricsOut(BaseModel):
     queue_size: int
     last_scheduler_run_at: Optional[datetime] = None
+    match_recompute: Optional[Dict[str, Any]] = None
+    match_new_vacancies: Optional[Dict[str, Any]] = None
+    match_preview: Optional[Dict[str, Any]] = None
+    vacancy_ingestion: Optional[Dict[str, Any]] = None
 
 
 class VacancySourceIn(BaseModel):
@@ -267,6 +282,10 @@ class VacancyImportRunOut(BaseModel):
     finished_at: Optional[datetime] = None
     inserted_count: float
     updated_count: float
+    unchanged_count: float = 0
+    fetch_seconds: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    rows_per_second: Optional[float] = None
     status: str
     error: Optional[str] = None
 
@@ -280,6 +299,11 @@ class SavedFilterCreate(BaseModel):
     remote: Optional[bool] = None
     salary_min: Optional[float] = None
     role_keywords: Optional[List[str]] = None
+    is_active: bool = False
+
+
+class SavedFilterUpdate(BaseModel):
+    is_active: bool
 
 
 class SavedFilterOut(SavedFilterCreate):
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterator, Mapping
+
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models.models import CorpusState, VacancyTokenStat
+from app.services.matching import TokenWeights
+
+CORPUS_STATE_ID = 1
+# Publish new statistics once the corpus grew or shrank by this fraction since
+# the published snapshot. Every publish forces a full rescore of every user, so
+# weights only move when they would move noticeably.
+STATS_REFRESH_DRIFT = 0.1
+TOKEN_BATCH_SIZE = 1000
+
+
+def update_corpus_state(db: Session, values: dict) -> None:
+    """Apply ``values`` to the corpus state row, creating the row first if missing."""
+    query = db.query(CorpusState).filter(CorpusState.id == CORPUS_STATE_ID)
+    if not query.update(values, synchronize_session=False):
+        db.add(CorpusState(id=CORPUS_STATE_ID, generation=0, document_count=0, stats_version=0, stats_document_count=0))
+        db.flush()
+        query.update(values, synchronize_session=False)
+
+
+def apply_token_deltas(db: Session, deltas: Counter, documents: int) -> None:
+    """Add token frequency and document count changes; the published snapshot is untouched."""
+    deltas = {token: delta for token, delta in deltas.items() if delta}
+    if deltas:
+        insert = dialect_insert(db)
+        statement = insert(VacancyTokenStat.__table__)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[VacancyTokenStat.token],
+                set_={
+                    "document_frequency": VacancyTokenStat.document_frequency
+                    + statement.excluded.document_frequency
+                },
+            ),
+            [
+                {"token": token, "document_frequency": delta, "snapshot_frequency": 0}
+                for token, delta in sorted(deltas.items())
+            ],
+        )
+    if documents:
+        update_corpus_state(db, {CorpusState.document_count: CorpusState.document_count + documents})
+
+
+def _locked_token_batches(db: Session) -> Iterator[list[str]]:
+    # Lock stats rows in token order, like the index writers, so a whole-table pass cannot deadlock with them.
+    last = None
+    while True:
+        query = db.query(VacancyTokenStat.token).order_by(VacancyTokenStat.token)
+        if last is not None:
+            query = query.filter(VacancyTokenStat.token > last)
+        tokens = [token for (token,) in query.limit(TOKEN_BATCH_SIZE).with_for_update()]
+        if not tokens:
+            return
+        yield tokens
+        last = tokens[-1]
+
+
+def reset_token_stats(db: Session) -> None:
+    """Zero the live frequencies before the whole index is rebuilt."""
+    for tokens in _locked_token_batches(db):
+        db.query(VacancyTokenStat).filter(VacancyTokenStat.token.in_(tokens)).update(
+            {VacancyTokenStat.document_frequency: 0}, synchronize_session=False
+        )
+    update_corpus_state(db, {CorpusState.document_count: 0})
+
+
+def publish_token_stats(db: Session) -> int:
+    """Copy the live frequencies into the scoring snapshot under a new version."""
+    for tokens in _locked_token_batches(db):
+        batch = db.query(VacancyTokenStat).filter(VacancyTokenStat.token.in_(tokens))
+        batch.update(
+            {VacancyTokenStat.snapshot_frequency: VacancyTokenStat.document_frequency}, synchronize_session=False
+        )
+        batch.filter(VacancyTokenStat.snapshot_frequency == 0).delete(synchronize_session=False)
+    update_corpus_state(
+        db,
+        {
+            CorpusState.stats_version: CorpusState.stats_version + 1,
+            CorpusState.stats_document_count: CorpusState.document_count,
+        },
+    )
+    return db.query(CorpusState.stats_version).filter(CorpusState.id == CORPUS_STATE_ID).scalar()
+
+
+def stats_drifted(document_count: int, published_count: int, drift: float = STATS_REFRESH_DRIFT) -> bool:
+    if not published_count:
+        return document_count > 0
+    return abs(document_count - published_count) > drift * published_count
+
+
+def refresh_token_stats(db: Session, drift: float = STATS_REFRESH_DRIFT) -> bool:
+    """Publish new statistics if the corpus drifted; commits. Returns whether it published."""
+    state = db.query(CorpusState.document_count, CorpusState.stats_document_count).filter(
+        CorpusState.id == CORPUS_STATE_ID
+    ).first()
+    if state is None or not stats_drifted(state.document_count, state.stats_document_count, drift):
+        return False
+    publish_token_stats(db)
+    db.commit()
+    return True
+
+
+def _published_state(db: Session) -> tuple[int, int]:
+    state = db.query(CorpusState.stats_version, CorpusState.stats_document_count).filter(
+        CorpusState.id == CORPUS_STATE_ID
+    ).first()
+    return (state.stats_version, state.stats_document_count) if state else (0, 0)
+
+
+def current_stats_version(db: Session) -> int:
+    return _published_state(db)[0]
+
+
+def load_token_weights(db: Session) -> TokenWeights:
+    """Published token weights, re-read until they all belong to one ``stats_version``."""
+    while True:
+        version, document_count = _published_state(db)
+        frequencies: Mapping[str, int] = dict(
+            db.query(VacancyTokenStat.token, VacancyTokenStat.snapshot_frequency).filter(
+                VacancyTokenStat.snapshot_frequency > 0
+            )
+        )
+        if _published_state(db)[0] == version:
+            return TokenWeights(version=version, document_count=document_count, frequencies=frequencies)
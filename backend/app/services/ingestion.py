@@ -1,18 +1,66 @@
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+from collections import Counter
+import csv
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 import hashlib
+import io
 import logging
-from typing import Any
+from tempfile import SpooledTemporaryFile
+import time
+from typing import Any, Callable, Iterable, Iterator
 
 import feedparser
 import httpx
 from bs4 import BeautifulSoup
+from redis import Redis
+from redis.exceptions import RedisError
+from rq import Queue, Retry
 from sqlalchemy.orm import Session
 
+from app.core.config import get_settings
+from app.core.database import SessionLocal
 from app.models.models import Vacancy, VacancyImportRun, VacancySource, VacancySourceConfig, VacancySourceType
+from app.services.job_stats import record_job_stats
+from app.services.match_daemon import VACANCIES, publish_deltas
+from app.services.vacancy_index import index_vacancies
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FETCH_TIMEOUT_SECONDS = 30
+DEDUP_BATCH_SIZE = 1000
+# Bodies up to this size stay in memory while they are parsed; larger ones spill to disk.
+SPOOL_MAX_BYTES = 8 * 2**20
+CONTENT_FIELDS = ("title", "company", "location", "description", "url")
+MISSING_URL = {
+    VacancySourceType.rss: "RSS source URL missing",
+    VacancySourceType.html: "HTML source URL missing",
+    VacancySourceType.csv_url: "CSV URL missing",
+}
+# Run status of a source whose feed is unchanged since its last successful run.
+SKIPPED = "skipped"
+# Enqueued by path: services do not import the worker modules.
+MATCH_NEW_VACANCIES = "app.workers.tasks.match_new_vacancies"
+
+
+@dataclass
+class Fetched:
+    """Outcome of downloading a source, handed from the fetch stage to the DB stage."""
+
+    started_at: datetime
+    clock: float
+    fetch_seconds: float = 0.0
+    response: httpx.Response | None = None
+    error: Exception | None = None
+    body: SpooledTemporaryFile = field(default_factory=lambda: SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES))
+    content_hash: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.response is not None and self.response.status_code == httpx.codes.NOT_MODIFIED
 
 
 def _normalize_key(*parts: str | None) -> str:
@@ -36,100 +84,368 @@ def _get_attr(element, selector: str | None, attr: str | None) -> str | None:
     return found.get(attr)
 
 
-def _ensure_run(db: Session, source: VacancySourceConfig) -> VacancyImportRun:
-    run = VacancyImportRun(source_id=source.id, status="running")
+def _ensure_run(db: Session, source: VacancySourceConfig, fetched: Fetched) -> VacancyImportRun:
+    run = VacancyImportRun(
+        source_id=source.id, status="running", started_at=fetched.started_at, fetch_seconds=fetched.fetch_seconds
+    )
     db.add(run)
     db.commit()
     db.refresh(run)
     return run
 
 
-def _finalize_run(db: Session, run: VacancyImportRun, status: str, error: str | None = None) -> None:
-    run.finished_at = datetime.utcnow()
+def _finalize_run(
+    db: Session, run: VacancyImportRun, fetched: Fetched, status: str, error: str | None = None
+) -> None:
+    run.finished_at = datetime.now(timezone.utc)
+    run.duration_seconds = round(time.perf_counter() - fetched.clock, 3)
     run.status = status
     run.error = error
     db.commit()
 
 
-def _dedup_lookup(db: Session, source: VacancySourceConfig, external_id: str | None, title: str, location: str | None, url: str | None, company: str | None) -> Vacancy | None:
-    if external_id:
-        return (
-            db.query(Vacancy)
-            .filter(Vacancy.source_id == source.id, Vacancy.external_id == external_id)
-            .first()
+def enqueue_reverse_matching(vacancy_ids: list) -> None:
+    """Queue pushing committed new vacancies into the matches of overlapping users."""
+    if not vacancy_ids:
+        return
+    try:
+        Queue("default", connection=Redis.from_url(settings.redis_url)).enqueue(
+            MATCH_NEW_VACANCIES,
+            [str(vacancy_id) for vacancy_id in vacancy_ids],
+            retry=Retry(max=3, interval=[10, 30, 60]),
         )
-    normalized = _normalize_key(company, title, location or "", url or "")
-    return db.query(Vacancy).filter(Vacancy.external_id == normalized).first()
+    except RedisError:
+        # The next match recompute still picks the vacancies up.
+        logger.warning("Could not enqueue reverse matching for %d vacancies", len(vacancy_ids))
 
 
-def ingest_source(db: Session, source: VacancySourceConfig) -> VacancyImportRun:
-    run = _ensure_run(db, source)
-    inserted = 0
-    updated = 0
+def _start_fetch(source: VacancySourceConfig) -> Fetched:
+    fetched = Fetched(started_at=datetime.now(timezone.utc), clock=time.perf_counter())
+    if source.type not in MISSING_URL:
+        fetched.error = ValueError("Unsupported source type")
+    elif not source.url:
+        fetched.error = ValueError(MISSING_URL[source.type])
+    return fetched
+
+
+def _conditional_headers(source: VacancySourceConfig) -> dict[str, str]:
+    headers = {}
+    if source.etag:
+        headers["If-None-Match"] = source.etag
+    if source.last_modified:
+        headers["If-Modified-Since"] = source.last_modified
+    return headers
+
+
+def _raise_for_status(fetched: Fetched) -> None:
+    if not fetched.not_modified:
+        fetched.response.raise_for_status()
+
+
+def _spool(fetched: Fetched, chunk: bytes, digest) -> None:
+    fetched.body.write(chunk)
+    digest.update(chunk)
+
+
+def _fetch(client: httpx.Client, source: VacancySourceConfig) -> Fetched:
+    fetched = _start_fetch(source)
+    if fetched.error is None:
+        digest = hashlib.sha256()
+        try:
+            with client.stream("GET", source.url, headers=_conditional_headers(source)) as response:
+                fetched.response = response
+                _raise_for_status(fetched)
+                for chunk in response.iter_bytes():
+                    _spool(fetched, chunk, digest)
+            fetched.content_hash = digest.hexdigest()
+            fetched.body.seek(0)
+        except httpx.HTTPError as exc:
+            fetched.error = exc
+    fetched.fetch_seconds = round(time.perf_counter() - fetched.clock, 3)
+    return fetched
+
+
+async def _fetch_async(
+    client: httpx.AsyncClient,
+    source: VacancySourceConfig,
+    host_slots: dict[str, asyncio.Semaphore],
+    slots: asyncio.Semaphore,
+) -> Fetched:
+    fetched = _start_fetch(source)
+    if fetched.error is None:
+        host = httpx.URL(source.url).host
+        host_slot = host_slots.setdefault(host, asyncio.Semaphore(max(1, settings.ingestion_host_concurrency)))
+        digest = hashlib.sha256()
+        try:
+            # Host first, so sources queued behind a busy host do not hold a global slot.
+            async with host_slot, slots:
+                # Waiting for a slot is queue time, not fetch time.
+                fetched.started_at, fetched.clock = datetime.now(timezone.utc), time.perf_counter()
+                async with client.stream("GET", source.url, headers=_conditional_headers(source)) as response:
+                    fetched.response = response
+                    _raise_for_status(fetched)
+                    async for chunk in response.aiter_bytes():
+                        _spool(fetched, chunk, digest)
+            fetched.content_hash = digest.hexdigest()
+            fetched.body.seek(0)
+        except httpx.HTTPError as exc:
+            fetched.error = exc
+    fetched.fetch_seconds = round(time.perf_counter() - fetched.clock, 3)
+    return fetched
+
+
+def _remember_validators(source: VacancySourceConfig, response: httpx.Response, content_hash: str) -> None:
+    source.etag = response.headers.get("ETag")
+    source.last_modified = response.headers.get("Last-Modified")
+    source.content_hash = content_hash
+
+
+def _store(db: Session, source: VacancySourceConfig, fetched: Fetched) -> VacancyImportRun:
+    """Parse and write a fetched source; a 304 or an unchanged body is recorded as ``skipped``."""
+    run = _ensure_run(db, source, fetched)
     try:
-        if source.type == VacancySourceType.rss:
-            inserted, updated = _ingest_rss(db, source)
-        elif source.type == VacancySourceType.html:
-            inserted, updated = _ingest_html(db, source)
-        elif source.type == VacancySourceType.csv_url:
-            inserted, updated = _ingest_csv_url(db, source)
-        else:
-            raise ValueError("Unsupported source type")
+        if fetched.error is not None:
+            raise fetched.error
+        if fetched.not_modified or fetched.content_hash == source.content_hash:
+            if not fetched.not_modified:
+                # Same body under new validators: keep them so the next fetch can be answered with a 304.
+                _remember_validators(source, fetched.response, fetched.content_hash)
+            _finalize_run(db, run, fetched, SKIPPED)
+            return run
+        started = time.perf_counter()
+        inserted, updated, unchanged = PARSERS[source.type](db, source, fetched)
         run.inserted_count = inserted
         run.updated_count = updated
-        _finalize_run(db, run, "success")
+        run.unchanged_count = unchanged
+        run.rows_per_second = round((inserted + updated + unchanged) / (time.perf_counter() - started), 1)
+        _remember_validators(source, fetched.response, fetched.content_hash)
+        _finalize_run(db, run, fetched, "success")
     except Exception as exc:  # noqa: BLE001
         logger.exception("Vacancy ingestion failed for %s", source.id)
-        _finalize_run(db, run, "failed", str(exc))
+        db.rollback()
+        _finalize_run(db, run, fetched, "failed", str(exc))
+    finally:
+        fetched.body.close()
     return run
 
 
-def _ingest_rss(db: Session, source: VacancySourceConfig) -> tuple[int, int]:
-    if not source.url:
-        raise ValueError("RSS source URL missing")
-    feed = feedparser.parse(source.url)
-    inserted = 0
-    updated = 0
-    for entry in feed.entries:
-        title = entry.get("title", "Untitled")
-        url = entry.get("link")
-        external_id = entry.get("id") or url
-        description = entry.get("summary") or entry.get("description")
-        company = entry.get("author")
-        location = entry.get("location")
-        vacancy = _dedup_lookup(db, source, external_id, title, location, url, company)
-        if vacancy:
-            vacancy.title = title
-            vacancy.url = url
-            vacancy.description = description
-            vacancy.company = company
-            vacancy.location = location
-            updated += 1
+def ingest_source(db: Session, source: VacancySourceConfig) -> VacancyImportRun:
+    with httpx.Client(timeout=FETCH_TIMEOUT_SECONDS, follow_redirects=True) as client:
+        fetched = _fetch(client, source)
+    return _store(db, source, fetched)
+
+
+def _store_in_session(source_id, fetched: Fetched) -> dict[str, Any]:
+    db: Session = SessionLocal()
+    try:
+        source = db.query(VacancySourceConfig).filter(VacancySourceConfig.id == source_id).one()
+        run = _store(db, source, fetched)
+        return {
+            "source_id": str(source_id),
+            "status": run.status,
+            "unchanged_count": run.unchanged_count,
+            "rows_per_second": run.rows_per_second,
+            "fetch_seconds": run.fetch_seconds,
+            "duration_seconds": run.duration_seconds,
+        }
+    finally:
+        fetched.body.close()
+        db.close()
+
+
+def _failed_result(source: VacancySourceConfig, exc: BaseException) -> dict[str, Any]:
+    logger.error("Vacancy ingestion failed for %s", source.id, exc_info=exc)
+    return {
+        "source_id": str(source.id),
+        "status": "failed",
+        "error": str(exc),
+        "unchanged_count": None,
+        "rows_per_second": None,
+        "fetch_seconds": None,
+        "duration_seconds": None,
+    }
+
+
+async def _ingest_concurrently(sources: list[VacancySourceConfig]) -> list[dict[str, Any]]:
+    concurrency = max(1, settings.ingestion_concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    writers = asyncio.Semaphore(concurrency)
+    host_slots: dict[str, asyncio.Semaphore] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=FETCH_TIMEOUT_SECONDS, follow_redirects=True, limits=limits) as client:
+
+        async def ingest(source: VacancySourceConfig) -> dict[str, Any]:
+            fetched = await _fetch_async(client, source, host_slots, slots)
+            # One DB session per source being written, at most as many as fetches.
+            async with writers:
+                return await asyncio.to_thread(_store_in_session, source.id, fetched)
+
+        results = await asyncio.gather(*(ingest(source) for source in sources), return_exceptions=True)
+    return [
+        _failed_result(source, result) if isinstance(result, BaseException) else result
+        for source, result in zip(sources, results)
+    ]
+
+
+def ingest_enabled_sources() -> list[dict[str, Any]]:
+    """Fetch every enabled source concurrently and store each in its own thread; returns per-source timings."""
+    started = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        sources = db.query(VacancySourceConfig).filter(VacancySourceConfig.is_enabled.is_(True)).all()
+        db.expunge_all()
+    finally:
+        db.close()
+    results = asyncio.run(_ingest_concurrently(sources)) if sources else []
+    record_job_stats(
+        "vacancy_ingestion",
+        {
+            "sources": len(sources),
+            "failed": sum(1 for result in results if result["status"] == "failed"),
+            "skipped": sum(1 for result in results if result["status"] == SKIPPED),
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "fetch_seconds": round(sum(result["fetch_seconds"] or 0.0 for result in results), 3),
+            "source_seconds": round(sum(result["duration_seconds"] or 0.0 for result in results), 3),
+            "concurrency": settings.ingestion_concurrency,
+            "runs": results,
+        },
+    )
+    return results
+
+
+def _entry_key(entry: dict[str, Any]) -> str:
+    if entry["external_id"]:
+        return entry["external_id"]
+    return _normalize_key(entry["company"], entry["title"], entry["location"] or "", entry["url"] or "")
+
+
+def _content_hash(entry: dict[str, Any]) -> str:
+    """Hash of the normalized vacancy fields an entry writes; equal hashes mean a no-op update."""
+    fields = (entry[field] for field in CONTENT_FIELDS)
+    combined = "\x1f".join(" ".join(value.split()) if value else "" for value in fields)
+    return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+
+
+def _apply_batch(
+    db: Session,
+    source: VacancySourceConfig,
+    kind: VacancySource,
+    batch: list[dict[str, Any]],
+    seen: dict[str, Vacancy],
+    inserted: list[Vacancy],
+    updated: list[Vacancy],
+    unchanged: list[Vacancy],
+) -> None:
+    keys = {_entry_key(entry) for entry in batch} - seen.keys()
+    if keys:
+        # One round trip per batch, served by ix_vacancies_source_id_external_id.
+        seen.update(
+            (vacancy.external_id, vacancy)
+            for vacancy in db.query(Vacancy).filter(Vacancy.source_id == source.id, Vacancy.external_id.in_(keys))
+        )
+    new: list[Vacancy] = []
+    for entry in batch:
+        key = _entry_key(entry)
+        content_hash = _content_hash(entry)
+        vacancy = seen.get(key)
+        if vacancy is not None and vacancy.content_hash == content_hash:
+            # Leave the row alone so updated_at keeps meaning "changed since".
+            unchanged.append(vacancy)
+        elif vacancy is not None:
+            vacancy.title = entry["title"]
+            vacancy.url = entry["url"]
+            vacancy.description = entry["description"]
+            vacancy.company = entry["company"]
+            vacancy.location = entry["location"]
+            vacancy.content_hash = content_hash
+            updated.append(vacancy)
         else:
-            if not external_id:
-                external_id = _normalize_key(company, title, location or "", url or "")
             vacancy = Vacancy(
                 source_id=source.id,
-                external_id=external_id,
-                title=title,
-                company=company,
-                location=location,
-                description=description,
-                url=url,
-                source=VacancySource.rss,
+                external_id=key,
+                title=entry["title"],
+                company=entry["company"],
+                location=entry["location"],
+                description=entry["description"],
+                url=entry["url"],
+                content_hash=content_hash,
+                source=kind,
             )
-            db.add(vacancy)
-            inserted += 1
+            seen[key] = vacancy
+            new.append(vacancy)
+    db.add_all(new)
+    inserted.extend(new)
+
+
+def _commit_chunk(
+    db: Session,
+    source: VacancySourceConfig,
+    inserted: list[Vacancy],
+    updated: list[Vacancy],
+    unchanged: list[Vacancy],
+    totals: Counter,
+) -> None:
+    # An entry seen twice in one chunk touches the row it inserted or changed; count it once.
+    new_ids = {id(vacancy) for vacancy in inserted}
+    updated = list({id(vacancy): vacancy for vacancy in updated if id(vacancy) not in new_ids}.values())
+    touched_ids = new_ids | {id(vacancy) for vacancy in updated}
+    unchanged_count = len({id(vacancy) for vacancy in unchanged} - touched_ids)
+    change = index_vacancies(db, inserted + updated)
+    inserted_ids = [vacancy.id for vacancy in inserted]
+    updated_ids = [vacancy.id for vacancy in updated]
     db.commit()
-    return inserted, updated
+    enqueue_reverse_matching(inserted_ids)
+    if change is not None:
+        # Also carries rows that near-duplicate linking made canonical or not.
+        publish_deltas(VACANCIES, change.vacancy_ids, generation=change.generation)
+    totals.update(inserted=len(inserted_ids), updated=len(updated_ids), unchanged=unchanged_count)
 
 
-def _ingest_html(db: Session, source: VacancySourceConfig) -> tuple[int, int]:
-    if not source.url:
-        raise ValueError("HTML source URL missing")
-    response = httpx.get(source.url, timeout=30, follow_redirects=True)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+def _ingest_entries(
+    db: Session, source: VacancySourceConfig, kind: VacancySource, entries: Iterable[dict[str, Any]]
+) -> tuple[int, int, int]:
+    """Upsert parsed ``entries``, committing every ``INGESTION_COMMIT_ROWS``; returns (inserted, updated, unchanged)."""
+    commit_rows = max(DEDUP_BATCH_SIZE, settings.ingestion_commit_rows)
+    totals: Counter = Counter()
+    seen: dict[str, Vacancy] = {}
+    inserted: list[Vacancy] = []
+    updated: list[Vacancy] = []
+    unchanged: list[Vacancy] = []
+    batch: list[dict[str, Any]] = []
+    pending = 0
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) < DEDUP_BATCH_SIZE:
+            continue
+        _apply_batch(db, source, kind, batch, seen, inserted, updated, unchanged)
+        pending += len(batch)
+        batch = []
+        if pending >= commit_rows:
+            _commit_chunk(db, source, inserted, updated, unchanged, totals)
+            seen, inserted, updated, unchanged, pending = {}, [], [], [], 0
+    if batch:
+        _apply_batch(db, source, kind, batch, seen, inserted, updated, unchanged)
+    _commit_chunk(db, source, inserted, updated, unchanged, totals)
+    return totals["inserted"], totals["updated"], totals["unchanged"]
+
+
+def _rss_entries(source: VacancySourceConfig, fetched: Fetched) -> Iterator[dict[str, Any]]:
+    feed = feedparser.parse(fetched.body, response_headers=dict(fetched.response.headers))
+    for entry in feed.entries:
+        url = entry.get("link")
+        yield {
+            "external_id": entry.get("id") or url,
+            "title": entry.get("title", "Untitled"),
+            "company": entry.get("author"),
+            "location": entry.get("location"),
+            "description": entry.get("summary") or entry.get("description"),
+            "url": url,
+        }
+
+
+def _html_entries(source: VacancySourceConfig, fetched: Fetched) -> Iterator[dict[str, Any]]:
+    soup = BeautifulSoup(fetched.body.read(), "html.parser", from_encoding=fetched.response.charset_encoding)
     config: dict[str, Any] = source.config or {}
     list_selector = config.get("list_selector", "article")
     title_selector = config.get("title_selector", "h2")
@@ -138,86 +454,57 @@ def _ingest_html(db: Session, source: VacancySourceConfig) -> tuple[int, int]:
     url_selector = config.get("url_selector", "a")
     description_selector = config.get("description_selector")
     external_id_attr = config.get("external_id_attr")
-    items = soup.select(list_selector)
-    inserted = 0
-    updated = 0
-    for item in items:
-        title = _get_text(item, title_selector) or "Untitled"
-        location = _get_text(item, location_selector)
-        company = _get_text(item, company_selector)
-        url = _get_attr(item, url_selector, "href") or source.url
-        description = _get_text(item, description_selector)
-        external_id = None
-        if external_id_attr:
-            external_id = item.get(external_id_attr)
-        vacancy = _dedup_lookup(db, source, external_id, title, location, url, company)
-        if vacancy:
-            vacancy.title = title
-            vacancy.url = url
-            vacancy.description = description
-            vacancy.company = company
-            vacancy.location = location
-            updated += 1
-        else:
-            if not external_id:
-                external_id = _normalize_key(company, title, location or "", url or "")
-            vacancy = Vacancy(
-                source_id=source.id,
-                external_id=external_id,
-                title=title,
-                company=company,
-                location=location,
-                description=description,
-                url=url,
-                source=VacancySource.html,
-            )
-            db.add(vacancy)
-            inserted += 1
-    db.commit()
-    return inserted, updated
-
-
-def _ingest_csv_url(db: Session, source: VacancySourceConfig) -> tuple[int, int]:
-    if not source.url:
-        raise ValueError("CSV URL missing")
-    response = httpx.get(source.url, timeout=30, follow_redirects=True)
-    response.raise_for_status()
-    lines = response.text.splitlines()
-    if not lines:
-        return 0, 0
-    headers = [h.strip().lower() for h in lines[0].split(",")]
-    inserted = 0
-    updated = 0
-    for line in lines[1:]:
-        values = [v.strip() for v in line.split(",")]
-        data = dict(zip(headers, values, strict=False))
-        title = data.get("title") or "Untitled"
-        url = data.get("url")
-        location = data.get("location")
-        company = data.get("company")
-        external_id = data.get("external_id") or url
-        vacancy = _dedup_lookup(db, source, external_id, title, location, url, company)
-        if vacancy:
-            vacancy.title = title
-            vacancy.url = url
-            vacancy.description = data.get("description")
-            vacancy.company = company
-            vacancy.location = location
-            updated += 1
-        else:
-            if not external_id:
-                external_id = _normalize_key(company, title, location or "", url or "")
-            vacancy = Vacancy(
-                source_id=source.id,
-                external_id=external_id,
-                title=title,
-                company=company,
-                location=location,
-                description=data.get("description"),
-                url=url,
-                source=VacancySource.csv_url,
-            )
-            db.add(vacancy)
-            inserted += 1
-    db.commit()
-    return inserted, updated
+    for item in soup.select(list_selector):
+        yield {
+            "external_id": item.get(external_id_attr) if external_id_attr else None,
+            "title": _get_text(item, title_selector) or "Untitled",
+            "company": _get_text(item, company_selector),
+            "location": _get_text(item, location_selector),
+            "description": _get_text(item, description_selector),
+            "url": _get_attr(item, url_selector, "href") or source.url,
+        }
+
+
+def _csv_entries(source: VacancySourceConfig, fetched: Fetched) -> Iterator[dict[str, Any]]:
+    """Yield the rows of a CSV body one at a time, with quoted and multi-line fields."""
+    text = io.TextIOWrapper(
+        fetched.body, encoding=fetched.response.charset_encoding or "utf-8-sig", errors="replace", newline=""
+    )
+    try:
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            return
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        for data in reader:
+            data = {key: value.strip() for key, value in data.items() if key and value}
+            url = data.get("url")
+            yield {
+                "external_id": data.get("external_id") or url,
+                "title": data.get("title") or "Untitled",
+                "company": data.get("company"),
+                "location": data.get("location"),
+                "description": data.get("description"),
+                "url": url,
+            }
+    finally:
+        # The body belongs to the fetch; collecting the wrapper must not close it.
+        text.detach()
+
+
+def _ingest_rss(db: Session, source: VacancySourceConfig, fetched: Fetched) -> tuple[int, int, int]:
+    return _ingest_entries(db, source, VacancySource.rss, _rss_entries(source, fetched))
+
+
+def _ingest_html(db: Session, source: VacancySourceConfig, fetched: Fetched) -> tuple[int, int, int]:
+    return _ingest_entries(db, source, VacancySource.html, _html_entries(source, fetched))
+
+
+def _ingest_csv_url(db: Session, source: VacancySourceConfig, fetched: Fetched) -> tuple[int, int, int]:
+    return _ingest_entries(db, source, VacancySource.csv_url, _csv_entries(source, fetched))
+
+
+PARSERS: dict[VacancySourceType, Callable[[Session, VacancySourceConfig, Fetched], tuple[int, int, int]]] = {
+    VacancySourceType.rss: _ingest_rss,
+    VacancySourceType.html: _ingest_html,
+    VacancySourceType.csv_url: _ingest_csv_url,
+}
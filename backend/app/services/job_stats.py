@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _key(name: str) -> str:
+    return f"jobs:stats:{name}"
+
+
+def record_job_stats(name: str, stats: dict[str, Any]) -> None:
+    """Publish the latest stats of a background job for the admin metrics endpoint."""
+    logger.info("Job %s stats: %s", name, stats)
+    try:
+        Redis.from_url(settings.redis_url).set(_key(name), json.dumps(stats, default=str))
+    except RedisError:
+        logger.warning("Could not record stats for job %s", name)
+
+
+def load_job_stats(redis_conn: Redis, name: str) -> dict[str, Any] | None:
+    raw = redis_conn.get(_key(name))
+    return json.loads(raw) if raw else None
@@ -0,0 +1,105 @@
+"""Redis protocol of the resident matching daemon (``app/workers/matching_daemon.py``).
+
+A no-op unless ``MATCHING_DAEMON_ENABLED`` is set; failures return None so callers score in-process.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+import logging
+import time
+from typing import Any, Collection, Hashable, Iterable, Sequence
+import uuid
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DELTA_STREAM = "matching:deltas"
+DELTA_STREAM_MAXLEN = 100_000
+REQUEST_QUEUE = "matching:requests"
+REPLY_TTL_SECONDS = 60
+HEARTBEAT_KEY = "matching:daemon:last_heartbeat"
+# Three missed heartbeats of the daemon (published every 10 seconds).
+HEARTBEAT_MAX_AGE_SECONDS = 30
+
+VACANCIES = "vacancies"
+PROFILES = "profiles"
+
+
+def reply_key(request_id: str) -> str:
+    return f"matching:replies:{request_id}"
+
+
+def publish_deltas(
+    kind: str, ids: Iterable, redis_conn: Redis | None = None, generation: int | None = None
+) -> None:
+    """Tell the daemon that the rows ``ids`` of ``kind`` changed at ``generation``; call after commit."""
+    ids = [str(item) for item in ids]
+    if not settings.matching_daemon_enabled or not ids:
+        return
+    fields = {"kind": kind, "ids": json.dumps(ids)}
+    if generation is not None:
+        fields["generation"] = str(generation)
+    try:
+        redis_conn = redis_conn or Redis.from_url(settings.redis_url)
+        redis_conn.xadd(DELTA_STREAM, fields, maxlen=DELTA_STREAM_MAXLEN, approximate=True)
+    except RedisError:
+        # The daemon reloads once a request shows it missed this generation.
+        logger.warning("Could not publish %d %s deltas to the matching daemon", len(ids), kind)
+
+
+def _daemon_alive(redis_conn: Redis) -> bool:
+    heartbeat = redis_conn.get(HEARTBEAT_KEY)
+    if heartbeat is None:
+        return False
+    beat = datetime.fromisoformat(heartbeat.decode() if isinstance(heartbeat, bytes) else heartbeat)
+    return (datetime.now(timezone.utc) - beat).total_seconds() <= HEARTBEAT_MAX_AGE_SECONDS
+
+
+def request_rankings(
+    users: Sequence[tuple[Hashable, int]],
+    limit: int,
+    stats_version: int,
+    generation: int,
+    redis_conn: Redis | None = None,
+    prefiltered: Collection = (),
+) -> dict[str, list[tuple[str, float]]] | None:
+    """Top ``limit`` (vacancy id, score) pairs per (user id, profile version), or None to score in-process."""
+    if not settings.matching_daemon_enabled or not users:
+        return None
+    request_id = uuid.uuid4().hex
+    timeout = settings.matching_daemon_timeout_seconds
+    request: dict[str, Any] = {
+        "id": request_id,
+        "users": [[str(user_id), version] for user_id, version in users],
+        "limit": limit,
+        "stats_version": stats_version,
+        "generation": generation,
+        # Users ranked only among the vacancies passing their active saved filters.
+        "prefiltered": [str(user_id) for user_id in prefiltered],
+        "deadline": time.time() + timeout,
+    }
+    try:
+        redis_conn = redis_conn or Redis.from_url(settings.redis_url)
+        if not _daemon_alive(redis_conn):
+            logger.warning("Matching daemon has no fresh heartbeat; scoring in-process")
+            return None
+        redis_conn.rpush(REQUEST_QUEUE, json.dumps(request))
+        reply = redis_conn.blpop([reply_key(request_id)], timeout=max(1, int(timeout)))
+    except RedisError:
+        logger.warning("Matching daemon unreachable; scoring in-process")
+        return None
+    if reply is None:
+        logger.warning("Matching daemon did not answer within %ss; scoring in-process", timeout)
+        return None
+    payload = json.loads(reply[1])
+    if payload is None:
+        logger.warning("Matching daemon could not rank the request; scoring in-process")
+        return None
+    return {user_id: [(vacancy_id, score) for vacancy_id, score in ranked] for user_id, ranked in payload.items()}
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Collection, Hashable, Mapping, NamedTuple, Sequence
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.models.models import Vacancy
+from app.services.matching import ProfileFeatures, VacancyFeatures, VacancyRecord, stored_vacancy_features
+from app.services.vacancy_index import stream_vacancies, vacancy_records
+
+# Upper bound on the dense users x vacancies block scored at once (~32 MB of float64).
+MAX_BLOCK_CELLS = 4_000_000
+CORPUS_BATCH_SIZE = 2000
+
+
+class CorpusVacancy(NamedTuple):
+    id: Any
+    remote: bool | None
+    salary_max: float | None
+
+
+class ScoringCorpus(NamedTuple):
+    """Read-only scoring view of the vacancy table, detached from any session."""
+
+    vacancies: list[CorpusVacancy]
+    features: list[VacancyFeatures]
+
+
+def load_corpus(db: Session) -> ScoringCorpus:
+    vacancies: list[CorpusVacancy] = []
+    features: list[VacancyFeatures] = []
+    for vacancy in stream_vacancies(vacancy_records(db).order_by(Vacancy.id), CORPUS_BATCH_SIZE):
+        vacancies.append(CorpusVacancy(vacancy.id, vacancy.remote, vacancy.salary_max))
+        features.append(stored_vacancy_features(vacancy))
+    return ScoringCorpus(vacancies, features)
+
+
+class VacancyColumns(NamedTuple):
+    """Per-vacancy bonus inputs of ``score_features`` as NumPy columns."""
+
+    remote: np.ndarray
+    salary_max: np.ndarray
+    language: np.ndarray
+    seniority: np.ndarray
+    location_ids: np.ndarray
+
+
+def vacancy_columns(
+    vacancies: Sequence[Vacancy | VacancyRecord | CorpusVacancy],
+    features: Sequence[VacancyFeatures],
+    location_id: Callable[[str], int],
+) -> VacancyColumns:
+    return VacancyColumns(
+        remote=np.array([8.0 if vacancy.remote else 0.0 for vacancy in vacancies]),
+        salary_max=np.array([vacancy.salary_max or 0.0 for vacancy in vacancies], dtype=np.float64),
+        language=np.array([8.0 if feature.language_levels else 4.0 for feature in features]),
+        seniority=np.array([6.0 if feature.seniority else 0.0 for feature in features]),
+        location_ids=np.array([location_id(feature.location) for feature in features], dtype=np.int64),
+    )
+
+
+def score_block(
+    overlap: np.ndarray,
+    aligned: np.ndarray,
+    salary_min: np.ndarray,
+    has_languages: np.ndarray,
+    user_locations: np.ndarray,
+    columns: VacancyColumns,
+) -> np.ndarray:
+    """Scores of a users x vacancies block; pairs outside the salary floor score -inf."""
+    scores = np.minimum(40.0, overlap * 4.0)
+    scores += np.where(aligned, 30.0, 0.0)
+    scores += columns.remote
+    scores += np.where(
+        (salary_min != 0) & (columns.salary_max != 0) & (columns.salary_max >= salary_min), 12.0, 0.0
+    )
+    scores += np.where(has_languages, columns.language, 0.0)
+    both = (user_locations >= 0) & (columns.location_ids >= 0)
+    scores += np.where(both, np.where(user_locations == columns.location_ids, 10.0, 2.0), 0.0)
+    scores += columns.seniority
+    below_floor = (salary_min != 0) & (columns.salary_max != 0) & (columns.salary_max < salary_min)
+    return np.where(below_floor, -np.inf, scores)
+
+
+class BatchMatcher:
+    """Vectorized ``score_features`` for many profiles, keeping the running top ``limit`` of each."""
+
+    def __init__(
+        self,
+        profiles: Sequence[tuple[Hashable, ProfileFeatures]],
+        limit: int = 50,
+        candidates: Mapping[Hashable, Collection] | None = None,
+    ):
+        self.keys = [key for key, _ in profiles]
+        self.limit = limit
+        # Profiles restricted to a set of vacancy ids, e.g. by active saved filters.
+        self._candidates = [(row, candidates[key]) for row, key in enumerate(self.keys) if key in (candidates or {})]
+        features = [feature for _, feature in profiles]
+        user_count = len(features)
+
+        self._vocabulary: dict[str, int] = {}
+        self._roles: dict[str, int] = {}
+        token_rows, token_cols, token_weights, role_rows, role_cols = [], [], [], [], []
+        for row, feature in enumerate(features):
+            for token in feature.tokens:
+                token_rows.append(row)
+                token_cols.append(self._vocabulary.setdefault(token, len(self._vocabulary)))
+                token_weights.append(feature.token_weights.get(token, 1.0))
+            for role in feature.roles:
+                role_rows.append(row)
+                role_cols.append(self._roles.setdefault(role, len(self._roles)))
+        self._profile_tokens = sparse.csr_matrix(
+            (np.array(token_weights, dtype=np.float32), (token_rows, token_cols)),
+            shape=(user_count, len(self._vocabulary)),
+        )
+        self._profile_roles = sparse.csr_matrix(
+            (np.ones(len(role_rows), dtype=np.float32), (role_rows, role_cols)),
+            shape=(user_count, len(self._roles)),
+        )
+        self._role_list = list(self._roles)
+        self._salary_min = np.array([feature.salary_min or 0.0 for feature in features], dtype=np.float64)
+        self._has_languages = np.array([feature.has_languages for feature in features])
+        self._locations: dict[str, int] = {}
+        self._location_ids = np.array(
+            [self._location_id(feature.location) for feature in features], dtype=np.int64
+        )
+
+        self._vacancy_ids: list = []
+        self._best_scores = np.full((user_count, limit), -np.inf)
+        self._best_positions = np.full((user_count, limit), -1, dtype=np.int64)
+
+    def _location_id(self, location: str) -> int:
+        if not location:
+            return -1
+        return self._locations.setdefault(location, len(self._locations))
+
+    def feed(
+        self,
+        vacancies: Sequence[Vacancy | VacancyRecord | CorpusVacancy],
+        features: Sequence[VacancyFeatures] | None = None,
+    ) -> None:
+        if not vacancies or not self.keys:
+            return
+        if features is None:
+            features = [stored_vacancy_features(vacancy) for vacancy in vacancies]
+        offset = len(self._vacancy_ids)
+        self._vacancy_ids.extend(vacancy.id for vacancy in vacancies)
+        batch = len(vacancies)
+
+        token_rows, token_cols = [], []
+        role_rows, role_cols = [], []
+        for column, feature in enumerate(features):
+            for token in feature.tokens:
+                index = self._vocabulary.get(token)
+                if index is not None:
+                    token_rows.append(index)
+                    token_cols.append(column)
+            for index, role in enumerate(self._role_list):
+                if role in feature.title:
+                    role_rows.append(index)
+                    role_cols.append(column)
+        vacancy_tokens = sparse.csr_matrix(
+            (np.ones(len(token_rows), dtype=np.float32), (token_rows, token_cols)),
+            shape=(len(self._vocabulary), batch),
+        )
+        role_hits = sparse.csr_matrix(
+            (np.ones(len(role_rows), dtype=np.float32), (role_rows, role_cols)),
+            shape=(len(self._role_list), batch),
+        )
+
+        columns = vacancy_columns(vacancies, features, self._location_id)
+        positions = np.arange(offset, offset + batch, dtype=np.int64)
+        excluded = {
+            row: np.fromiter((vacancy.id not in allowed for vacancy in vacancies), dtype=bool, count=batch)
+            for row, allowed in self._candidates
+        }
+
+        chunk = max(1, MAX_BLOCK_CELLS // batch)
+        for start in range(0, len(self.keys), chunk):
+            rows = slice(start, start + chunk)
+            scores = score_block(
+                (self._profile_tokens[rows] @ vacancy_tokens).toarray(),
+                (self._profile_roles[rows] @ role_hits).toarray() > 0,
+                self._salary_min[rows, None],
+                self._has_languages[rows, None],
+                self._location_ids[rows, None],
+                columns,
+            )
+            for row, mask in excluded.items():
+                if start <= row < start + chunk:
+                    scores[row - start, mask] = -np.inf
+            self._merge(rows, scores, positions)
+
+    def _merge(self, rows: slice, scores: np.ndarray, positions: np.ndarray) -> None:
+        combined_scores = np.hstack([self._best_scores[rows], scores])
+        combined_positions = np.hstack(
+            [self._best_positions[rows], np.broadcast_to(positions, scores.shape)]
+        )
+        keep = np.argpartition(-combined_scores, self.limit - 1, axis=1)[:, : self.limit]
+        self._best_scores[rows] = np.take_along_axis(combined_scores, keep, axis=1)
+        self._best_positions[rows] = np.take_along_axis(combined_positions, keep, axis=1)
+
+    def results(self) -> dict[Hashable, list[tuple[object, float]]]:
+        """Top ``limit`` (vacancy id, score) pairs per profile, best first; ties keep feed order."""
+        ranked: dict[Hashable, list[tuple[object, float]]] = {}
+        for row, key in enumerate(self.keys):
+            valid = (self._best_positions[row] >= 0) & np.isfinite(self._best_scores[row])
+            scores = self._best_scores[row][valid]
+            positions = self._best_positions[row][valid]
+            order = np.lexsort((positions, -scores))
+            ranked[key] = [(self._vacancy_ids[positions[i]], float(scores[i])) for i in order]
+        return ranked
+
+
+def rank_profiles(
+    corpus: ScoringCorpus,
+    profiles: Sequence[tuple[Hashable, ProfileFeatures]],
+    limit: int = 50,
+    batch_size: int = CORPUS_BATCH_SIZE,
+    candidates: Mapping[Hashable, Collection] | None = None,
+) -> dict[Hashable, list[tuple[object, float]]]:
+    matcher = BatchMatcher(profiles, limit=limit, candidates=candidates)
+    for start in range(0, len(corpus.vacancies), batch_size):
+        matcher.feed(corpus.vacancies[start : start + batch_size], corpus.features[start : start + batch_size])
+    return matcher.results()
+
+
+class CorpusMatcher:
+    """Whole-corpus scorer for one profile at a time, encoded once per corpus snapshot."""
+
+    ROLE_CACHE_SIZE = 1024
+
+    def __init__(self, corpus: ScoringCorpus):
+        self.vacancy_ids = [vacancy.id for vacancy in corpus.vacancies]
+        self._vocabulary: dict[str, int] = {}
+        rows, cols = [], []
+        for row, feature in enumerate(corpus.features):
+            for token in feature.tokens:
+                rows.append(row)
+                cols.append(self._vocabulary.setdefault(token, len(self._vocabulary)))
+        self._tokens = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(self.vacancy_ids), len(self._vocabulary)),
+        )
+        self._titles = [feature.title for feature in corpus.features]
+        self._role_hits: dict[str, np.ndarray] = {}
+        self._locations: dict[str, int] = {}
+        self._columns = vacancy_columns(corpus.vacancies, corpus.features, self._location_id)
+        self._positions: dict[object, int] | None = None
+        self.dropped = np.zeros(len(self.vacancy_ids), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.vacancy_ids) - int(self.dropped.sum())
+
+    def _positions_of(self, vacancy_ids) -> list[int]:
+        if self._positions is None:
+            self._positions = {vacancy_id: position for position, vacancy_id in enumerate(self.vacancy_ids)}
+        return [self._positions[vacancy_id] for vacancy_id in vacancy_ids if vacancy_id in self._positions]
+
+    def drop(self, vacancy_ids) -> None:
+        """Exclude ``vacancy_ids`` from future results without re-encoding the corpus."""
+        self.dropped[self._positions_of(vacancy_ids)] = True
+
+    def _location_id(self, location: str) -> int:
+        if not location:
+            return -1
+        return self._locations.setdefault(location, len(self._locations))
+
+    def _role_matches(self, role: str) -> np.ndarray:
+        hits = self._role_hits.get(role)
+        if hits is None:
+            if len(self._role_hits) >= self.ROLE_CACHE_SIZE:
+                self._role_hits.clear()
+            hits = np.fromiter((role in title for title in self._titles), dtype=bool, count=len(self._titles))
+            self._role_hits[role] = hits
+        return hits
+
+    def top(
+        self, profile: ProfileFeatures, limit: int, candidates: Collection | None = None
+    ) -> list[tuple[object, float]]:
+        """Best ``limit`` (vacancy id, score) pairs, among ``candidates`` when given, ordered like ``BatchMatcher``."""
+        if not self.vacancy_ids or limit <= 0:
+            return []
+        columns = [
+            (self._vocabulary[token], profile.token_weights.get(token, 1.0))
+            for token in profile.tokens
+            if token in self._vocabulary
+        ]
+        if columns:
+            indices, weights = zip(*columns)
+            overlap = self._tokens[:, list(indices)] @ np.array(weights, dtype=np.float32)
+        else:
+            overlap = np.zeros(len(self.vacancy_ids), dtype=np.float32)
+        aligned = np.zeros(len(self.vacancy_ids), dtype=bool)
+        for role in profile.roles:
+            aligned |= self._role_matches(role)
+        location = self._locations.get(profile.location, len(self._locations)) if profile.location else -1
+        scores = score_block(
+            overlap[None, :],
+            aligned[None, :],
+            np.array([[profile.salary_min or 0.0]]),
+            np.array([[profile.has_languages]]),
+            np.array([[location]], dtype=np.int64),
+            self._columns,
+        )[0]
+        scores[self.dropped] = -np.inf
+        if candidates is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[self._positions_of(candidates)] = True
+            scores[~allowed] = -np.inf
+        keep = min(limit, len(scores))
+        best = np.argpartition(-scores, keep - 1)[:keep]
+        order = best[np.lexsort((best, -scores[best]))]
+        return [
+            (self.vacancy_ids[position], float(scores[position])) for position in order if np.isfinite(scores[position])
+        ]
+
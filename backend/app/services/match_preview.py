@@ -0,0 +1,157 @@
+"""Per-process corpus snapshot behind ``GET /matching/preview``, rebuilt in the background when it goes stale."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+from typing import Any, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.models import CorpusState, Match, Profile, SavedFilter, Vacancy
+from app.services.corpus_stats import CORPUS_STATE_ID, load_token_weights
+from app.services.match_engine import CorpusMatcher, load_corpus
+from app.services.matching import TokenWeights, VacancyRecord, build_matches, extract_profile_features
+from app.services.vacancy_index import eligible_vacancy_ids, prefilter_clause, stream_vacancies, vacancy_records
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 1000
+
+
+@dataclass(frozen=True)
+class CorpusSnapshot:
+    generation: int
+    stats_version: int
+    weights: TokenWeights
+    matcher: CorpusMatcher
+    loaded_at: datetime
+    load_seconds: float
+
+
+class PreviewCache:
+    def __init__(self) -> None:
+        self._snapshot: CorpusSnapshot | None = None
+        self._reload = threading.Lock()
+        self._stats = threading.Lock()
+        self._counts = {"hits": 0, "stale": 0, "misses": 0}
+        self._rebuilds = 0
+        self._rebuilder: threading.Thread | None = None
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def _count(self, outcome: str) -> None:
+        with self._stats:
+            self._counts[outcome] += 1
+
+    def snapshot(self, db: Session) -> CorpusSnapshot:
+        state = (
+            db.query(CorpusState.generation, CorpusState.stats_version)
+            .filter(CorpusState.id == CORPUS_STATE_ID)
+            .first()
+        )
+        key = (state.generation, state.stats_version) if state else (0, 0)
+        current = self._snapshot
+        if current is not None and (current.generation, current.stats_version) == key:
+            self._count("hits")
+            return current
+        if current is not None:
+            # Serve the previous snapshot; at most one rebuild runs at a time.
+            if self._reload.acquire(blocking=False):
+                self._rebuilder = threading.Thread(target=self._rebuild_in_background, args=(key,), daemon=True)
+                self._rebuilder.start()
+            self._count("stale")
+            return current
+        with self._reload:
+            current = self._snapshot
+            if current is None or (current.generation, current.stats_version) != key:
+                current = self._rebuild(db, key)
+            self._count("misses")
+            return current
+
+    def _rebuild(self, db: Session, key: tuple[int, int]) -> CorpusSnapshot:
+        started = time.perf_counter()
+        weights = load_token_weights(db)
+        matcher = CorpusMatcher(load_corpus(db))
+        self._snapshot = CorpusSnapshot(
+            generation=key[0],
+            stats_version=weights.version,
+            weights=weights,
+            matcher=matcher,
+            loaded_at=datetime.now(timezone.utc),
+            load_seconds=time.perf_counter() - started,
+        )
+        return self._snapshot
+
+    def _rebuild_in_background(self, key: tuple[int, int]) -> None:
+        db = SessionLocal()
+        try:
+            self._rebuild(db, key)
+            with self._stats:
+                self._rebuilds += 1
+        except Exception:  # noqa: BLE001
+            logger.exception("Rebuilding the matching preview snapshot failed")
+        finally:
+            db.close()
+            self._reload.release()
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until a running background rebuild finishes."""
+        rebuilder = self._rebuilder
+        if rebuilder is not None:
+            rebuilder.join(timeout)
+
+    def record_latency(self, seconds: float) -> None:
+        with self._stats:
+            self._latencies.append(seconds)
+
+    def stats(self) -> dict[str, Any]:
+        """Counters and latency percentiles of this API process."""
+        with self._stats:
+            counts = dict(self._counts)
+            rebuilds = self._rebuilds
+            latencies = np.array(self._latencies) * 1000.0
+        requests = sum(counts.values())
+        snapshot = self._snapshot
+        return {
+            **counts,
+            "rebuilds": rebuilds,
+            "hit_rate": round((counts["hits"] + counts["stale"]) / requests, 4) if requests else None,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+            "corpus_generation": snapshot.generation if snapshot else None,
+            "corpus_size": len(snapshot.matcher) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot else None,
+            "load_seconds": round(snapshot.load_seconds, 3) if snapshot else None,
+        }
+
+    def clear(self) -> None:
+        self.wait()
+        with self._reload, self._stats:
+            self._snapshot = None
+            self._rebuilds = 0
+            self._counts = dict.fromkeys(self._counts, 0)
+            self._latencies.clear()
+
+
+preview_cache = PreviewCache()
+
+
+def top_matches(
+    db: Session, profile: Profile | None, limit: int, filters: Sequence[SavedFilter] = ()
+) -> tuple[list[Match], dict[object, VacancyRecord]]:
+    """Best ``limit`` matches from the snapshot, among the vacancies passing ``filters``, with their records."""
+    snapshot = preview_cache.snapshot(db)
+    eligible = eligible_vacancy_ids(db, prefilter_clause(profile, filters)) if filters else None
+    ranked = snapshot.matcher.top(extract_profile_features(profile, weights=snapshot.weights), limit, eligible)
+    vacancy_ids = [vacancy_id for vacancy_id, _ in ranked]
+    records = {
+        record.id: record for record in stream_vacancies(vacancy_records(db).filter(Vacancy.id.in_(vacancy_ids)))
+    }
+    candidates = [records[vacancy_id] for vacancy_id in vacancy_ids if vacancy_id in records]
+    return build_matches(profile, candidates, weights=snapshot.weights), records
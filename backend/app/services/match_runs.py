@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+from typing import Any
+
+from redis import Redis
+
+# Bookkeeping of a chunked match recompute, kept long enough to inspect a run
+# that stalled on a chunk which exhausted its retries.
+RUN_TTL_SECONDS = 2 * 24 * 3600
+COUNTERS = (
+    "users_total",
+    "users_skipped",
+    "users_incremental",
+    "users_full",
+    "users_prefiltered",
+    "prefilter_candidates",
+    "rows_written",
+)
+
+
+def _key(run_id: str) -> str:
+    return f"matching:runs:{run_id}"
+
+
+def _chunks_key(run_id: str) -> str:
+    return f"matching:runs:{run_id}:chunks"
+
+
+def _text(value: Any) -> str | None:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def start_run(
+    redis_conn: Redis, run_id: str, boundaries: list[str], started_at: datetime, force_full: bool
+) -> None:
+    """Record a run whose chunk ``i`` holds the user ids from ``boundaries[i]`` up to the next boundary."""
+    pipe = redis_conn.pipeline()
+    pipe.hset(
+        _key(run_id),
+        mapping={
+            "started_at": started_at.isoformat(),
+            "chunks_total": len(boundaries),
+            "boundaries": json.dumps(boundaries),
+            "force_full": int(force_full),
+        },
+    )
+    pipe.expire(_key(run_id), RUN_TTL_SECONDS)
+    pipe.execute()
+
+
+def resume_run(redis_conn: Redis, run_id: str) -> tuple[list[str], set[int]] | None:
+    """Chunk boundaries and finished chunk indexes of a started run, or None when it never started."""
+    boundaries = redis_conn.hget(_key(run_id), "boundaries")
+    if boundaries is None:
+        return None
+    done = {int(_text(chunk_index)) for chunk_index in redis_conn.hgetall(_chunks_key(run_id))}
+    return json.loads(_text(boundaries)), done
+
+
+def complete_chunk(
+    redis_conn: Redis, run_id: str, chunk_index: int, stats: dict[str, Any]
+) -> dict[str, Any] | None:
+    """Record a finished chunk once; returns the run summary to the chunk that finishes last."""
+    pipe = redis_conn.pipeline()
+    pipe.hset(_chunks_key(run_id), str(chunk_index), json.dumps(stats, default=str))
+    pipe.expire(_chunks_key(run_id), RUN_TTL_SECONDS)
+    pipe.hlen(_chunks_key(run_id))
+    pipe.hget(_key(run_id), "chunks_total")
+    _, _, done, total = pipe.execute()
+    if total is None or done < int(total):
+        return None
+    finished_at = datetime.now(timezone.utc)
+    if not redis_conn.hsetnx(_key(run_id), "finished_at", finished_at.isoformat()):
+        return None
+    return summarize_run(redis_conn, run_id)
+
+
+def summarize_run(redis_conn: Redis, run_id: str) -> dict[str, Any] | None:
+    run = {_text(field): _text(value) for field, value in redis_conn.hgetall(_key(run_id)).items()}
+    if not run:
+        return None
+    chunks = [json.loads(_text(raw)) for raw in redis_conn.hgetall(_chunks_key(run_id)).values()]
+    started_at = datetime.fromisoformat(run["started_at"])
+    summary: dict[str, Any] = {
+        "run_id": run_id,
+        "started_at": run["started_at"],
+        "finished_at": run.get("finished_at"),
+        "force_full": bool(int(run.get("force_full", 0))),
+        "chunks_total": int(run["chunks_total"]),
+        "chunks_done": len(chunks),
+    }
+    if run.get("finished_at"):
+        finished_at = datetime.fromisoformat(run["finished_at"])
+        summary["wall_seconds"] = round((finished_at - started_at).total_seconds(), 3)
+    for counter in COUNTERS:
+        summary[counter] = sum(chunk.get(counter, 0) for chunk in chunks)
+    summary["chunk_seconds"] = round(sum(chunk.get("duration_seconds", 0.0) for chunk in chunks), 3)
+    summary["prefilter_seconds"] = round(sum(chunk.get("prefilter_seconds", 0.0) for chunk in chunks), 3)
+    summary["corpus_loads"] = sum(chunk.get("corpus_loads", 0) for chunk in chunks)
+    summary["corpus_load_seconds"] = round(sum(chunk.get("corpus_load_seconds", 0.0) for chunk in chunks), 3)
+    summary["corpus_generations"] = sorted({chunk["corpus_generation"] for chunk in chunks if "corpus_generation" in chunk})
+    summary["stats_versions"] = sorted({chunk["stats_version"] for chunk in chunks if "stats_version" in chunk})
+    return summary
@@ -1,69 +1,13 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+import heapq
+import math
 import re
-from typing import Iterable, List, Tuple
+from typing import Any, Iterable, List, Mapping, Tuple
 
 from app.models.models import Match, Profile, Vacancy
-
-STOPWORDS = {
-    "en": {
-        "the",
-        "and",
-        "for",
-        "with",
-        "from",
-        "that",
-        "this",
-        "you",
-        "your",
-        "our",
-        "are",
-        "will",
-        "can",
-        "to",
-        "of",
-        "in",
-        "on",
-        "a",
-        "an",
-    },
-    "de": {
-        "und",
-        "der",
-        "die",
-        "das",
-        "mit",
-        "für",
-        "auf",
-        "im",
-        "in",
-        "zu",
-        "von",
-        "ist",
-        "sind",
-        "wir",
-        "sie",
-        "du",
-        "ihr",
-    },
-    "ru": {
-        "и",
-        "в",
-        "на",
-        "для",
-        "по",
-        "с",
-        "что",
-        "это",
-        "вы",
-        "мы",
-        "как",
-        "или",
-        "но",
-        "к",
-        "из",
-    },
-}
+from app.services.tokenizer import tokenize, tokenize_many
 
 SENIORITY_HINTS = {
     "junior": {"junior", "entry", "trainee"},
@@ -74,31 +18,21 @@ SENIORITY_HINTS = {
 LANGUAGE_LEVEL_RE = re.compile(r"\b(a2|b1|b2|c1|c2)\b", re.IGNORECASE)
 
 
-def _stem(token: str) -> str:
-    for suffix in ("ing", "ed", "es", "s"):
-        if token.endswith(suffix) and len(token) > len(suffix) + 2:
-            return token[: -len(suffix)]
-    for suffix in ("en", "er", "e", "n"):
-        if token.endswith(suffix) and len(token) > len(suffix) + 2:
-            return token[: -len(suffix)]
-    for suffix in ("ов", "ев", "ий", "ая", "ые", "ого", "ыми"):
-        if token.endswith(suffix) and len(token) > len(suffix) + 2:
-            return token[: -len(suffix)]
-    return token
+def vacancy_text(vacancy: Vacancy | VacancyRecord) -> str:
+    return " ".join(
+        filter(None, [vacancy.title, vacancy.description or "", vacancy.location or "", vacancy.company or ""])
+    )
 
 
-def tokenize(text: str, locale: str | None = None) -> list[str]:
-    if not text:
-        return []
-    locale_key = (locale or "en").lower()
-    stopwords = STOPWORDS.get(locale_key, STOPWORDS["en"])
-    tokens = re.findall(r"[\\w\\-+#]+", text.lower())
-    cleaned = []
-    for token in tokens:
-        if token in stopwords or len(token) < 2:
-            continue
-        cleaned.append(_stem(token))
-    return cleaned
+def profile_terms(profile: Profile | None) -> tuple[list[str], list[str]]:
+    profile_roles = [role.lower() for role in profile.desired_roles] if profile and profile.desired_roles else []
+    profile_skills = [skill.lower() for skill in profile.skills] if profile and profile.skills else []
+    return profile_roles, profile_skills
+
+
+def profile_tokens(profile: Profile | None, locale: str | None = None) -> set[str]:
+    profile_roles, profile_skills = profile_terms(profile)
+    return set(tokenize(" ".join(profile_roles + profile_skills), locale))
 
 
 def _extract_language_levels(text: str) -> set[str]:
@@ -121,34 +55,139 @@ def _build_skill_gap(missing_skills: list[str]) -> list[dict[str, str]]:
     return gap_plan
 
 
-def score_vacancy(
-    profile: Profile | None, vacancy: Vacancy, locale: str | None = None
+@dataclass(frozen=True)
+class TokenWeights:
+    """Smoothed IDF weights of vacancy tokens, rounded to eighths so overlaps add up exactly in float32."""
+
+    version: int = 0
+    document_count: int = 0
+    frequencies: Mapping[str, int] = field(default_factory=dict)
+
+    def weight(self, token: str) -> float:
+        if not self.document_count:
+            return 1.0
+        count = self.document_count
+        idf = math.log((1 + count) / (1 + self.frequencies.get(token, 0))) + 1
+        return round(16 * idf / (math.log(1 + count) + 1)) / 8
+
+
+@dataclass(frozen=True)
+class ProfileFeatures:
+    roles: tuple[str, ...]
+    tokens: frozenset[str]
+    salary_min: float | None
+    has_languages: bool
+    location: str
+    # Weight per profile token; empty means every token weighs 1.0.
+    token_weights: Mapping[str, float] = field(default_factory=dict, compare=False)
+
+
+@dataclass(frozen=True)
+class VacancyFeatures:
+    tokens: frozenset[str]
+    title_tokens: frozenset[str]
+    title: str
+    language_levels: frozenset[str]
+    seniority: str | None
+    location: str
+
+
+@dataclass(frozen=True, slots=True)
+class VacancyRecord:
+    """Column-projected, session-free read model of a vacancy for scoring."""
+
+    id: Any
+    title: str
+    description: str | None
+    location: str | None
+    company: str | None
+    remote: bool | None
+    salary_max: float | None
+    features: VacancyFeatures | None = None
+
+
+def extract_profile_features(
+    profile: Profile | None, locale: str | None = None, weights: TokenWeights | None = None
+) -> ProfileFeatures:
+    profile_roles, _profile_skills = profile_terms(profile)
+    tokens = frozenset(profile_tokens(profile, locale))
+    return ProfileFeatures(
+        roles=tuple(profile_roles),
+        tokens=tokens,
+        salary_min=profile.salary_min if profile else None,
+        has_languages=bool(profile and profile.languages),
+        location=_normalize_location(profile.location if profile else None),
+        token_weights={token: weights.weight(token) for token in tokens} if weights else {},
+    )
+
+
+def _detect_seniority(title_tokens: Iterable[str]) -> str | None:
+    title_tokens = set(title_tokens)
+    for level, hints in SENIORITY_HINTS.items():
+        if hints.intersection(title_tokens):
+            return level
+    return None
+
+
+def extract_vacancy_features(vacancy: Vacancy | VacancyRecord, locale: str | None = None) -> VacancyFeatures:
+    text = vacancy_text(vacancy)
+    tokens, title_tokens = map(frozenset, tokenize_many([text, vacancy.title or ""], locale))
+    return VacancyFeatures(
+        tokens=tokens,
+        title_tokens=title_tokens,
+        title=(vacancy.title or "").lower(),
+        language_levels=frozenset(_extract_language_levels(text)),
+        seniority=_detect_seniority(title_tokens),
+        location=_normalize_location(vacancy.location),
+    )
+
+
+def stored_vacancy_features(vacancy: Vacancy | VacancyRecord) -> VacancyFeatures:
+    """Features written at ingestion time, extracted on the fly for unindexed rows."""
+    row = getattr(vacancy, "features", None)
+    if row is None:
+        return extract_vacancy_features(vacancy)
+    if isinstance(row, VacancyFeatures):
+        return row
+    return features_from_store(row)
+
+
+def features_from_store(row: Any) -> VacancyFeatures:
+    """``VacancyFeatures`` of a ``vacancy_features`` row or a row projecting its columns."""
+    return VacancyFeatures(
+        tokens=frozenset(row.tokens or []),
+        title_tokens=frozenset(row.title_tokens or []),
+        title=row.title_normalized or "",
+        language_levels=frozenset(row.language_levels or []),
+        seniority=row.seniority,
+        location=row.location_normalized or "",
+    )
+
+
+def _overlap_score(profile: ProfileFeatures, overlap: set[str]) -> float:
+    if not profile.token_weights:
+        return min(40.0, len(overlap) * 4.0)
+    return min(40.0, sum(profile.token_weights[token] for token in overlap) * 4.0)
+
+
+def score_features(
+    profile: ProfileFeatures, vacancy: Vacancy | VacancyRecord, features: VacancyFeatures
 ) -> tuple[float, list[str], list[str], list[str], list[str]]:
     score = 0.0
     missing_skills: list[str] = []
     matched_skills: list[str] = []
     reasons: list[str] = []
 
-    vacancy_text = " ".join(
-        filter(None, [vacancy.title, vacancy.description or "", vacancy.location or "", vacancy.company or ""])
-    )
-    vacancy_tokens = set(tokenize(vacancy_text, locale))
-
-    profile_roles = [role.lower() for role in profile.desired_roles] if profile and profile.desired_roles else []
-    profile_skills = [skill.lower() for skill in profile.skills] if profile and profile.skills else []
-    profile_tokens = set(tokenize(" ".join(profile_roles + profile_skills), locale))
-
-    if profile_roles:
-        if any(role in (vacancy.title or "").lower() for role in profile_roles):
+    if profile.roles:
+        if any(role in features.title for role in profile.roles):
             score += 30
             reasons.append("Role alignment with desired titles")
         else:
             missing_skills.append("role_alignment")
 
-    overlap = vacancy_tokens.intersection(profile_tokens)
+    overlap = features.tokens.intersection(profile.tokens)
     if overlap:
-        overlap_score = min(40.0, len(overlap) * 4.0)
-        score += overlap_score
+        score += _overlap_score(profile, overlap)
         matched_skills.extend(sorted(overlap))
         reasons.append("Skill overlap with your profile")
     else:
@@ -158,68 +197,125 @@ def score_vacancy(
         score += 8
         reasons.append("Remote-friendly opportunity")
 
-    if profile and profile.salary_min and vacancy.salary_max:
-        if vacancy.salary_max >= profile.salary_min:
-            score += 12
-            reasons.append("Salary aligns with your target")
-        else:
-            missing_skills.append("salary_expectation")
+    # Vacancies below the salary floor never reach scoring; see ``within_salary_floor``.
+    if profile.salary_min and vacancy.salary_max and vacancy.salary_max >= profile.salary_min:
+        score += 12
+        reasons.append("Salary aligns with your target")
 
-    if profile and profile.languages:
-        requested_levels = _extract_language_levels(vacancy_text)
-        if requested_levels:
+    if profile.has_languages:
+        if features.language_levels:
             score += 8
             reasons.append("Language level requirements detected")
         else:
             score += 4
             reasons.append("Languages listed in your profile")
 
-    profile_location = _normalize_location(profile.location if profile else None)
-    vacancy_location = _normalize_location(vacancy.location)
-    if profile_location and vacancy_location:
-        if profile_location == vacancy_location:
+    if profile.location and features.location:
+        if profile.location == features.location:
             score += 10
             reasons.append("Same city as your location")
         else:
             score += 2
             reasons.append("Location is different but still relevant")
 
-    vacancy_title_tokens = set(tokenize(vacancy.title or "", locale))
-    for level, hints in SENIORITY_HINTS.items():
-        if hints.intersection(vacancy_title_tokens):
-            score += 6
-            reasons.append(f"Seniority hint detected ({level})")
-            break
+    if features.seniority:
+        score += 6
+        reasons.append(f"Seniority hint detected ({features.seniority})")
 
     if len(reasons) < 3:
         reasons.append("Vacancy matches your profile keywords")
     reasons = reasons[:6]
 
-    missing = sorted(vacancy_tokens.difference(profile_tokens))[:8]
+    missing = sorted(features.tokens.difference(profile.tokens))[:8]
     for missing_skill in missing:
         if missing_skill not in missing_skills:
             missing_skills.append(missing_skill)
 
-    return score, reasons, missing_skills, matched_skills, sorted(vacancy_tokens)
-
-
-def build_matches(profile: Profile | None, vacancies: Iterable[Vacancy]) -> List[Match]:
-    matches: list[Match] = []
-    for vacancy in vacancies:
-        score, reasons, missing_skills, matched_skills, _tokens = score_vacancy(profile, vacancy)
-        explanation = "; ".join(reasons)
-        match = Match(
-            vacancy_id=vacancy.id,
-            score=score,
-            explanation=explanation,
-            missing_skills=missing_skills,
-            matched_skills=matched_skills,
-            reasons=reasons,
-        )
-        matches.append(match)
-    return matches
+    return score, reasons, missing_skills, matched_skills, sorted(features.tokens)
+
+
+def score_value(profile: ProfileFeatures, vacancy: Vacancy | VacancyRecord, features: VacancyFeatures) -> float:
+    """Score of ``score_features`` without building reasons or skill lists."""
+    score = 0.0
+    if profile.roles and any(role in features.title for role in profile.roles):
+        score += 30
+    overlap = features.tokens.intersection(profile.tokens)
+    if overlap:
+        score += _overlap_score(profile, overlap)
+    if vacancy.remote:
+        score += 8
+    if profile.salary_min and vacancy.salary_max and vacancy.salary_max >= profile.salary_min:
+        score += 12
+    if profile.has_languages:
+        score += 8 if features.language_levels else 4
+    if profile.location and features.location:
+        score += 10 if profile.location == features.location else 2
+    if features.seniority:
+        score += 6
+    return score
+
+
+def within_salary_floor(profile: ProfileFeatures, vacancy: Vacancy | VacancyRecord) -> bool:
+    """Hard profile constraint: a vacancy that explicitly pays below the profile's floor never matches."""
+    return not (profile.salary_min and vacancy.salary_max and vacancy.salary_max < profile.salary_min)
+
+
+def score_vacancy(
+    profile: Profile | None,
+    vacancy: Vacancy | VacancyRecord,
+    locale: str | None = None,
+    weights: TokenWeights | None = None,
+) -> tuple[float, list[str], list[str], list[str], list[str]]:
+    features = extract_vacancy_features(vacancy, locale) if locale else stored_vacancy_features(vacancy)
+    return score_features(extract_profile_features(profile, locale, weights), vacancy, features)
+
+
+def _build_match(profile: ProfileFeatures, vacancy: Vacancy | VacancyRecord, features: VacancyFeatures) -> Match:
+    score, reasons, missing_skills, matched_skills, tokens = score_features(profile, vacancy, features)
+    return Match(
+        vacancy_id=vacancy.id,
+        score=score,
+        explanation="; ".join(reasons),
+        missing_skills=missing_skills,
+        matched_skills=matched_skills,
+        reasons=reasons,
+        tokens=tokens,
+        skill_gap_plan=_build_skill_gap(missing_skills),
+    )
+
+
+def build_matches(
+    profile: Profile | None,
+    vacancies: Iterable[Vacancy | VacancyRecord],
+    limit: int | None = None,
+    weights: TokenWeights | None = None,
+) -> List[Match]:
+    """``Match`` rows for ``vacancies`` within the salary floor, best first; with ``limit`` only the top ones."""
+    profile_features = extract_profile_features(profile, weights=weights)
+    vacancies = (vacancy for vacancy in vacancies if within_salary_floor(profile_features, vacancy))
+    if limit is None:
+        matches = [_build_match(profile_features, vacancy, stored_vacancy_features(vacancy)) for vacancy in vacancies]
+        # Stable, so ties keep input order as in the heap branch.
+        return sorted(matches, key=lambda match: match.score, reverse=True)
+    heap: list[tuple[float, int, Vacancy | VacancyRecord, VacancyFeatures]] = []
+    if limit <= 0:
+        return []
+    for position, vacancy in enumerate(vacancies):
+        features = stored_vacancy_features(vacancy)
+        entry = (score_value(profile_features, vacancy, features), -position, vacancy, features)
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    return [
+        _build_match(profile_features, vacancy, features)
+        for _score, _position, vacancy, features in sorted(heap, key=lambda entry: entry[:2], reverse=True)
+    ]
 
 
 def build_match_detail(profile: Profile | None, vacancy: Vacancy, match: Match) -> Tuple[list[str], list[dict[str, str]]]:
+    """Detail artifacts of ``match``; stored on the row when it was built by ``build_matches``."""
+    if match.tokens is not None and match.skill_gap_plan is not None:
+        return match.tokens, match.skill_gap_plan
     _, _, missing_skills, _, tokens = score_vacancy(profile, vacancy)
     return tokens, _build_skill_gap(missing_skills)
@@ -0,0 +1,241 @@
+"""Near-duplicate vacancy detection with MinHash signatures and LSH buckets."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+import hashlib
+from typing import Iterable, Sequence
+import zlib
+
+import numpy as np
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, aliased
+
+from app.models.models import Vacancy, VacancyLshBucket, VacancySignature
+from app.services.tokenizer import TOKEN_RE
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.8
+# Short postings share most shingles with any other posting of the same title,
+# so they are never collapsed.
+MIN_SHINGLES = 10
+LOOKUP_BATCH_SIZE = 500
+
+_PRIME = (1 << 31) - 1
+_random = np.random.RandomState(20261016)
+_A = _random.randint(1, _PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _random.randint(0, _PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(vacancy: Vacancy) -> set[str]:
+    words = TOKEN_RE.findall(f"{vacancy.title or ''} {vacancy.description or ''}".lower())
+    return {" ".join(words[start : start + SHINGLE_SIZE]) for start in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set: Iterable[str]) -> list[int] | None:
+    """MinHash signature of ``shingle_set``; None when it is too short to compare."""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) % _PRIME for shingle in shingle_set), dtype=np.uint64
+    )
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).tolist()
+
+
+def bucket_keys(signature: Sequence[int]) -> list[str]:
+    keys = []
+    for band in range(BANDS):
+        rows = np.asarray(signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND], dtype=np.uint64)
+        keys.append(f"{band:02d}:{hashlib.blake2b(rows.tobytes(), digest_size=8).hexdigest()}")
+    return keys
+
+
+def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.mean(np.asarray(left) == np.asarray(right)))
+
+
+def _normalized(value: str | None) -> str:
+    return (value or "").strip().lower()
+
+
+def _opening(company, location, remote, salary_min, salary_max) -> tuple:
+    return _normalized(company), _normalized(location), bool(remote), salary_min, salary_max
+
+
+def _vacancy_opening(vacancy: Vacancy) -> tuple:
+    return _opening(vacancy.company, vacancy.location, vacancy.remote, vacancy.salary_min, vacancy.salary_max)
+
+
+def _same_opening(left: tuple, right: tuple) -> bool:
+    # Similar text is not enough: the same employer posts one description for several
+    # openings, and a posting without a company cannot be attributed at all.
+    company, location, remote, salary_min, salary_max = left
+    other_company, other_location, other_remote, other_min, other_max = right
+    if not company or company != other_company or location != other_location or remote != other_remote:
+        return False
+    low = max(salary_min or 0, other_min or 0)
+    high = min(salary_max or float("inf"), other_max or float("inf"))
+    return low <= high
+
+
+def _chunks(items: Sequence, size: int = LOOKUP_BATCH_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _drop_signatures(db: Session, vacancy_ids: Sequence) -> None:
+    db.query(VacancyLshBucket).filter(VacancyLshBucket.vacancy_id.in_(vacancy_ids)).delete(
+        synchronize_session=False
+    )
+    db.query(VacancySignature).filter(VacancySignature.vacancy_id.in_(vacancy_ids)).delete(
+        synchronize_session=False
+    )
+
+
+def unlink(db: Session, vacancy_ids: Sequence) -> list:
+    """Drop signatures of vacancies about to be deleted; returns the oldest duplicates, promoted to canonical."""
+    _drop_signatures(db, vacancy_ids)
+    orphans: dict[object, list] = defaultdict(list)
+    for vacancy_id, canonical_id in (
+        db.query(Vacancy.id, Vacancy.canonical_id)
+        .filter(Vacancy.canonical_id.in_(vacancy_ids), Vacancy.id.not_in(vacancy_ids))
+        .order_by(Vacancy.created_at, Vacancy.id)
+    ):
+        orphans[canonical_id].append(vacancy_id)
+    promoted_ids = []
+    for duplicates in orphans.values():
+        promoted, rest = duplicates[0], duplicates[1:]
+        promoted_ids.append(promoted)
+        db.query(Vacancy).filter(Vacancy.id == promoted).update(
+            {Vacancy.canonical_id: None}, synchronize_session=False
+        )
+        if rest:
+            db.query(Vacancy).filter(Vacancy.id.in_(rest)).update(
+                {Vacancy.canonical_id: promoted}, synchronize_session=False
+            )
+    return promoted_ids
+
+
+def link_duplicates(db: Session, vacancies: Sequence[Vacancy]) -> set:
+    """(Re)compute signatures of ``vacancies`` and link near-duplicates; returns ids that changed canonical state."""
+    vacancy_ids = [vacancy.id for vacancy in vacancies]
+    signatures = {vacancy.id: minhash(shingles(vacancy)) for vacancy in vacancies}
+    orphans = _detach_if_changed(db, vacancies, signatures)
+    _drop_signatures(db, vacancy_ids)
+    keys = {vacancy_id: bucket_keys(signature) for vacancy_id, signature in signatures.items() if signature}
+
+    stored_buckets: dict[str, list] = defaultdict(list)
+    all_keys = sorted({key for vacancy_keys in keys.values() for key in vacancy_keys})
+    for chunk in _chunks(all_keys):
+        for bucket, vacancy_id in db.query(VacancyLshBucket.bucket, VacancyLshBucket.vacancy_id).filter(
+            VacancyLshBucket.bucket.in_(chunk)
+        ):
+            stored_buckets[bucket].append(vacancy_id)
+    candidate_ids = sorted({vacancy_id for ids in stored_buckets.values() for vacancy_id in ids}, key=str)
+    # Candidates are compared by the opening of their canonical row, so a chain of
+    # postings cannot drift from one opening to another.
+    canonical = aliased(Vacancy)
+    target = aliased(Vacancy)
+    candidates: dict[object, tuple[list[int], object, tuple]] = {}
+    for chunk in _chunks(candidate_ids):
+        for vacancy_id, signature, canonical_id, *opening in (
+            db.query(
+                VacancySignature.vacancy_id,
+                VacancySignature.signature,
+                Vacancy.canonical_id,
+                target.company,
+                target.location,
+                target.remote,
+                target.salary_min,
+                target.salary_max,
+            )
+            .join(Vacancy, Vacancy.id == VacancySignature.vacancy_id)
+            .outerjoin(canonical, canonical.id == Vacancy.canonical_id)
+            .join(target, target.id == func.coalesce(canonical.id, Vacancy.id))
+            .filter(VacancySignature.vacancy_id.in_(chunk))
+        ):
+            candidates[vacancy_id] = (signature, canonical_id or vacancy_id, _opening(*opening))
+
+    changed = set()
+    batch_buckets: dict[str, list] = defaultdict(list)
+    signature_rows, bucket_rows = [], []
+    for vacancy in vacancies:
+        signature = signatures[vacancy.id]
+        canonical_id, opening = None, _vacancy_opening(vacancy)
+        if signature:
+            best = SIMILARITY_THRESHOLD
+            seen = set()
+            for key in keys[vacancy.id]:
+                for other_id in stored_buckets.get(key, []) + batch_buckets.get(key, []):
+                    if other_id in seen:
+                        continue
+                    seen.add(other_id)
+                    other_signature, other_canonical, other_opening = candidates[other_id]
+                    if other_canonical == vacancy.id or not _same_opening(_vacancy_opening(vacancy), other_opening):
+                        continue
+                    score = similarity(signature, other_signature)
+                    if score >= best:
+                        best, canonical_id, opening = score, other_canonical, other_opening
+            candidates[vacancy.id] = (signature, canonical_id or vacancy.id, opening)
+            for key in keys[vacancy.id]:
+                batch_buckets[key].append(vacancy.id)
+            signature_rows.append({"vacancy_id": vacancy.id, "signature": signature})
+            bucket_rows.extend({"bucket": key, "vacancy_id": vacancy.id} for key in keys[vacancy.id])
+        if canonical_id is not None:
+            # Rows that pointed at this vacancy follow it to its canonical row.
+            db.query(Vacancy).filter(Vacancy.canonical_id == vacancy.id).update(
+                {Vacancy.canonical_id: canonical_id}, synchronize_session=False
+            )
+        if vacancy.canonical_id != canonical_id:
+            changed.add(vacancy.id)
+            vacancy.canonical_id = canonical_id
+    if signature_rows:
+        db.execute(insert(VacancySignature), signature_rows)
+    if bucket_rows:
+        db.execute(insert(VacancyLshBucket), bucket_rows)
+    if orphans:
+        # Detached rows turned canonical, whether or not they are linked again.
+        changed.update(vacancy.id for vacancy in orphans)
+        changed |= link_duplicates(db, orphans)
+    return changed
+
+
+def _detach_if_changed(db: Session, vacancies: Sequence[Vacancy], signatures: dict) -> list[Vacancy]:
+    """Unlink duplicates whose canonical row changed its text or opening; returns them for relinking."""
+    canonicals = {vacancy.id: vacancy for vacancy in vacancies}
+    dependents = (
+        db.query(Vacancy)
+        .filter(Vacancy.canonical_id.in_(canonicals), Vacancy.id.not_in(canonicals))
+        .order_by(Vacancy.created_at, Vacancy.id)
+        .all()
+    )
+    if not dependents:
+        return []
+    stored = dict(
+        db.query(VacancySignature.vacancy_id, VacancySignature.signature).filter(
+            VacancySignature.vacancy_id.in_({vacancy.canonical_id for vacancy in dependents})
+        )
+    )
+    orphans = [
+        vacancy
+        for vacancy in dependents
+        if stored.get(vacancy.canonical_id) != signatures[vacancy.canonical_id]
+        or not _same_opening(_vacancy_opening(vacancy), _vacancy_opening(canonicals[vacancy.canonical_id]))
+    ]
+    for vacancy in orphans:
+        vacancy.canonical_id = None
+    db.flush()
+    return orphans
+
+
+def reset_duplicates(db: Session) -> None:
+    """Forget every signature and link before the whole index is rebuilt."""
+    db.query(VacancyLshBucket).delete(synchronize_session=False)
+    db.query(VacancySignature).delete(synchronize_session=False)
+    db.query(Vacancy).filter(Vacancy.canonical_id.is_not(None)).update(
+        {Vacancy.canonical_id: None}, synchronize_session=False
+    )
@@ -0,0 +1,50 @@
+"""Reverse index from profile tokens to users, for pushing new vacancies to the users they overlap."""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Profile, ProfileToken
+from app.services.matching import profile_tokens
+from app.services.vacancy_index import BATCH_SIZE, TOKEN_MAX_LENGTH
+
+
+def _token_rows(profile: Profile) -> list[dict]:
+    return [
+        {"token": token, "user_id": profile.user_id}
+        for token in sorted({token[:TOKEN_MAX_LENGTH] for token in profile_tokens(profile)})
+    ]
+
+
+def index_profile(db: Session, profile: Profile) -> None:
+    """Rewrite the token postings of ``profile``; runs in the transaction that saves it."""
+    db.query(ProfileToken).filter(ProfileToken.user_id == profile.user_id).delete(synchronize_session=False)
+    rows = _token_rows(profile)
+    if rows:
+        db.execute(insert(ProfileToken), rows)
+
+
+def users_for_tokens(db: Session, tokens: Iterable[str]) -> list:
+    """Ids of users whose profile shares at least one of ``tokens``."""
+    keys = sorted({token[:TOKEN_MAX_LENGTH] for token in tokens})
+    user_ids = set()
+    for start in range(0, len(keys), BATCH_SIZE):
+        user_ids.update(
+            user_id
+            for (user_id,) in db.query(ProfileToken.user_id)
+            .filter(ProfileToken.token.in_(keys[start : start + BATCH_SIZE]))
+            .distinct()
+        )
+    return sorted(user_ids, key=str)
+
+
+def reindex_profiles(db: Session) -> int:
+    db.query(ProfileToken).delete(synchronize_session=False)
+    profiles = db.query(Profile).all()
+    rows = [row for profile in profiles for row in _token_rows(profile)]
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(ProfileToken), rows[start : start + BATCH_SIZE])
+    return len(profiles)
@@ -10,8 +10,8 @@ from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
 from app.core.database import SessionLocal
-from app.models.models import Notification, NotificationType, Reminder, ReminderStatus, VacancySourceConfig
-from app.services.ingestion import ingest_source
+from app.models.models import Notification, NotificationType, Reminder, ReminderStatus
+from app.services.ingestion import ingest_enabled_sources
 from app.workers import tasks
 
 logger = logging.getLogger(__name__)
@@ -31,20 +31,14 @@ def record_scheduler_run(label: str) -> None:
 
 
 def run_vacancy_ingestion() -> None:
-    db: Session = SessionLocal()
-    try:
-        sources = db.query(VacancySourceConfig).filter(VacancySourceConfig.is_enabled.is_(True)).all()
-        for source in sources:
-            ingest_source(db, source)
-        record_scheduler_run("vacancy_ingestion")
-    finally:
-        db.close()
+    ingest_enabled_sources()
+    record_scheduler_run("vacancy_ingestion")
 
 
 def run_match_recompute() -> None:
     redis_conn = _redis_client()
     queue = Queue("default", connection=redis_conn)
-    queue.enqueue(tasks.compute_matches_for_all, retry=Retry(max=3, interval=[30, 60, 120]))
+    queue.enqueue(tasks.coordinate_match_recompute, retry=Retry(max=3, interval=[30, 60, 120]))
     record_scheduler_run("match_recompute")
 
 
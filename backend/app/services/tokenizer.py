@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from functools import lru_cache
+import re
+from typing import Iterable
+
+STOPWORDS: dict[str, frozenset[str]] = {
+    "en": frozenset(
+        {
+            "the",
+            "and",
+            "for",
+            "with",
+            "from",
+            "that",
+            "this",
+            "you",
+            "your",
+            "our",
+            "are",
+            "will",
+            "can",
+            "to",
+            "of",
+            "in",
+            "on",
+            "a",
+            "an",
+        }
+    ),
+    "de": frozenset(
+        {
+            "und",
+            "der",
+            "die",
+            "das",
+            "mit",
+            "für",
+            "auf",
+            "im",
+            "in",
+            "zu",
+            "von",
+            "ist",
+            "sind",
+            "wir",
+            "sie",
+            "du",
+            "ihr",
+        }
+    ),
+    "ru": frozenset(
+        {
+            "и",
+            "в",
+            "на",
+            "для",
+            "по",
+            "с",
+            "что",
+            "это",
+            "вы",
+            "мы",
+            "как",
+            "или",
+            "но",
+            "к",
+            "из",
+        }
+    ),
+}
+
+# Word characters of any script plus the symbols kept in skill names (c++, c#, ci-cd).
+TOKEN_RE = re.compile(r"[\w\-+#]+")
+STEM_SUFFIXES = (
+    ("ing", "ed", "es", "s"),
+    ("en", "er", "e", "n"),
+    ("ов", "ев", "ий", "ая", "ые", "ого", "ыми"),
+)
+# Vacancy vocabularies are small compared to their token counts, so a bounded
+# memo absorbs nearly every repeated stem.
+STEM_CACHE_SIZE = 65536
+
+
+def stopwords_for(locale: str | None) -> frozenset[str]:
+    return STOPWORDS.get((locale or "en").lower(), STOPWORDS["en"])
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(token: str) -> str:
+    for suffixes in STEM_SUFFIXES:
+        for suffix in suffixes:
+            if token.endswith(suffix) and len(token) > len(suffix) + 2:
+                return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str, locale: str | None = None) -> list[str]:
+    if not text:
+        return []
+    stopwords = stopwords_for(locale)
+    return [stem(token) for token in TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in stopwords]
+
+
+def tokenize_many(texts: Iterable[str], locale: str | None = None) -> list[list[str]]:
+    """``tokenize`` for a batch of texts sharing one locale."""
+    stopwords = stopwords_for(locale)
+    findall = TOKEN_RE.findall
+    cached_stem = stem
+    return [
+        [cached_stem(token) for token in findall(text.lower()) if len(token) > 1 and token not in stopwords]
+        if text
+        else []
+        for text in texts
+    ]
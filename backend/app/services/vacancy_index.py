@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Sequence
+
+from sqlalchemy import and_, case, exists, func, insert, literal, or_, true
+from sqlalchemy.orm import Query, Session
+
+from app.models.models import CorpusState, Profile, SavedFilter, Vacancy, VacancyFeature, VacancyToken
+from app.services.corpus_stats import (
+    CORPUS_STATE_ID,
+    apply_token_deltas,
+    reset_token_stats,
+    update_corpus_state,
+)
+from app.services.matching import (
+    VacancyRecord,
+    extract_profile_features,
+    extract_vacancy_features,
+    features_from_store,
+    profile_tokens,
+)
+from app.services.near_duplicates import link_duplicates, reset_duplicates, unlink
+
+TOKEN_MAX_LENGTH = 255
+BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class CorpusChange:
+    """Corpus generation of an index write and every vacancy whose matchability it changed."""
+
+    generation: int
+    vacancy_ids: list
+
+
+def _index_key(token: str) -> str:
+    return token[:TOKEN_MAX_LENGTH]
+
+
+def _chunks(items: Sequence, size: int = BATCH_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def current_corpus_generation(db: Session) -> int:
+    return db.query(CorpusState.generation).filter(CorpusState.id == CORPUS_STATE_ID).scalar() or 0
+
+
+def bump_corpus_generation(db: Session) -> int:
+    """Bump the corpus generation; returns the new one, which the row lock keeps ours until commit."""
+    update_corpus_state(db, {CorpusState.generation: CorpusState.generation + 1})
+    return current_corpus_generation(db)
+
+
+def index_vacancies(db: Session, vacancies: Iterable[Vacancy]) -> CorpusChange | None:
+    """Reindex ``vacancies`` in the transaction that wrote them; returns the change to publish after commit."""
+    vacancies = list(vacancies)
+    if not vacancies:
+        return None
+    db.flush()
+    vacancies = list({vacancy.id: vacancy for vacancy in vacancies}.values())
+    changed = {vacancy.id: None for vacancy in vacancies}
+    deltas: Counter = Counter()
+    documents = 0
+    for batch in _chunks(vacancies):
+        vacancy_ids = [vacancy.id for vacancy in batch]
+        batch_deltas, removed = _unindex(db, vacancy_ids)
+        deltas.update(batch_deltas)
+        feature_rows = []
+        token_rows = []
+        for vacancy in batch:
+            features = extract_vacancy_features(vacancy)
+            feature_rows.append(
+                {
+                    "vacancy_id": vacancy.id,
+                    "tokens": sorted(features.tokens),
+                    "title_tokens": sorted(features.title_tokens),
+                    "title_normalized": features.title,
+                    "language_levels": sorted(features.language_levels),
+                    "seniority": features.seniority,
+                    "location_normalized": features.location,
+                }
+            )
+            token_rows.extend(
+                {"token": token, "vacancy_id": vacancy.id}
+                for token in {_index_key(token) for token in features.tokens}
+            )
+        # Core insert: the ORM bulk path drops None values, splitting rows with and
+        # without a seniority into separate statements.
+        db.execute(insert(VacancyFeature.__table__), feature_rows)
+        if token_rows:
+            db.execute(insert(VacancyToken), token_rows)
+        deltas.update(row["token"] for row in token_rows)
+        documents += removed + len(feature_rows)
+        changed.update(dict.fromkeys(link_duplicates(db, batch)))
+        for vacancy in batch:
+            db.expire(vacancy, ["features"])
+    return CorpusChange(_apply_shared_state(db, deltas, documents), list(changed))
+
+
+def _apply_shared_state(db: Session, deltas: Counter, documents: int) -> int:
+    # The token stats and the single corpus_state row are shared by every concurrent
+    # writer: lock them last, once, and in token order so writers cannot deadlock.
+    apply_token_deltas(db, deltas, documents)
+    return bump_corpus_generation(db)
+
+
+def _unindex(db: Session, vacancy_ids: Sequence) -> tuple[Counter, int]:
+    """Drop postings and features of ``vacancy_ids``; returns the stats deltas that undo them."""
+    deltas: Counter = Counter()
+    for token, count in (
+        db.query(VacancyToken.token, func.count())
+        .filter(VacancyToken.vacancy_id.in_(vacancy_ids))
+        .group_by(VacancyToken.token)
+    ):
+        deltas[token] -= count
+    documents = -(
+        db.query(func.count(VacancyFeature.vacancy_id)).filter(VacancyFeature.vacancy_id.in_(vacancy_ids)).scalar()
+        or 0
+    )
+    db.query(VacancyToken).filter(VacancyToken.vacancy_id.in_(vacancy_ids)).delete(synchronize_session=False)
+    db.query(VacancyFeature).filter(VacancyFeature.vacancy_id.in_(vacancy_ids)).delete(synchronize_session=False)
+    return deltas, documents
+
+
+def remove_from_index(db: Session, vacancy_ids: Sequence) -> CorpusChange | None:
+    """Drop vacancies from the feature store, token index and statistics before deleting them."""
+    vacancy_ids = list(vacancy_ids)
+    if not vacancy_ids:
+        return None
+    changed = dict.fromkeys(vacancy_ids)
+    deltas: Counter = Counter()
+    documents = 0
+    for batch in _chunks(vacancy_ids):
+        batch_deltas, removed = _unindex(db, batch)
+        deltas.update(batch_deltas)
+        documents += removed
+        changed.update(dict.fromkeys(unlink(db, batch)))
+    return CorpusChange(_apply_shared_state(db, deltas, documents), list(changed))
+
+
+def reindex_all(db: Session) -> int:
+    db.query(VacancyToken).delete(synchronize_session=False)
+    db.query(VacancyFeature).delete(synchronize_session=False)
+    reset_token_stats(db)
+    reset_duplicates(db)
+    total = 0
+    last_id = None
+    while True:
+        query = db.query(Vacancy).order_by(Vacancy.id)
+        if last_id is not None:
+            query = query.filter(Vacancy.id > last_id)
+        batch = query.limit(BATCH_SIZE).all()
+        if not batch:
+            break
+        index_vacancies(db, batch)
+        db.commit()
+        total += len(batch)
+        last_id = batch[-1].id
+        db.expunge_all()
+    return total
+
+
+def vacancy_records(db: Session) -> Query:
+    """Column-projected canonical vacancies with their stored features; rows feed ``stream_vacancies``."""
+    return db.query(
+        Vacancy.id,
+        Vacancy.title,
+        Vacancy.description,
+        Vacancy.location,
+        Vacancy.company,
+        Vacancy.remote,
+        Vacancy.salary_max,
+        VacancyFeature.vacancy_id,
+        VacancyFeature.tokens,
+        VacancyFeature.title_tokens,
+        VacancyFeature.title_normalized,
+        VacancyFeature.language_levels,
+        VacancyFeature.seniority,
+        VacancyFeature.location_normalized,
+    ).outerjoin(VacancyFeature, VacancyFeature.vacancy_id == Vacancy.id).filter(Vacancy.canonical_id.is_(None))
+
+
+def to_record(row) -> VacancyRecord:
+    return VacancyRecord(
+        id=row.id,
+        title=row.title,
+        description=row.description,
+        location=row.location,
+        company=row.company,
+        remote=row.remote,
+        salary_max=row.salary_max,
+        features=None if row.vacancy_id is None else features_from_store(row),
+    )
+
+
+def stream_vacancies(query: Query, batch_size: int = BATCH_SIZE) -> Iterator[VacancyRecord]:
+    """Iterate a ``vacancy_records`` query ``batch_size`` rows at a time, outside the session."""
+    for row in query.yield_per(batch_size):
+        yield to_record(row)
+
+
+def _has_overlap(tokens: set[str]):
+    return exists().where(
+        VacancyToken.vacancy_id == Vacancy.id,
+        VacancyToken.token.in_(sorted({_index_key(token) for token in tokens})),
+    )
+
+
+def overlapping_vacancies(db: Session, profile: Profile | None) -> Query:
+    """Vacancies sharing at least one token with the profile."""
+    tokens = profile_tokens(profile)
+    if not tokens:
+        return vacancy_records(db).filter(literal(False))
+    return vacancy_records(db).filter(_has_overlap(tokens))
+
+
+def _bonus_ceiling(profile: Profile | None):
+    """Upper bound of ``score_vacancy`` for a vacancy without token overlap."""
+    features = extract_profile_features(profile)
+    unindexed = VacancyFeature.vacancy_id.is_(None)
+    ceiling = case((unindexed, 40.0), else_=0.0)
+    if features.roles:
+        title_matches = or_(
+            *[VacancyFeature.title_normalized.contains(role, autoescape=True) for role in features.roles]
+        )
+        ceiling = ceiling + case((or_(unindexed, title_matches), 30.0), else_=0.0)
+    ceiling = ceiling + case((Vacancy.remote.is_(True), 8.0), else_=0.0)
+    if features.salary_min:
+        ceiling = ceiling + case((Vacancy.salary_max >= features.salary_min, 12.0), else_=0.0)
+    if features.has_languages:
+        ceiling = ceiling + 8.0
+    if features.location:
+        ceiling = ceiling + case(
+            (unindexed, 10.0),
+            (VacancyFeature.location_normalized == features.location, 10.0),
+            (VacancyFeature.location_normalized != "", 2.0),
+            else_=0.0,
+        )
+    return ceiling + case((or_(unindexed, VacancyFeature.seniority.is_not(None)), 6.0), else_=0.0)
+
+
+def bonus_reachable_vacancies(db: Session, profile: Profile | None, threshold: float | None) -> Query:
+    """Vacancies without token overlap that could still score ``threshold`` (all of them when None)."""
+    tokens = profile_tokens(profile)
+    query = vacancy_records(db)
+    if tokens:
+        query = query.filter(~_has_overlap(tokens))
+    if threshold is not None:
+        query = query.filter(_bonus_ceiling(profile) >= threshold)
+    return query
+
+
+def active_filters(db: Session, user_ids: Sequence) -> dict[object, list[SavedFilter]]:
+    """Saved filters each user switched on for matching."""
+    filters: dict[object, list[SavedFilter]] = {}
+    for batch in _chunks(list(user_ids)):
+        for saved in db.query(SavedFilter).filter(SavedFilter.user_id.in_(batch), SavedFilter.is_active.is_(True)):
+            filters.setdefault(saved.user_id, []).append(saved)
+    return filters
+
+
+def _saved_filter_clause(saved: SavedFilter):
+    # Same semantics as the vacancy search the filter was saved from.
+    conditions = []
+    if saved.location:
+        conditions.append(Vacancy.location.ilike(f"%{saved.location}%"))
+    if saved.remote is not None:
+        conditions.append(Vacancy.remote == saved.remote)
+    if saved.salary_min is not None:
+        conditions.append(Vacancy.salary_min >= saved.salary_min)
+    if saved.role_keywords:
+        conditions.append(or_(*[Vacancy.title.ilike(f"%{keyword}%") for keyword in saved.role_keywords]))
+    return and_(*conditions) if conditions else true()
+
+
+def prefilter_clause(profile: Profile | None, filters: Sequence[SavedFilter] = ()):
+    """WHERE clause for the profile's salary floor and the user's active saved filters."""
+    clauses = []
+    salary_min = profile.salary_min if profile else None
+    if salary_min:
+        clauses.append(or_(Vacancy.salary_max.is_(None), Vacancy.salary_max == 0, Vacancy.salary_max >= salary_min))
+    if filters:
+        clauses.append(or_(*[_saved_filter_clause(saved) for saved in filters]))
+    return and_(*clauses) if clauses else true()
+
+
+def eligible_vacancy_ids(db: Session, clause) -> set:
+    """Ids of the canonical vacancies passing ``clause``."""
+    return {vacancy_id for (vacancy_id,) in vacancy_records(db).with_entities(Vacancy.id).filter(clause)}
+
+
+def prefilter_candidates(db: Session, user_ids: Sequence) -> dict[object, set]:
+    """Eligible vacancy ids of each user with active saved filters; other users only have the salary floor."""
+    filters = active_filters(db, user_ids)
+    profiles = {
+        profile.user_id: profile
+        for batch in _chunks(list(filters))
+        for profile in db.query(Profile).filter(Profile.user_id.in_(batch))
+    }
+    return {
+        user_id: eligible_vacancy_ids(db, prefilter_clause(profiles.get(user_id), saved))
+        for user_id, saved in filters.items()
+    }
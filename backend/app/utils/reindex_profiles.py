@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from app.core.database import SessionLocal
+from app.services.profile_index import reindex_profiles
+
+
+def reindex_profile_tokens() -> None:
+    db = SessionLocal()
+    try:
+        profiles = reindex_profiles(db)
+        db.commit()
+        print(f"Indexed tokens of {profiles} profiles")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reindex_profile_tokens()
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from app.core.database import SessionLocal
+from app.services.corpus_stats import publish_token_stats
+from app.services.profile_index import reindex_profiles
+from app.services.vacancy_index import reindex_all
+
+
+def reindex_vacancies() -> None:
+    db = SessionLocal()
+    try:
+        total = reindex_all(db)
+        version = publish_token_stats(db)
+        profiles = reindex_profiles(db)
+        db.commit()
+        print(
+            f"Indexed {total} vacancies and {profiles} profiles, "
+            f"published token statistics version {version}"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reindex_vacancies()
@@ -15,6 +15,9 @@ from app.models.models import (
     Vacancy,
     VacancySource,
 )
+from app.services.match_daemon import VACANCIES, publish_deltas
+from app.services.profile_index import index_profile
+from app.services.vacancy_index import index_vacancies, remove_from_index
 
 
 ADMIN_EMAIL = "admin@career-demo.ai"
@@ -60,9 +63,12 @@ def seed_demo() -> None:
                 salary_max=90000,
             )
             db.add(profile)
+            db.flush()
+            index_profile(db, profile)
 
         demo_vacancies = db.query(Vacancy).filter(Vacancy.external_id.like("demo-%")).all()
         demo_vacancy_ids = [vacancy.id for vacancy in demo_vacancies]
+        removed = None
         if demo_vacancy_ids:
             db.query(Match).filter(Match.vacancy_id.in_(demo_vacancy_ids)).delete(synchronize_session=False)
             db.query(Application).filter(Application.vacancy_id.in_(demo_vacancy_ids)).delete(
@@ -71,6 +77,7 @@ def seed_demo() -> None:
             db.query(GeneratedPackage).filter(GeneratedPackage.vacancy_id.in_(demo_vacancy_ids)).delete(
                 synchronize_session=False
             )
+            removed = remove_from_index(db, demo_vacancy_ids)
             db.query(Vacancy).filter(Vacancy.id.in_(demo_vacancy_ids)).delete(synchronize_session=False)
 
         locations = ["Berlin", "Remote - EU", "Munich", "Hamburg", "Remote - Global", "Vienna"]
@@ -105,7 +112,11 @@ def seed_demo() -> None:
             db.add(vacancy)
             vacancies.append(vacancy)
 
+        indexed = index_vacancies(db, vacancies)
         db.commit()
+        for change in (removed, indexed):
+            if change is not None:
+                publish_deltas(VACANCIES, change.vacancy_ids, generation=change.generation)
         for vacancy in vacancies:
             db.refresh(vacancy)
 
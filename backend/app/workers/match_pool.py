@@ -0,0 +1,113 @@
+"""Process pool for the all-users recompute; the parent stays the single DB writer."""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+from typing import Collection, Hashable, Sequence
+
+from app.core.database import SessionLocal, engine
+from app.services.match_engine import ScoringCorpus, load_corpus, rank_profiles
+from app.services.matching import ProfileFeatures
+from app.services.vacancy_index import prefilter_candidates
+
+MIN_SHARD_USERS = 50
+
+_corpus: ScoringCorpus | None = None
+_corpus_load_seconds = 0.0
+
+
+def _load_corpus() -> ScoringCorpus:
+    db = SessionLocal()
+    try:
+        return load_corpus(db)
+    finally:
+        db.close()
+
+
+def _set_corpus(corpus: ScoringCorpus | None, load_seconds: float = 0.0) -> None:
+    global _corpus, _corpus_load_seconds
+    _corpus = corpus
+    _corpus_load_seconds = load_seconds
+
+
+def _init_worker() -> None:
+    # Connections inherited from the parent must not be reused across processes.
+    engine.dispose(close=False)
+    started = time.perf_counter()
+    corpus = _load_corpus()
+    _set_corpus(corpus, time.perf_counter() - started)
+
+
+def _prefilter(user_ids: Sequence) -> dict[Hashable, set]:
+    if not user_ids:
+        return {}
+    db = SessionLocal()
+    try:
+        return prefilter_candidates(db, user_ids)
+    finally:
+        db.close()
+
+
+def _rank_shard(
+    shard: int, profiles: Sequence[tuple[Hashable, ProfileFeatures]], limit: int, prefiltered: Collection = ()
+) -> tuple[dict[Hashable, list[tuple[object, float]]], dict]:
+    started = time.perf_counter()
+    candidates = _prefilter([key for key, _ in profiles if key in prefiltered])
+    prefilter_seconds = time.perf_counter() - started
+    ranked = rank_profiles(_corpus, profiles, limit=limit, candidates=candidates)
+    timing = {
+        "shard": shard,
+        "pid": os.getpid(),
+        "users": len(profiles),
+        "prefiltered": len(candidates),
+        "prefilter_candidates": sum(len(allowed) for allowed in candidates.values()),
+        "prefilter_seconds": round(prefilter_seconds, 3),
+        "corpus_load_seconds": round(_corpus_load_seconds, 3),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return ranked, timing
+
+
+def shard_ranges(count: int, shards: int) -> list[range]:
+    size = -(-count // max(1, shards))
+    return [range(start, min(start + size, count)) for start in range(0, count, size)] if count else []
+
+
+def rank_in_shards(
+    profiles: Sequence[tuple[Hashable, ProfileFeatures]], limit: int, workers: int, prefiltered: Collection = ()
+) -> tuple[dict[Hashable, list[tuple[object, float]]], list[dict]]:
+    """Rank every profile, ``prefiltered`` ones among their eligible vacancies; returns rankings and shard timings."""
+    prefiltered = set(prefiltered)
+    ranked: dict[Hashable, list[tuple[object, float]]] = {}
+    timings: list[dict] = []
+    workers = min(workers, len(profiles) // MIN_SHARD_USERS)
+    shards = shard_ranges(len(profiles), workers)
+    if workers <= 1 or len(shards) <= 1:
+        started = time.perf_counter()
+        _set_corpus(_load_corpus(), time.perf_counter() - started)
+        try:
+            for index, users in enumerate(shards):
+                shard_ranked, timing = _rank_shard(index, profiles[users.start : users.stop], limit, prefiltered)
+                ranked.update(shard_ranked)
+                timings.append(timing)
+        finally:
+            _set_corpus(None)
+        return ranked, timings
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(
+                _rank_shard,
+                index,
+                profiles[users.start : users.stop],
+                limit,
+                prefiltered.intersection(key for key, _ in profiles[users.start : users.stop]),
+            )
+            for index, users in enumerate(shards)
+        ]
+        for future in futures:
+            shard_ranked, timing = future.result()
+            ranked.update(shard_ranked)
+            timings.append(timing)
+    return ranked, timings
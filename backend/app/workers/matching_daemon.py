@@ -0,0 +1,319 @@
+"""Resident matching daemon: ``python -m app.workers.matching_daemon``."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+import logging
+import threading
+import time
+from typing import Collection, Sequence
+from uuid import UUID
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.models.models import Profile, User, Vacancy
+from app.services.corpus_stats import load_token_weights
+from app.services.job_stats import record_job_stats
+from app.services.match_daemon import (
+    DELTA_STREAM,
+    HEARTBEAT_KEY,
+    PROFILES,
+    REPLY_TTL_SECONDS,
+    REQUEST_QUEUE,
+    VACANCIES,
+    reply_key,
+)
+from app.services.match_engine import CorpusMatcher, CorpusVacancy, ScoringCorpus, load_corpus
+from app.services.matching import (
+    ProfileFeatures,
+    TokenWeights,
+    VacancyFeatures,
+    extract_profile_features,
+    stored_vacancy_features,
+)
+from app.services.vacancy_index import (
+    current_corpus_generation,
+    prefilter_candidates,
+    stream_vacancies,
+    vacancy_records,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BATCH_SIZE = 500
+COMPACT_THRESHOLD = 5000
+DELTA_READ_COUNT = 100
+REQUEST_POLL_SECONDS = 1
+HEARTBEAT_INTERVAL_SECONDS = 10
+ERROR_BACKOFF_SECONDS = 1
+MAX_ERROR_BACKOFF_SECONDS = 60
+
+
+class MatchingDaemon:
+    def __init__(self, redis_conn: redis.Redis):
+        self.redis = redis_conn
+        self.last_delta_id = "0-0"
+        self.generation = 0
+        self._generations: set[int] = set()
+        self.weights = TokenWeights()
+        self.profiles: dict[str, tuple[int, ProfileFeatures]] = {}
+        self._base: ScoringCorpus = ScoringCorpus([], [])
+        self._matcher = CorpusMatcher(self._base)
+        self._overlay: dict[object, tuple[CorpusVacancy, VacancyFeatures]] = {}
+        self._overlay_matcher: CorpusMatcher | None = None
+        self.stats = {
+            "load_seconds": 0.0,
+            "deltas_applied": 0,
+            "requests_served": 0,
+            "requests_expired": 0,
+            "requests_failed": 0,
+            "reloads": 0,
+            "errors": 0,
+        }
+
+    def load(self) -> None:
+        """Load corpus, token weights and profiles; deltas published meanwhile are replayed afterwards."""
+        started = time.perf_counter()
+        latest = self.redis.xrevrange(DELTA_STREAM, count=1)
+        self.last_delta_id = latest[0][0].decode() if latest else "0-0"
+        db = SessionLocal()
+        try:
+            # Read before the corpus, so the corpus is at least this generation.
+            self.generation = current_corpus_generation(db)
+            self._generations = set()
+            self.weights = load_token_weights(db)
+            self._base = load_corpus(db)
+            self._matcher = CorpusMatcher(self._base)
+            self._overlay = {}
+            self._overlay_matcher = None
+            self.profiles = {}
+            self._load_profiles(db, [user_id for (user_id,) in db.query(User.id)])
+        finally:
+            db.close()
+        self.stats["load_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info("Matching daemon loaded %d vacancies and %d profiles", self.corpus_size, len(self.profiles))
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self._matcher) + len(self._overlay)
+
+    def _load_profiles(self, db: Session, user_ids: Sequence) -> None:
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            chunk = [UUID(str(user_id)) for user_id in user_ids[start : start + BATCH_SIZE]]
+            profiles = {
+                profile.user_id: profile for profile in db.query(Profile).filter(Profile.user_id.in_(chunk))
+            }
+            for user_id in chunk:
+                profile = profiles.get(user_id)
+                version = (profile.version or 0) if profile else 0
+                self.profiles[str(user_id)] = (version, extract_profile_features(profile, weights=self.weights))
+
+    def _apply_vacancies(self, db: Session, vacancy_ids: Sequence) -> None:
+        # Vacancies that are gone or no longer canonical simply stay dropped.
+        self._matcher.drop(vacancy_ids)
+        for vacancy_id in vacancy_ids:
+            self._overlay.pop(vacancy_id, None)
+        for start in range(0, len(vacancy_ids), BATCH_SIZE):
+            chunk = vacancy_ids[start : start + BATCH_SIZE]
+            for record in stream_vacancies(vacancy_records(db).filter(Vacancy.id.in_(chunk))):
+                self._overlay[record.id] = (
+                    CorpusVacancy(record.id, record.remote, record.salary_max),
+                    stored_vacancy_features(record),
+                )
+        self._overlay_matcher = None
+        if len(self._overlay) > COMPACT_THRESHOLD:
+            self._compact()
+
+    def _compact(self) -> None:
+        vacancies, features = [], []
+        for position, dropped in enumerate(self._matcher.dropped):
+            if not dropped:
+                vacancies.append(self._base.vacancies[position])
+                features.append(self._base.features[position])
+        for vacancy, feature in self._overlay.values():
+            vacancies.append(vacancy)
+            features.append(feature)
+        self._base = ScoringCorpus(vacancies, features)
+        self._matcher = CorpusMatcher(self._base)
+        self._overlay = {}
+        self._overlay_matcher = None
+
+    def apply_deltas(self, block_ms: int | None = None) -> int:
+        entries = self.redis.xread({DELTA_STREAM: self.last_delta_id}, count=DELTA_READ_COUNT, block=block_ms)
+        if not entries:
+            return 0
+        vacancy_ids: list = []
+        user_ids: list = []
+        generations: list[int] = []
+        last_delta_id = self.last_delta_id
+        for _stream, messages in entries:
+            for message_id, fields in messages:
+                last_delta_id = message_id.decode()
+                try:
+                    ids = [str(UUID(item)) for item in json.loads(fields[b"ids"])]
+                    kind = fields[b"kind"].decode()
+                    generation = int(fields[b"generation"]) if b"generation" in fields else None
+                except (KeyError, TypeError, ValueError):
+                    logger.warning("Skipping malformed matching delta %s", last_delta_id)
+                    continue
+                if kind == VACANCIES:
+                    vacancy_ids.extend(ids)
+                    if generation is not None:
+                        generations.append(generation)
+                elif kind == PROFILES:
+                    user_ids.extend(ids)
+        db = SessionLocal()
+        try:
+            if vacancy_ids:
+                self._apply_vacancies(db, list(dict.fromkeys(UUID(vacancy_id) for vacancy_id in vacancy_ids)))
+            if user_ids:
+                self._load_profiles(db, list(dict.fromkeys(user_ids)))
+        finally:
+            db.close()
+        # Only once applied: a failed batch is read again after the back-off.
+        self.last_delta_id = last_delta_id
+        self._advance_generation(generations)
+        applied = sum(len(messages) for _stream, messages in entries)
+        self.stats["deltas_applied"] += applied
+        return applied
+
+    def _advance_generation(self, generations: Sequence[int]) -> None:
+        # Writers publish in commit order only roughly: advance over contiguous generations only.
+        self._generations.update(generation for generation in generations if generation > self.generation)
+        while self.generation + 1 in self._generations:
+            self.generation += 1
+            self._generations.discard(self.generation)
+
+    def drain_deltas(self) -> None:
+        while self.apply_deltas() >= DELTA_READ_COUNT:
+            pass
+
+    def rank(
+        self, profile: ProfileFeatures, limit: int, candidates: Collection | None = None
+    ) -> list[tuple[object, float]]:
+        ranked = self._matcher.top(profile, limit, candidates)
+        if self._overlay:
+            if self._overlay_matcher is None:
+                vacancies, features = zip(*self._overlay.values())
+                self._overlay_matcher = CorpusMatcher(ScoringCorpus(list(vacancies), list(features)))
+            overlay = self._overlay_matcher.top(profile, limit, candidates)
+            ranked = sorted(ranked + overlay, key=lambda pair: -pair[1])[:limit]
+        return ranked
+
+    def handle(self, request: dict) -> dict[str, list[tuple[str, float]]]:
+        """Rank the requested users, refreshing whatever the request shows to be stale."""
+        self.drain_deltas()
+        if request.get("generation", 0) > self.generation:
+            logger.warning(
+                "Matching daemon is at corpus generation %d, request wants %d; reloading",
+                self.generation,
+                request["generation"],
+            )
+            self.load()
+            self.stats["reloads"] += 1
+        stale_weights = request["stats_version"] != self.weights.version
+        users: list[tuple[str, int]] = [(user_id, version) for user_id, version in request["users"]]
+        stale_users = [user_id for user_id, version in users if self.profiles.get(user_id, (None,))[0] != version]
+        candidates: dict = {}
+        if stale_weights or stale_users or request.get("prefiltered"):
+            db = SessionLocal()
+            try:
+                if stale_weights:
+                    self.weights = load_token_weights(db)
+                    stale_users = list(dict.fromkeys([*self.profiles, *stale_users]))
+                self._load_profiles(db, stale_users)
+                prefiltered = [UUID(user_id) for user_id in request.get("prefiltered", [])]
+                candidates = {
+                    str(user_id): allowed for user_id, allowed in prefilter_candidates(db, prefiltered).items()
+                }
+            finally:
+                db.close()
+        return {
+            user_id: [
+                (str(vacancy_id), score)
+                for vacancy_id, score in self.rank(self.profiles[user_id][1], request["limit"], candidates.get(user_id))
+            ]
+            for user_id, _version in users
+        }
+
+    def serve_one(self, timeout: int = REQUEST_POLL_SECONDS) -> bool:
+        popped = self.redis.blpop([REQUEST_QUEUE], timeout=timeout)
+        if popped is None:
+            return False
+        try:
+            request = json.loads(popped[1])
+            request_id, deadline = request["id"], request["deadline"]
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Skipping malformed matching request")
+            self.stats["requests_failed"] += 1
+            return True
+        if deadline < time.time():
+            # The caller already fell back to scoring in-process.
+            self.stats["requests_expired"] += 1
+            return True
+        try:
+            rankings = self.handle(request)
+        except Exception:  # noqa: BLE001
+            logger.exception("Matching request %s failed", request_id)
+            self.stats["requests_failed"] += 1
+            # A null reply makes the caller score in-process now instead of at its deadline.
+            rankings = None
+        pipeline = self.redis.pipeline()
+        pipeline.rpush(reply_key(request_id), json.dumps(rankings))
+        pipeline.expire(reply_key(request_id), REPLY_TTL_SECONDS)
+        pipeline.execute()
+        if rankings is not None:
+            self.stats["requests_served"] += 1
+        return True
+
+    def publish_stats(self) -> None:
+        self.redis.set(HEARTBEAT_KEY, datetime.now(timezone.utc).isoformat())
+        record_job_stats(
+            "matching_daemon",
+            {
+                **self.stats,
+                "corpus_size": self.corpus_size,
+                "overlay_size": len(self._overlay),
+                "profiles": len(self.profiles),
+                "stats_version": self.weights.version,
+                "corpus_generation": self.generation,
+            },
+        )
+
+    def run(self, stop_event: threading.Event) -> None:
+        loaded = False
+        published = 0.0
+        backoff = ERROR_BACKOFF_SECONDS
+        while not stop_event.is_set():
+            try:
+                if not loaded:
+                    self.load()
+                    loaded = True
+                self.apply_deltas()
+                self.serve_one()
+                if time.monotonic() - published >= HEARTBEAT_INTERVAL_SECONDS:
+                    self.publish_stats()
+                    published = time.monotonic()
+                backoff = ERROR_BACKOFF_SECONDS
+            except Exception:  # noqa: BLE001
+                # Redis or database hiccup: keep the process up and retry.
+                logger.exception("Matching daemon iteration failed; retrying in %ss", backoff)
+                self.stats["errors"] += 1
+                stop_event.wait(backoff)
+                backoff = min(backoff * 2, MAX_ERROR_BACKOFF_SECONDS)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    if not settings.matching_daemon_enabled:
+        logger.warning("MATCHING_DAEMON_ENABLED is off; matching jobs will not send requests to this daemon")
+    MatchingDaemon(redis.from_url(settings.redis_url)).run(threading.Event())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-from datetime import datetime, timezone
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+import time
+from typing import Iterable
+import uuid
 
-from sqlalchemy.orm import Session
+from redis import Redis
+from rq import Queue, Retry, get_current_job
+from sqlalchemy import true
+from sqlalchemy.orm import Query, Session
 
-from app.core.database import SessionLocal
+from app.core.config import get_settings
+from app.core.database import SessionLocal, dialect_insert
 from app.models.models import (
     Document,
     DocumentStatus,
@@ -15,8 +23,39 @@ from app.models.models import (
     Vacancy,
 )
 from app.services.generation import generate_texts
-from app.services.matching import build_matches
+from app.services.job_stats import record_job_stats
+from app.services.match_daemon import request_rankings
+from app.services.match_runs import complete_chunk, resume_run, start_run
+from app.services.corpus_stats import load_token_weights, refresh_token_stats
+from app.services.matching import (
+    TokenWeights,
+    VacancyRecord,
+    build_matches,
+    extract_profile_features,
+    stored_vacancy_features,
+)
 from app.services.parsing import ParsingError, extract_text_from_file
+from app.services.profile_index import users_for_tokens
+from app.services.vacancy_index import (
+    active_filters,
+    bonus_reachable_vacancies,
+    current_corpus_generation,
+    overlapping_vacancies,
+    prefilter_clause,
+    stream_vacancies,
+    vacancy_records,
+)
+from app.workers.match_pool import rank_in_shards
+
+settings = get_settings()
+
+MATCH_LIMIT = 50
+VACANCY_BATCH_SIZE = 2000
+# Slack for ingestion transactions that committed after a run started but
+# stamped their rows before it.
+INCREMENTAL_LOOKBACK = timedelta(minutes=30)
+# Columns that make up a stored match; a row is rewritten only when one differs.
+MATCH_FIELDS = ("score", "explanation", "missing_skills", "matched_skills", "reasons", "tokens", "skill_gap_plan")
 
 
 def parse_document(document_id: str) -> None:
@@ -46,60 +85,421 @@ def parse_document(document_id: str) -> None:
         db.close()
 
 
-def compute_matches(user_id: str) -> None:
+def _top_matches(
+    db: Session, profile: Profile | None, weights: TokenWeights, clause=None
+) -> tuple[list[Match], int]:
+    """Top matches among the vacancies passing ``clause``, and how many candidates were scored."""
+    clause = true() if clause is None else clause
+    scored = 0
+
+    def candidates(query: Query) -> Iterable[VacancyRecord]:
+        nonlocal scored
+        for vacancy in stream_vacancies(query.filter(clause)):
+            scored += 1
+            yield vacancy
+
+    matches = build_matches(profile, candidates(overlapping_vacancies(db, profile)), limit=MATCH_LIMIT, weights=weights)
+    threshold = matches[-1].score if len(matches) >= MATCH_LIMIT else None
+    matches.extend(
+        build_matches(
+            profile,
+            candidates(bonus_reachable_vacancies(db, profile, threshold)),
+            limit=MATCH_LIMIT,
+            weights=weights,
+        )
+    )
+    return sorted(matches, key=lambda m: m.score, reverse=True)[:MATCH_LIMIT], scored
+
+
+def _load_vacancies(db: Session, vacancy_ids: Iterable) -> dict[object, VacancyRecord]:
+    vacancy_ids = list(vacancy_ids)
+    loaded = {}
+    for start in range(0, len(vacancy_ids), VACANCY_BATCH_SIZE):
+        chunk = vacancy_ids[start : start + VACANCY_BATCH_SIZE]
+        for vacancy in stream_vacancies(vacancy_records(db).filter(Vacancy.id.in_(chunk))):
+            loaded[vacancy.id] = vacancy
+    return loaded
+
+
+def _upsert_statement(db: Session):
+    statement = dialect_insert(db)(Match.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=[Match.user_id, Match.vacancy_id],
+        set_={field: statement.excluded[field] for field in MATCH_FIELDS},
+    )
+
+
+def _write_matches(db: Session, user_id, top_matches: list[Match]) -> int:
+    """Make ``top_matches`` the user's stored matches, writing only the difference; returns the rows written."""
+    stored = {
+        row.vacancy_id: row
+        for row in db.query(Match.vacancy_id, *[getattr(Match, field) for field in MATCH_FIELDS]).filter(
+            Match.user_id == user_id
+        )
+    }
+    wanted = {match.vacancy_id: match for match in top_matches}
+    dropped = [vacancy_id for vacancy_id in stored if vacancy_id not in wanted]
+    added = [vacancy_id for vacancy_id in wanted if vacancy_id not in stored]
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "vacancy_id": vacancy_id,
+            **{field: getattr(match, field) for field in MATCH_FIELDS},
+        }
+        for vacancy_id, match in wanted.items()
+        if vacancy_id not in stored
+        or any(getattr(stored[vacancy_id], field) != getattr(match, field) for field in MATCH_FIELDS)
+    ]
+    if dropped:
+        db.query(Match).filter(Match.user_id == user_id, Match.vacancy_id.in_(dropped)).delete(
+            synchronize_session=False
+        )
+    if rows:
+        db.execute(_upsert_statement(db), rows)
+    if added:
+        db.add(
+            Notification(
+                user_id=user_id,
+                type=NotificationType.matches,
+                title="New matches ready",
+                body=f"{len(added)} new matches for your profile.",
+            )
+        )
+    return len(rows) + len(dropped)
+
+
+def _profile_version(profile: Profile | None) -> int:
+    return (profile.version or 0) if profile else 0
+
+
+def _is_up_to_date(user: User, profile: Profile | None, generation: int, weights: TokenWeights) -> bool:
+    return (
+        user.last_matching_run_at is not None
+        and user.matched_profile_version == _profile_version(profile)
+        and user.matched_corpus_generation == generation
+        and (user.matched_stats_version or 0) == weights.version
+    )
+
+
+def _needs_full_recompute(user: User, profile: Profile | None, weights: TokenWeights) -> bool:
+    # Stored scores are only comparable with new ones under the same token weights.
+    return (
+        user.last_matching_run_at is None
+        or user.matched_profile_version != _profile_version(profile)
+        or (user.matched_stats_version or 0) != weights.version
+    )
+
+
+def _mark_matched(
+    user: User, profile: Profile | None, generation: int, weights: TokenWeights, started_at: datetime
+) -> None:
+    user.last_matching_run_at = started_at
+    user.matched_profile_version = _profile_version(profile)
+    user.matched_corpus_generation = generation
+    user.matched_stats_version = weights.version
+
+
+def _changed_vacancies(db: Session, since: datetime) -> Query:
+    return vacancy_records(db).filter(Vacancy.updated_at >= since - INCREMENTAL_LOOKBACK)
+
+
+def _merge_incremental(
+    db: Session, user: User, profile: Profile | None, changed: Iterable[VacancyRecord], weights: TokenWeights
+) -> int | None:
+    """Fold rescored changed vacancies into the stored matches; None when only a full rescore is exact."""
+    stored = db.query(Match).filter(Match.user_id == user.id).all()
+    if len(stored) < MATCH_LIMIT:
+        return None
+    threshold = min(match.score for match in stored)
+    cutoff = user.last_matching_run_at - INCREMENTAL_LOOKBACK
+    live = dict(
+        db.query(Vacancy.id, Vacancy.updated_at).filter(Vacancy.id.in_([match.vacancy_id for match in stored])).all()
+    )
+    kept = [match for match in stored if match.vacancy_id in live and live[match.vacancy_id] < cutoff]
+    fresh = build_matches(profile, changed, limit=MATCH_LIMIT, weights=weights)
+    merged = sorted(kept + fresh, key=lambda m: m.score, reverse=True)
+    if len(merged) < MATCH_LIMIT or merged[MATCH_LIMIT - 1].score < threshold:
+        return None
+    return _write_matches(db, user.id, merged[:MATCH_LIMIT])
+
+
+def compute_matches(user_id: str, force_full: bool = False) -> None:
     db: Session = SessionLocal()
     try:
+        started_at = datetime.now(timezone.utc)
+        generation = current_corpus_generation(db)
+        weights = load_token_weights(db)
         user = db.query(User).filter(User.id == user_id).first()
         profile = db.query(Profile).filter(Profile.user_id == user_id).first()
-        vacancies = db.query(Vacancy).all()
-        matches = build_matches(profile, vacancies)
-        db.query(Match).filter(Match.user_id == user_id).delete()
-        top_matches = sorted(matches, key=lambda m: m.score, reverse=True)[:50]
-        for match in top_matches:
-            match.user_id = user_id
-            db.add(match)
-        if top_matches:
-            db.add(
-                Notification(
-                    user_id=user_id,
-                    type=NotificationType.matches,
-                    title="New matches ready",
-                    body=f"{len(top_matches)} matches updated for your profile.",
-                )
-            )
+        if user and not force_full and _is_up_to_date(user, profile, generation, weights):
+            return
+        user_uuid = uuid.UUID(str(user_id))
+        clause = prefilter_clause(profile, active_filters(db, [user_uuid]).get(user_uuid, ()))
+        written = None
+        if user is not None and not force_full and not _needs_full_recompute(user, profile, weights):
+            changed = _changed_vacancies(db, user.last_matching_run_at).filter(clause)
+            written = _merge_incremental(db, user, profile, stream_vacancies(changed), weights)
+        if written is None:
+            top, _scored = _top_matches(db, profile, weights, clause)
+            _write_matches(db, user_uuid, top)
         if user:
-            user.last_matching_run_at = datetime.now(timezone.utc)
+            _mark_matched(user, profile, generation, weights, started_at)
         db.commit()
     finally:
         db.close()
 
 
-def compute_matches_for_all() -> None:
+def _rank_with_daemon(
+    users: list[User], profiles: dict, weights: TokenWeights, generation: int, prefiltered: set
+) -> dict[object, list[tuple[object, float]]] | None:
+    """Rankings from the resident matching daemon, or None to rank in-process."""
+    ranked = request_rankings(
+        [(user.id, _profile_version(profiles.get(user.id))) for user in users],
+        MATCH_LIMIT,
+        weights.version,
+        generation,
+        prefiltered=prefiltered,
+    )
+    if ranked is None:
+        return None
+    return {
+        user.id: [(uuid.UUID(vacancy_id), score) for vacancy_id, score in ranked.get(str(user.id), [])]
+        for user in users
+    }
+
+
+def _recompute_users(db: Session, users: list[User], force_full: bool) -> dict:
+    """Recompute matches of ``users`` and commit; returns the run stats."""
+    started_at = datetime.now(timezone.utc)
+    clock = time.perf_counter()
+    generation = current_corpus_generation(db)
+    weights = load_token_weights(db)
+    user_ids = [user.id for user in users]
+    profiles = {
+        profile.user_id: profile
+        for start in range(0, len(user_ids), VACANCY_BATCH_SIZE)
+        for profile in db.query(Profile).filter(Profile.user_id.in_(user_ids[start : start + VACANCY_BATCH_SIZE]))
+    }
+    clauses = {
+        user_id: prefilter_clause(profiles.get(user_id), filters)
+        for user_id, filters in active_filters(db, user_ids).items()
+    }
+    changed_since: dict[datetime, list[VacancyRecord]] = {}
+    skipped: list[User] = []
+    incremental: list[User] = []
+    full_users: list[User] = []
+    rows_written = 0
+    for user in users:
+        profile = profiles.get(user.id)
+        if not force_full and _is_up_to_date(user, profile, generation, weights):
+            skipped.append(user)
+        elif force_full or _needs_full_recompute(user, profile, weights):
+            full_users.append(user)
+        else:
+            since = user.last_matching_run_at
+            if user.id in clauses:
+                changed = list(stream_vacancies(_changed_vacancies(db, since).filter(clauses[user.id])))
+            else:
+                if since not in changed_since:
+                    changed_since[since] = list(stream_vacancies(_changed_vacancies(db, since)))
+                changed = changed_since[since]
+            written = _merge_incremental(db, user, profile, changed, weights)
+            if written is None:
+                full_users.append(user)
+            else:
+                incremental.append(user)
+                rows_written += written
+
+    # Users with active saved filters share the batch; each is ranked only among its eligible vacancies.
+    prefiltered = {user.id for user in full_users if user.id in clauses}
+    shard_timings: list[dict] = []
+    ranked_by = None
+    if full_users:
+        ranked = _rank_with_daemon(full_users, profiles, weights, generation, prefiltered)
+        ranked_by = "daemon"
+        if ranked is None:
+            ranked, shard_timings = rank_in_shards(
+                [(user.id, extract_profile_features(profiles.get(user.id), weights=weights)) for user in full_users],
+                limit=MATCH_LIMIT,
+                workers=settings.matching_workers,
+                prefiltered=prefiltered,
+            )
+            ranked_by = "pool"
+        survivors = _load_vacancies(db, {vacancy_id for pairs in ranked.values() for vacancy_id, _ in pairs})
+        for user in full_users:
+            top = [survivors[vacancy_id] for vacancy_id, _score in ranked[user.id] if vacancy_id in survivors]
+            rows_written += _write_matches(db, user.id, build_matches(profiles.get(user.id), top, weights=weights))
+    for user in incremental + full_users:
+        _mark_matched(user, profiles.get(user.id), generation, weights, started_at)
+    db.commit()
+
+    elapsed = time.perf_counter() - clock
+    rescored = len(incremental) + len(full_users)
+    return {
+        "started_at": started_at.isoformat(),
+        "duration_seconds": round(elapsed, 3),
+        "corpus_generation": generation,
+        "stats_version": weights.version,
+        "users_total": len(users),
+        "users_skipped": len(skipped),
+        "users_incremental": len(incremental),
+        "users_full": len(full_users),
+        "users_prefiltered": len(prefiltered),
+        "prefilter_candidates": sum(shard["prefilter_candidates"] for shard in shard_timings),
+        "prefilter_seconds": round(sum(shard["prefilter_seconds"] for shard in shard_timings), 3),
+        "rows_written": rows_written,
+        "estimated_seconds_saved": round(elapsed / rescored * len(skipped), 3) if rescored else 0.0,
+        "ranked_by": ranked_by,
+        "workers": settings.matching_workers,
+        "corpus_loads": len({shard["pid"] for shard in shard_timings}),
+        "corpus_load_seconds": round(
+            sum({shard["pid"]: shard["corpus_load_seconds"] for shard in shard_timings}.values()), 3
+        ),
+        "shards": shard_timings,
+    }
+
+
+def compute_matches_for_all(force_full: bool = False) -> None:
+    """Recompute every user in a single job; see ``coordinate_match_recompute``."""
     db: Session = SessionLocal()
     try:
-        users = db.query(User).all()
-        vacancies = db.query(Vacancy).all()
-        for user in users:
-            profile = db.query(Profile).filter(Profile.user_id == user.id).first()
-            matches = build_matches(profile, vacancies)
-            db.query(Match).filter(Match.user_id == user.id).delete()
-            top_matches = sorted(matches, key=lambda m: m.score, reverse=True)[:50]
-            for match in top_matches:
-                match.user_id = user.id
-                db.add(match)
-            if top_matches:
-                db.add(
-                    Notification(
-                        user_id=user.id,
-                        type=NotificationType.matches,
-                        title="New matches ready",
-                        body=f"{len(top_matches)} matches updated for your profile.",
-                    )
-                )
-            user.last_matching_run_at = datetime.now(timezone.utc)
-        db.commit()
+        refresh_token_stats(db)
+        record_job_stats("match_recompute", _recompute_users(db, db.query(User).all(), force_full))
+    finally:
+        db.close()
+
+
+def _split_at(user_ids: list[str], boundaries: list[str]) -> list[list[str]]:
+    chunks: list[list[str]] = [[] for _ in boundaries]
+    for user_id in user_ids:
+        chunks[max(0, bisect_right(boundaries, user_id) - 1)].append(user_id)
+    return chunks
+
+
+def coordinate_match_recompute(force_full: bool = False) -> str | None:
+    """Nightly recompute: fan users out over one retried RQ job per chunk; returns the run id."""
+    started_at = datetime.now(timezone.utc)
+    job = get_current_job()
+    # RQ retries keep the job id: a retried coordinator resumes its run and skips finished chunks.
+    run_id = job.id if job is not None else uuid.uuid4().hex
+    redis_conn = Redis.from_url(settings.redis_url)
+    resumed = resume_run(redis_conn, run_id)
+    db: Session = SessionLocal()
+    try:
+        if resumed is None:
+            # Publish drifted token statistics before fan-out so every chunk scores with the same weights.
+            refresh_token_stats(db)
+        user_ids = sorted(str(user_id) for (user_id,) in db.query(User.id))
+    finally:
+        db.close()
+    if resumed is None:
+        if not user_ids:
+            return None
+        # Each chunk job loads the corpus once per pool process: give every worker a full chunk.
+        size = max(1, settings.matching_chunk_size) * max(1, settings.matching_workers)
+        boundaries, done = user_ids[::size], set()
+        start_run(redis_conn, run_id, boundaries, started_at, force_full)
+    else:
+        boundaries, done = resumed
+    queue = Queue("default", connection=redis_conn)
+    for chunk_index, chunk in enumerate(_split_at(user_ids, boundaries)):
+        if chunk_index in done:
+            continue
+        queue.enqueue(
+            compute_matches_chunk,
+            run_id,
+            chunk_index,
+            chunk,
+            force_full=force_full,
+            retry=Retry(max=3, interval=[30, 60, 120]),
+        )
+    return run_id
+
+
+def compute_matches_chunk(run_id: str, chunk_index: int, user_ids: list[str], force_full: bool = False) -> None:
+    db: Session = SessionLocal()
+    try:
+        users = db.query(User).filter(User.id.in_(user_ids)).all()
+        stats = _recompute_users(db, users, force_full)
+    finally:
+        db.close()
+    summary = complete_chunk(Redis.from_url(settings.redis_url), run_id, chunk_index, stats)
+    if summary is not None:
+        record_job_stats("match_recompute", summary)
+
+
+def _push_vacancies(
+    db: Session, user: User, profile: Profile | None, vacancies: list[VacancyRecord], weights: TokenWeights
+) -> int:
+    """Merge new ``vacancies`` into up-to-date stored matches where they make the cut; returns the rows written."""
+    if (
+        user.last_matching_run_at is None
+        or user.matched_profile_version != _profile_version(profile)
+        or (user.matched_stats_version or 0) != weights.version
+    ):
+        return 0
+    stored = db.query(Match).filter(Match.user_id == user.id).all()
+    stored_ids = {match.vacancy_id for match in stored}
+    fresh = build_matches(
+        profile, [vacancy for vacancy in vacancies if vacancy.id not in stored_ids], limit=MATCH_LIMIT, weights=weights
+    )
+    if len(stored) >= MATCH_LIMIT:
+        floor = min(match.score for match in stored)
+        fresh = [match for match in fresh if match.score > floor]
+    if not fresh:
+        return 0
+    merged = sorted(stored + fresh, key=lambda m: m.score, reverse=True)
+    return _write_matches(db, user.id, merged[:MATCH_LIMIT])
+
+
+def match_new_vacancies(vacancy_ids: list[str]) -> None:
+    """Push freshly ingested vacancies into the matches of the users whose profile tokens overlap them."""
+    clock = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        weights = load_token_weights(db)
+        vacancies = list(_load_vacancies(db, [uuid.UUID(str(vacancy_id)) for vacancy_id in vacancy_ids]).values())
+        by_token: dict[str, list[VacancyRecord]] = {}
+        for vacancy in vacancies:
+            for token in stored_vacancy_features(vacancy).tokens:
+                by_token.setdefault(token, []).append(vacancy)
+        user_ids = users_for_tokens(db, by_token)
+        users_pushed = 0
+        rows_written = 0
+        for start in range(0, len(user_ids), VACANCY_BATCH_SIZE):
+            chunk = user_ids[start : start + VACANCY_BATCH_SIZE]
+            profiles = {profile.user_id: profile for profile in db.query(Profile).filter(Profile.user_id.in_(chunk))}
+            filters = active_filters(db, chunk)
+            for user in db.query(User).filter(User.id.in_(chunk)):
+                profile = profiles.get(user.id)
+                tokens = extract_profile_features(profile, weights=weights).tokens
+                overlapping = {vacancy.id for token in tokens for vacancy in by_token.get(token, [])}
+                if overlapping and user.id in filters:
+                    overlapping = {
+                        vacancy_id
+                        for (vacancy_id,) in db.query(Vacancy.id).filter(
+                            Vacancy.id.in_(overlapping), prefilter_clause(profile, filters[user.id])
+                        )
+                    }
+                candidates = [vacancy for vacancy in vacancies if vacancy.id in overlapping]
+                written = _push_vacancies(db, user, profile, candidates, weights)
+                if written:
+                    users_pushed += 1
+                    rows_written += written
+            db.commit()
     finally:
         db.close()
+    record_job_stats(
+        "match_new_vacancies",
+        {
+            "vacancies": len(vacancies),
+            "users_overlapping": len(user_ids),
+            "users_pushed": users_pushed,
+            "rows_written": rows_written,
+            "duration_seconds": round(time.perf_counter() - clock, 3),
+        },
+    )
 
 
 def generate_package(user_id: str, vacancy_id: str, language: str | None = None) -> None:
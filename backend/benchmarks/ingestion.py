@@ -0,0 +1,104 @@
+"""Vacancy ingestion benchmark: SQL round trips, throughput and memory per feed entry.
+
+Writes a ``csv_url`` feed of ``benchmarks.synthetic`` vacancies to a spooled
+body, as the fetch stage does, and ingests it into an empty source (all
+inserts), again unchanged and once more with every description edited (all
+updates), counting the statements sent to the database and the dedup lookups
+among them. Peak RSS should not grow with ``--entries``. Run from
+``backend/``::
+
+    python -m benchmarks.ingestion --entries 20000
+    python -m benchmarks.ingestion --database-url postgresql+psycopg2://...
+
+The database is dropped and recreated, so never point it at real data.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from datetime import datetime, timezone
+import io
+import os
+import time
+
+import httpx
+from sqlalchemy import event
+
+from benchmarks import synthetic
+from benchmarks.matching import _peak_rss_mb
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+FEED_URL = "https://feeds.example.com/vacancies.csv"
+COLUMNS = ("external_id", "title", "company", "location", "url", "description")
+
+
+def _feed(seed: int, entries: int, edited: bool = False):
+    from app.services.ingestion import Fetched
+
+    fetched = Fetched(
+        started_at=datetime.now(timezone.utc),
+        clock=time.perf_counter(),
+        response=httpx.Response(200, headers={"Content-Type": "text/csv; charset=utf-8"}),
+    )
+    text = io.TextIOWrapper(fetched.body, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(COLUMNS)
+    for row in synthetic.vacancies(seed, entries):
+        row["url"] = f"https://jobs.example.com/{row['external_id']}"
+        if edited:
+            row["description"] += ",\nupdated"
+        writer.writerow(row[column] for column in COLUMNS)
+    text.flush()
+    text.detach().seek(0)
+    return fetched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    args = parser.parse_args()
+
+    # The engine is created on import, so the database must be chosen first.
+    os.environ["DATABASE_URL"] = args.database_url
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.models import VacancySourceConfig, VacancySourceType
+    from app.services.ingestion import PARSERS
+
+    statements = lookups = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements, lookups
+        statements += 1
+        lookups += statement.lstrip().startswith("SELECT vacancies.") and "vacancies.external_id IN" in statement
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    phases = {"insert": False, "unchanged": False, "update": True}
+    db = SessionLocal()
+    try:
+        source = VacancySourceConfig(type=VacancySourceType.csv_url, name="benchmark", url=FEED_URL)
+        db.add(source)
+        db.commit()
+        for phase, edited in phases.items():
+            fetched = _feed(args.seed, args.entries, edited)
+            before, looked_up, started = statements, lookups, time.perf_counter()
+            inserted, updated, unchanged = PARSERS[source.type](db, source, fetched)
+            elapsed = time.perf_counter() - started
+            count = statements - before
+            print(
+                f"{phase:<9} entries={args.entries} inserted={inserted} updated={updated} unchanged={unchanged} "
+                f"lookups_per_entry={(lookups - looked_up) / args.entries:.4f} "
+                f"statements_per_entry={count / args.entries:.4f} entries_per_second={args.entries / elapsed:.1f} "
+                f"peak_rss_mb={_peak_rss_mb()}"
+            )
+            fetched.body.close()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
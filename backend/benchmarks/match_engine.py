@@ -0,0 +1,107 @@
+"""Throughput of the batch matcher against the per-pair scoring loop, and
+per-request latency of the in-memory preview matcher.
+
+Run from ``backend/``::
+
+    python -m benchmarks.match_engine --users 500 --vacancies 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import uuid
+
+from app.models.models import Profile, Vacancy
+import numpy as np
+
+from app.services.match_engine import BatchMatcher, CorpusMatcher, CorpusVacancy, ScoringCorpus
+from app.services.matching import extract_profile_features, extract_vacancy_features, score_features
+
+SKILLS = [
+    "python", "django", "fastapi", "kubernetes", "react", "typescript", "sql", "postgres", "aws", "gcp",
+    "terraform", "golang", "rust", "java", "spark", "airflow", "figma", "roadmap", "analytics", "docker",
+]
+TITLES = ["Backend Engineer", "Senior Data Engineer", "Junior Frontend Developer", "Product Manager", "Lead SRE"]
+CITIES = ["Berlin", "Munich", "Hamburg", "Vienna", "Remote", ""]
+
+
+def _profiles(rng: random.Random, count: int) -> list[Profile]:
+    return [
+        Profile(
+            desired_roles=[rng.choice(TITLES).lower()],
+            skills=rng.sample(SKILLS, 6),
+            languages={"en": "C1"} if rng.random() < 0.7 else None,
+            location=rng.choice(CITIES),
+            salary_min=rng.choice([None, 50000, 70000, 90000]),
+        )
+        for _ in range(count)
+    ]
+
+
+def _vacancies(rng: random.Random, count: int) -> list[Vacancy]:
+    return [
+        Vacancy(
+            id=uuid.uuid4(),
+            title=rng.choice(TITLES),
+            company="Acme",
+            location=rng.choice(CITIES),
+            remote=rng.random() < 0.3,
+            salary_max=rng.choice([None, 60000, 80000, 110000]),
+            description=" ".join(rng.sample(SKILLS, 8)) + rng.choice(["", " english b2"]),
+        )
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--vacancies", type=int, default=20000)
+    parser.add_argument("--loop-users", type=int, default=10, help="users scored by the reference loop")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    profiles = [extract_profile_features(profile) for profile in _profiles(rng, args.users)]
+    vacancies = _vacancies(rng, args.vacancies)
+    features = [extract_vacancy_features(vacancy) for vacancy in vacancies]
+
+    started = time.perf_counter()
+    for profile in profiles[: args.loop_users]:
+        for vacancy, feature in zip(vacancies, features):
+            score_features(profile, vacancy, feature)
+    loop_elapsed = time.perf_counter() - started
+    loop_pairs = min(args.loop_users, args.users) * len(vacancies)
+
+    started = time.perf_counter()
+    matcher = BatchMatcher(list(enumerate(profiles)), limit=50)
+    for start in range(0, len(vacancies), args.batch_size):
+        matcher.feed(vacancies[start : start + args.batch_size], features[start : start + args.batch_size])
+    matcher.results()
+    engine_elapsed = time.perf_counter() - started
+    engine_pairs = len(profiles) * len(vacancies)
+
+    corpus = ScoringCorpus(
+        [CorpusVacancy(vacancy.id, vacancy.remote, vacancy.salary_max) for vacancy in vacancies], features
+    )
+    started = time.perf_counter()
+    preview = CorpusMatcher(corpus)
+    build_elapsed = time.perf_counter() - started
+    latencies = []
+    for profile in profiles:
+        started = time.perf_counter()
+        preview.top(profile, 20)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+
+    print(f"score_features loop: {loop_pairs / loop_elapsed:,.0f} users x vacancies/sec")
+    print(f"BatchMatcher:        {engine_pairs / engine_elapsed:,.0f} users x vacancies/sec")
+    print(
+        f"CorpusMatcher:       built in {build_elapsed:.2f}s, top 20 p50 {np.percentile(latencies, 50):.1f} ms, "
+        f"p95 {np.percentile(latencies, 95):.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
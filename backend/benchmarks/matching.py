@@ -0,0 +1,232 @@
+"""End-to-end matching benchmark on a deterministic synthetic corpus.
+
+Seeds a throwaway database with ``benchmarks.synthetic`` users and vacancies
+(en/de/ru), then measures tokenization, per-pair scoring, the batch matcher
+and a full ``compute_matches_for_all`` run. Each phase reports wall time,
+CPU time, time spent executing SQL statements and peak RSS; the results are
+written as JSON so two runs can be compared. Run from ``backend/``::
+
+    python -m benchmarks.matching --users 1000 --vacancies 100000 --output bench.json
+    python -m benchmarks.matching --database-url postgresql+psycopg2://... --compare bench.json
+
+The database is dropped and recreated, so never point it at real data.
+"""
+
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Iterator
+
+from sqlalchemy import event, insert
+
+from benchmarks import synthetic
+
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+INSERT_BATCH_SIZE = 5000
+
+
+class Recorder:
+    """Wall, CPU and SQL statement time per phase, plus peak RSS after it."""
+
+    def __init__(self, engine) -> None:
+        self.db_seconds = 0.0
+        self.phases: dict[str, dict[str, Any]] = {}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            context._benchmark_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _stop(conn, cursor, statement, parameters, context, executemany):
+            self.db_seconds += time.perf_counter() - context._benchmark_started
+
+    @contextmanager
+    def phase(self, name: str, **extra: Any) -> Iterator[dict[str, Any]]:
+        result: dict[str, Any] = dict(extra)
+        wall, cpu, db = time.perf_counter(), time.process_time(), self.db_seconds
+        yield result
+        result["wall_seconds"] = round(time.perf_counter() - wall, 3)
+        result["cpu_seconds"] = round(time.process_time() - cpu, 3)
+        result["db_seconds"] = round(self.db_seconds - db, 3)
+        result["peak_rss_mb"] = _peak_rss_mb()
+        self.phases[name] = result
+        print(f"{name:<16} " + ", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS; pool processes count as children.
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    return round(peak * scale / 2**20, 1)
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _seed(recorder: Recorder, args) -> None:
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.models import Profile, User, Vacancy
+    from app.services.corpus_stats import publish_token_stats
+    from app.services.profile_index import reindex_profiles
+    from app.services.vacancy_index import reindex_all
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        with recorder.phase("insert", vacancies=args.vacancies, users=args.users):
+            batch: list[dict] = []
+            for row in synthetic.vacancies(args.seed, args.vacancies):
+                batch.append(row)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    db.execute(insert(Vacancy), batch)
+                    batch = []
+            if batch:
+                db.execute(insert(Vacancy), batch)
+            for index, profile in enumerate(synthetic.profiles(args.seed, args.users)):
+                user = User(email=f"bench-{index}@example.com", hashed_password="x")
+                db.add(user)
+                db.flush()
+                db.add(Profile(user_id=user.id, **profile))
+            db.commit()
+        with recorder.phase("index") as result:
+            started = time.perf_counter()
+            indexed = reindex_all(db)
+            publish_token_stats(db)
+            reindex_profiles(db)
+            db.commit()
+            result["vacancies_per_second"] = round(indexed / (time.perf_counter() - started), 1)
+    finally:
+        db.close()
+
+
+def _run(recorder: Recorder, args) -> None:
+    from app.core.database import SessionLocal
+    from app.models.models import Profile
+    from app.services.corpus_stats import load_token_weights
+    from app.services.match_engine import BatchMatcher, load_corpus
+    from app.services.matching import extract_profile_features, score_value
+    from app.services.tokenizer import tokenize_many
+    from app.workers import tasks
+
+    db = SessionLocal()
+    try:
+        texts = [row["description"] for row in synthetic.vacancies(args.seed, min(args.vacancies, 20000))]
+        with recorder.phase("tokenize", texts=len(texts)) as result:
+            started = time.perf_counter()
+            tokens = sum(map(len, tokenize_many(texts)))
+            result["tokens_per_second"] = round(tokens / (time.perf_counter() - started), 1)
+
+        with recorder.phase("load_corpus") as result:
+            corpus = load_corpus(db)
+            weights = load_token_weights(db)
+            result["vacancies"] = len(corpus.vacancies)
+        profiles = [
+            extract_profile_features(profile, weights=weights)
+            for profile in db.query(Profile).order_by(Profile.id).limit(args.users)
+        ]
+
+        sample = profiles[: args.loop_users]
+        with recorder.phase("score_value", users=len(sample)) as result:
+            started = time.perf_counter()
+            for profile in sample:
+                for vacancy, features in zip(corpus.vacancies, corpus.features):
+                    score_value(profile, vacancy, features)
+            pairs = len(sample) * len(corpus.vacancies)
+            result["vacancies_per_second"] = round(pairs / (time.perf_counter() - started), 1)
+
+        with recorder.phase("batch_matcher", users=len(profiles)) as result:
+            started = time.perf_counter()
+            matcher = BatchMatcher(list(enumerate(profiles)), limit=tasks.MATCH_LIMIT)
+            for start in range(0, len(corpus.vacancies), args.batch_size):
+                matcher.feed(
+                    corpus.vacancies[start : start + args.batch_size],
+                    corpus.features[start : start + args.batch_size],
+                )
+            matcher.results()
+            pairs = len(profiles) * len(corpus.vacancies)
+            result["vacancies_per_second"] = round(pairs / (time.perf_counter() - started), 1)
+        del corpus, matcher
+    finally:
+        db.close()
+
+    job_stats: list[dict] = []
+    tasks.record_job_stats = lambda name, stats: job_stats.append(stats)
+    with recorder.phase("recompute", workers=tasks.settings.matching_workers) as result:
+        tasks.compute_matches_for_all(force_full=True)
+        result["users"] = job_stats[-1]["users_total"]
+        result["rows_written"] = job_stats[-1]["rows_written"]
+
+
+def _compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    print(f"\nagainst {baseline_path} ({baseline['meta'].get('revision')}):")
+    for name, metrics in current["phases"].items():
+        previous = baseline["phases"].get(name, {})
+        for key, value in metrics.items():
+            old = previous.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                print(f"  {name}.{key:<22} {old:>12} -> {value:>12} ({value / old:.2f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--vacancies", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--loop-users", type=int, default=5, help="users scored by the per-pair loop")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="print the change against an earlier JSON result")
+    args = parser.parse_args()
+
+    # The engine is created on import, so the database must be chosen first.
+    os.environ["DATABASE_URL"] = args.database_url
+    from app.core.database import engine
+
+    recorder = Recorder(engine)
+    started = time.perf_counter()
+    _seed(recorder, args)
+    _run(recorder, args)
+    results = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "users": args.users,
+            "vacancies": args.vacancies,
+            "seed": args.seed,
+            "total_seconds": round(time.perf_counter() - started, 3),
+        },
+        "phases": recorder.phases,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
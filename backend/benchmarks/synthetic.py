@@ -0,0 +1,76 @@
+"""Deterministic synthetic users and vacancies in English, German and Russian.
+
+The same ``seed`` always yields the same rows, so benchmark runs on
+different commits score identical corpora. Vacancies are plain dicts ready
+for ``insert(Vacancy)``; profiles are dicts for ``insert(Profile)`` without
+``user_id``.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Iterator
+import uuid
+
+LOCALES = ("en", "de", "ru")
+
+SKILLS = [
+    "python", "django", "fastapi", "kubernetes", "react", "typescript", "sql", "postgres", "aws", "gcp",
+    "terraform", "golang", "rust", "java", "spark", "airflow", "figma", "roadmap", "analytics", "docker",
+    "kafka", "redis", "graphql", "pandas", "pytorch", "excel", "tableau", "jira", "scrum", "linux",
+]
+TITLES = {
+    "en": ["Backend Engineer", "Senior Data Engineer", "Junior Frontend Developer", "Product Manager", "Lead SRE"],
+    "de": ["Backend Entwickler", "Senior Dateningenieur", "Junior Frontend Entwickler", "Produktmanager", "Teamleiter DevOps"],
+    "ru": ["Backend разработчик", "Senior инженер данных", "Junior Frontend разработчик", "Менеджер продукта", "Lead DevOps"],
+}
+FILLER = {
+    "en": "we are a growing team building reliable products for customers across europe with a strong culture of ownership".split(),
+    "de": "wir sind ein wachsendes team und entwickeln zuverlässige produkte für kunden in ganz europa mit viel verantwortung".split(),
+    "ru": "мы растущая команда и создаём надёжные продукты для клиентов по всей европе с культурой ответственности".split(),
+}
+LEVELS = {"en": "english c1", "de": "deutsch b2", "ru": "английский b2"}
+CITIES = ["Berlin", "Munich", "Hamburg", "Vienna", "Moscow", "London", "Remote", None]
+COMPANIES = [f"Company {index}" for index in range(400)]
+
+
+def _description(rng: random.Random, locale: str) -> str:
+    words = rng.choices(FILLER[locale], k=rng.randint(30, 60)) + rng.sample(SKILLS, rng.randint(3, 8))
+    rng.shuffle(words)
+    if rng.random() < 0.4:
+        words.append(LEVELS[locale])
+    return " ".join(words)
+
+
+def vacancies(seed: int, count: int) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for index in range(count):
+        locale = LOCALES[index % len(LOCALES)]
+        salary_min = rng.choice([None, 40000, 55000, 70000, 90000])
+        yield {
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "external_id": f"bench-{index}",
+            "title": rng.choice(TITLES[locale]),
+            "company": rng.choice(COMPANIES),
+            "location": rng.choice(CITIES),
+            "remote": rng.random() < 0.3,
+            "salary_min": salary_min,
+            "salary_max": salary_min + rng.choice([10000, 20000, 30000]) if salary_min else None,
+            "currency": "EUR",
+            "description": _description(rng, locale),
+        }
+
+
+def profiles(seed: int, count: int) -> Iterator[dict]:
+    rng = random.Random(seed + 1)
+    for index in range(count):
+        locale = LOCALES[index % len(LOCALES)]
+        yield {
+            "full_name": f"Bench User {index}",
+            "location": rng.choice(CITIES),
+            "desired_roles": [rng.choice(TITLES[locale])],
+            "skills": rng.sample(SKILLS, rng.randint(4, 10)),
+            "languages": {"en": "C1"} if rng.random() < 0.7 else None,
+            "salary_min": rng.choice([None, 50000, 70000, 90000]),
+            "version": 1,
+        }
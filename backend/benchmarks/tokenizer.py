@@ -0,0 +1,83 @@
+"""Tokenizer throughput against the previous uncompiled, uncached implementation.
+
+Run from ``backend/``::
+
+    python -m benchmarks.tokenizer --texts 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from app.services.tokenizer import STOPWORDS, stem, tokenize, tokenize_many
+
+WORDS = {
+    "en": "senior backend engineer building scalable services with python postgres kubernetes and the team".split(),
+    "de": "wir suchen einen erfahrenen entwickler für die datenplattform und cloud infrastruktur".split(),
+    "ru": "ищем опытного разработчика для команды аналитиков с знанием python и sql".split(),
+}
+
+REFERENCE_STOPWORDS = {key: set(words) for key, words in STOPWORDS.items()}
+
+
+def _reference_stem(token: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) > len(suffix) + 2:
+            return token[: -len(suffix)]
+    for suffix in ("en", "er", "e", "n"):
+        if token.endswith(suffix) and len(token) > len(suffix) + 2:
+            return token[: -len(suffix)]
+    for suffix in ("ов", "ев", "ий", "ая", "ые", "ого", "ыми"):
+        if token.endswith(suffix) and len(token) > len(suffix) + 2:
+            return token[: -len(suffix)]
+    return token
+
+
+def reference_tokenize(text: str, locale: str | None = None) -> list[str]:
+    if not text:
+        return []
+    locale_key = (locale or "en").lower()
+    stopwords = REFERENCE_STOPWORDS.get(locale_key, REFERENCE_STOPWORDS["en"])
+    tokens = re.findall(r"[\w\-+#]+", text.lower())
+    cleaned = []
+    for token in tokens:
+        if token in stopwords or len(token) < 2:
+            continue
+        cleaned.append(_reference_stem(token))
+    return cleaned
+
+
+def _texts(rng: random.Random, locale: str, count: int) -> list[str]:
+    words = WORDS[locale]
+    return [" ".join(rng.choices(words, k=120)) for _ in range(count)]
+
+
+def _measure(label: str, run) -> None:
+    started = time.perf_counter()
+    tokens = run()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<16} {tokens / elapsed:>14,.0f} tokens/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=20000, help="texts per locale")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for locale in WORDS:
+        texts = _texts(rng, locale, args.texts)
+        assert [reference_tokenize(text, locale) for text in texts[:100]] == tokenize_many(texts[:100], locale)
+        stem.cache_clear()
+        print(f"{locale}: {len(texts)} texts")
+        _measure("reference", lambda: sum(len(reference_tokenize(text, locale)) for text in texts))
+        _measure("tokenize", lambda: sum(len(tokenize(text, locale)) for text in texts))
+        _measure("tokenize_many", lambda: sum(map(len, tokenize_many(texts, locale))))
+
+
+if __name__ == "__main__":
+    main()
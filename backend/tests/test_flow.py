@@ -15,7 +15,7 @@ from app.workers import tasks  # noqa: E402
 
 
 class DummyQueue:
-    def enqueue(self, func, *args, **kwargs):
+    def enqueue(self, func, *args, retry=None, **kwargs):
         func(*args, **kwargs)
 
 
@@ -0,0 +1,306 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+import functools
+import hashlib
+import os
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_LOCAL_STORAGE"] = "true"
+
+from app.api.admin import update_vacancy_source  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.models import Vacancy, VacancySourceConfig, VacancySourceType  # noqa: E402
+from app.schemas.schemas import VacancySourceIn  # noqa: E402
+from app.services import ingestion  # noqa: E402
+
+FEED_URL = "https://feeds.example.com/jobs.csv"
+
+
+@pytest.fixture(autouse=True)
+def setup_db(monkeypatch):
+    monkeypatch.setattr(ingestion, "enqueue_reverse_matching", lambda *_args: None)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _source(db, url: str = FEED_URL) -> VacancySourceConfig:
+    source = VacancySourceConfig(type=VacancySourceType.csv_url, name="Jobs", url=url)
+    db.add(source)
+    db.commit()
+    return source
+
+
+def _csv(rows: list[str], header: str = "external_id,title,company,location,url,description") -> ingestion.Fetched:
+    fetched = ingestion.Fetched(
+        started_at=datetime.now(timezone.utc),
+        clock=0.0,
+        response=httpx.Response(200, headers={"Content-Type": "text/csv; charset=utf-8"}),
+    )
+    fetched.body.write("\n".join([header, *rows]).encode("utf-8"))
+    fetched.body.seek(0)
+    return fetched
+
+
+def test_ingest_entries_resolves_keys_in_batched_lookups(monkeypatch):
+    monkeypatch.setattr(ingestion, "DEDUP_BATCH_SIZE", 10)
+    rows = [f"job-{index},Engineer {index},Acme,Berlin,https://jobs.example.com/{index},python" for index in range(25)]
+    lookups = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT vacancies.") and "vacancies.external_id IN" in statement:
+            lookups.append(statement)
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        source = _source(db)
+        inserted, updated, _unchanged = ingestion.PARSERS[source.type](db, source, _csv(rows))
+        assert (inserted, updated, len(lookups)) == (25, 0, 3)
+
+        edited = [f"{row} django" for row in rows[:12]]
+        inserted, updated, _unchanged = ingestion.PARSERS[source.type](db, source, _csv(edited))
+        assert (inserted, updated, len(lookups)) == (0, 12, 5)
+        assert db.query(Vacancy).count() == 25
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+        db.close()
+
+
+def test_ingest_entries_dedups_within_a_feed_and_per_source():
+    db = SessionLocal()
+    try:
+        first = _source(db)
+        second = _source(db, "https://other.example.com/jobs.csv")
+        # No external id: entries are keyed by company, title, location and url.
+        rows = [
+            "Engineer,Acme,Berlin,https://jobs.example.com/1,old",
+            "Engineer,Acme,Berlin,https://jobs.example.com/1,new",
+        ]
+        header = "title,company,location,url,description"
+        inserted, updated, unchanged = ingestion.PARSERS[first.type](db, first, _csv(rows, header))
+        assert (inserted, updated, unchanged) == (1, 0, 0)
+        assert db.query(Vacancy).one().description == "new"
+
+        inserted, updated, unchanged = ingestion.PARSERS[second.type](db, second, _csv(rows, header))
+        assert (inserted, updated, unchanged) == (1, 0, 0)
+        assert db.query(Vacancy).filter(Vacancy.source_id == second.id).count() == 1
+    finally:
+        db.close()
+
+
+def test_ingest_entries_leaves_unchanged_vacancies_alone():
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        rows = [
+            "job-1,Data Engineer,Acme,Berlin,https://jobs.example.com/1,python",
+            "job-2,Designer,Acme,Berlin,,figma",
+        ]
+        ingestion.PARSERS[source.type](db, source, _csv(rows))
+        stamps = dict(db.query(Vacancy.external_id, Vacancy.updated_at))
+
+        # Whitespace differences normalize to the same content hash.
+        rows = [
+            "job-1,Data  Engineer,Acme,Berlin,https://jobs.example.com/1,python",
+            "job-2,Designer,Acme,Munich,,figma",
+        ]
+        inserted, updated, unchanged = ingestion.PARSERS[source.type](db, source, _csv(rows))
+        assert (inserted, updated, unchanged) == (0, 1, 1)
+        db.expire_all()
+        assert db.query(Vacancy.location).filter(Vacancy.external_id == "job-2").scalar() == "Munich"
+        assert db.query(Vacancy.updated_at).filter(Vacancy.external_id == "job-1").scalar() == stamps["job-1"]
+    finally:
+        db.close()
+
+
+def test_csv_entries_parse_quoted_fields_and_commit_in_chunks(monkeypatch):
+    monkeypatch.setattr(ingestion, "DEDUP_BATCH_SIZE", 2)
+    monkeypatch.setattr(ingestion.settings, "ingestion_commit_rows", 4)
+    commits = []
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        monkeypatch.setattr(db, "commit", lambda original=db.commit: commits.append(1) or original())
+        rows = ['job-0,"Engineer, Backend",Acme,Berlin,,"Python\nand ""SQL"""']
+        rows += [f"job-{index},Engineer {index},Acme,Berlin,," for index in range(1, 9)]
+        inserted, updated, unchanged = ingestion.PARSERS[source.type](db, source, _csv(rows))
+        assert (inserted, updated, unchanged, len(commits)) == (9, 0, 0, 3)
+        vacancy = db.query(Vacancy).filter(Vacancy.external_id == "job-0").one()
+        assert (vacancy.title, vacancy.description) == ("Engineer, Backend", 'Python\nand "SQL"')
+    finally:
+        db.close()
+
+
+def test_store_skips_an_unchanged_body():
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        rows = ["job-1,Engineer,Acme,Berlin,,python"]
+        fetched = _csv(rows)
+        fetched.content_hash = "same"
+        run = ingestion._store(db, source, fetched)
+        assert (run.status, run.inserted_count) == ("success", 1)
+        assert run.rows_per_second > 0
+        assert source.content_hash == "same"
+
+        fetched = _csv(rows)
+        fetched.content_hash = "same"
+        fetched.response.headers["ETag"] = '"v2"'
+        run = ingestion._store(db, source, fetched)
+        assert (run.status, run.inserted_count) == (ingestion.SKIPPED, 0)
+        assert (source.etag, source.content_hash) == ('"v2"', "same")
+    finally:
+        db.close()
+
+
+def test_fetch_streams_the_body_and_sends_validators():
+    body = b"external_id,title\njob-1,Engineer\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"ETag": '"v1"'})
+
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            fetched = ingestion._fetch(client, source)
+        assert (fetched.error, fetched.body.read()) == (None, body)
+        assert fetched.content_hash == hashlib.sha256(body).hexdigest()
+
+        source.etag = '"v1"'
+
+        async def fetch_async() -> ingestion.Fetched:
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await ingestion._fetch_async(client, source, {}, asyncio.Semaphore(1))
+
+        fetched = asyncio.run(fetch_async())
+        assert fetched.error is None and fetched.not_modified
+        assert ingestion._store(db, source, fetched).status == ingestion.SKIPPED
+    finally:
+        db.close()
+
+
+def test_fetch_sends_both_validators_and_skips_a_304():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")))
+        return httpx.Response(304)
+
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        source.etag, source.last_modified, source.content_hash = '"v1"', "Fri, 16 Oct 2026 08:00:00 GMT", "hash"
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            fetched = ingestion._fetch(client, source)
+        assert seen == [('"v1"', "Fri, 16 Oct 2026 08:00:00 GMT")]
+        run = ingestion._store(db, source, fetched)
+        assert (run.status, run.inserted_count) == (ingestion.SKIPPED, 0)
+        assert (source.etag, source.content_hash) == ('"v1"', "hash")
+        assert db.query(Vacancy).count() == 0
+    finally:
+        db.close()
+
+
+def test_store_remembers_validators_only_after_a_successful_parse(monkeypatch):
+    def fetched() -> ingestion.Fetched:
+        result = _csv(["job-1,Engineer,Acme,Berlin,,python"])
+        result.response.headers.update({"ETag": '"v2"', "Last-Modified": "Fri, 16 Oct 2026 09:00:00 GMT"})
+        result.content_hash = "new"
+        return result
+
+    parse = ingestion.PARSERS[VacancySourceType.csv_url]
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        monkeypatch.setitem(ingestion.PARSERS, VacancySourceType.csv_url, lambda *_args: 1 / 0)
+        assert ingestion._store(db, source, fetched()).status == "failed"
+        assert (source.etag, source.last_modified, source.content_hash) == (None, None, None)
+
+        monkeypatch.setitem(ingestion.PARSERS, VacancySourceType.csv_url, parse)
+        assert ingestion._store(db, source, fetched()).status == "success"
+        assert (source.etag, source.last_modified, source.content_hash) == (
+            '"v2"',
+            "Fri, 16 Oct 2026 09:00:00 GMT",
+            "new",
+        )
+    finally:
+        db.close()
+
+
+def test_update_vacancy_source_clears_validators_when_parsing_changes():
+    db = SessionLocal()
+    try:
+        source = _source(db)
+        source.etag, source.last_modified, source.content_hash = '"v1"', "Fri, 16 Oct 2026 08:00:00 GMT", "hash"
+        db.commit()
+        payload = {"type": VacancySourceType.csv_url, "name": "Renamed", "url": FEED_URL}
+        update_vacancy_source(str(source.id), VacancySourceIn(**payload), db, None)
+        assert (source.etag, source.content_hash) == ('"v1"', "hash")
+
+        payload["url"] = "https://feeds.example.com/other.csv"
+        update_vacancy_source(str(source.id), VacancySourceIn(**payload), db, None)
+        assert (source.etag, source.last_modified, source.content_hash) == (None, None, None)
+    finally:
+        db.close()
+
+
+def test_ingest_enabled_sources_caps_concurrency_globally_and_per_host(monkeypatch):
+    monkeypatch.setattr(ingestion.settings, "ingestion_concurrency", 4)
+    monkeypatch.setattr(ingestion.settings, "ingestion_host_concurrency", 2)
+    in_flight: Counter = Counter()
+    peaks: Counter = Counter()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight[request.url.host] += 1
+        in_flight["total"] += 1
+        peaks.update({key: 0 for key in in_flight})
+        for key, count in in_flight.items():
+            peaks[key] = max(peaks[key], count)
+        await asyncio.sleep(0.1)
+        in_flight[request.url.host] -= 1
+        in_flight["total"] -= 1
+        return httpx.Response(200, content=f"external_id,title\n{request.url.path},Engineer\n".encode())
+
+    stats = []
+    monkeypatch.setattr(ingestion, "record_job_stats", lambda name, values: stats.append(values))
+    monkeypatch.setattr(
+        ingestion.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    )
+    db = SessionLocal()
+    try:
+        for index, host in enumerate("aaabab"):
+            _source(db, f"https://{host}.example.com/{index}.csv")
+    finally:
+        db.close()
+
+    results = ingestion.ingest_enabled_sources()
+    assert [result["status"] for result in results] == ["success"] * 6
+    assert (peaks["total"], peaks["a.example.com"], peaks["b.example.com"]) == (4, 2, 2)
+    # Sources queued behind their host are not charged for the wait.
+    assert all(0.1 <= result["fetch_seconds"] < 0.18 for result in results)
+    assert all(result["duration_seconds"] >= result["fetch_seconds"] for result in results)
+    assert stats[-1]["sources"] == 6 and stats[-1]["failed"] == 0
+
+
+def test_ingest_concurrently_reports_a_failing_source():
+    db = SessionLocal()
+    try:
+        _source(db)
+    finally:
+        db.close()
+    # Deleted mid-run: the store stage cannot load it again.
+    missing = VacancySourceConfig(id=uuid.uuid4(), type=VacancySourceType.csv_url, name="Gone", url=None)
+    results = asyncio.run(ingestion._ingest_concurrently([missing]))
+    assert results[0]["source_id"] == str(missing.id)
+    assert results[0]["status"] == "failed"
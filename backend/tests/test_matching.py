@@ -0,0 +1,1235 @@
+import io
+import os
+import random
+import resource
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi import UploadFile
+import pytest
+from redis.exceptions import RedisError
+from rq.utils import import_attribute
+from sqlalchemy import event, func, insert
+
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_LOCAL_STORAGE"] = "true"
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.models import (  # noqa: E402
+    CorpusState,
+    Match,
+    Notification,
+    Profile,
+    SavedFilter,
+    User,
+    Vacancy,
+    VacancySource,
+    VacancyToken,
+    VacancyTokenStat,
+)
+from app.services.match_engine import BatchMatcher  # noqa: E402
+from app.services import corpus_stats, ingestion, matching  # noqa: E402
+from app.services.corpus_stats import load_token_weights, publish_token_stats, refresh_token_stats  # noqa: E402
+from app.api import vacancies as vacancies_api  # noqa: E402
+from app.api.matching import preview_matches  # noqa: E402
+from app.services.match_preview import preview_cache  # noqa: E402
+from app.services.match_daemon import (  # noqa: E402
+    HEARTBEAT_KEY,
+    PROFILES,
+    REQUEST_QUEUE,
+    VACANCIES,
+    publish_deltas,
+    request_rankings,
+)
+from app.services.near_duplicates import minhash, similarity  # noqa: E402
+from app.services.profile_index import index_profile, reindex_profiles  # noqa: E402
+from app.services.matching import (  # noqa: E402
+    TokenWeights,
+    build_match_detail,
+    build_matches,
+    extract_profile_features,
+    extract_vacancy_features,
+    score_features,
+    score_vacancy,
+    score_value,
+    stored_vacancy_features,
+    within_salary_floor,
+)
+from app.services.vacancy_index import (  # noqa: E402
+    BATCH_SIZE,
+    index_vacancies,
+    reindex_all,
+    remove_from_index,
+    stream_vacancies,
+    vacancy_records,
+)
+from app.workers import match_pool, matching_daemon, tasks  # noqa: E402
+from app.workers.matching_daemon import MatchingDaemon  # noqa: E402
+
+TITLES = ["Backend Engineer", "Senior Data Scientist", "Junior Frontend Developer", "Product Manager", "Lead DevOps"]
+WORDS = ["python", "django", "kubernetes", "react", "sql", "roadmap", "figma", "golang", "aws", "b2", "c1", "team"]
+LOCATIONS = ["Berlin", "Munich", "Remote", None]
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _seed(db, count: int, seed: int = 7) -> User:
+    rng = random.Random(seed)
+    vacancies = [
+        Vacancy(
+            title=rng.choice(TITLES),
+            company=rng.choice(["Acme", "Globex", None]),
+            location=rng.choice(LOCATIONS),
+            remote=rng.random() < 0.3,
+            salary_max=rng.choice([None, 50000, 90000]),
+            description=" ".join(rng.sample(WORDS, rng.randint(0, 5))),
+            source=VacancySource.manual,
+        )
+        for _ in range(count)
+    ]
+    db.add_all(vacancies)
+    index_vacancies(db, vacancies)
+    user = User(email="match@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(
+        Profile(
+            user_id=user.id,
+            location="Berlin",
+            desired_roles=["Backend Engineer"],
+            skills=["Python", "SQL"],
+            languages={"en": "native"},
+            salary_min=60000,
+        )
+    )
+    db.commit()
+    return user
+
+
+def test_compute_matches_pruning_keeps_top_matches():
+    db = SessionLocal()
+    try:
+        user = _seed(db, 300)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        expected = sorted(build_matches(profile, db.query(Vacancy).all()), key=lambda m: m.score, reverse=True)
+
+        tasks.compute_matches(str(user.id))
+
+        stored = db.query(Match).filter(Match.user_id == user.id).all()
+        assert sorted(m.score for m in stored) == sorted(m.score for m in expected[: tasks.MATCH_LIMIT])
+        cutoff = expected[tasks.MATCH_LIMIT - 1].score
+        assert {m.vacancy_id for m in stored if m.score > cutoff} == {
+            m.vacancy_id for m in expected if m.score > cutoff
+        }
+    finally:
+        db.close()
+
+
+def test_stored_features_match_fresh_extraction():
+    db = SessionLocal()
+    try:
+        user = _seed(db, 40)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        for vacancy in db.query(Vacancy).all():
+            assert vacancy.features is not None
+            assert stored_vacancy_features(vacancy) == extract_vacancy_features(vacancy)
+            assert score_vacancy(profile, vacancy) == score_vacancy(profile, vacancy, locale="en")
+    finally:
+        db.close()
+
+
+def test_batch_matcher_scores_match_score_vacancy():
+    rng = random.Random(11)
+    vacancies = [
+        Vacancy(
+            id=uuid.uuid4(),
+            title=rng.choice(TITLES),
+            company=rng.choice(["Acme", None]),
+            location=rng.choice(LOCATIONS),
+            remote=rng.random() < 0.3,
+            salary_max=rng.choice([None, 50000, 90000]),
+            description=" ".join(rng.sample(WORDS, rng.randint(0, 5))),
+        )
+        for _ in range(120)
+    ]
+    profiles = [
+        None,
+        Profile(desired_roles=["engineer"], skills=["Python", "AWS"], location="berlin", salary_min=60000),
+        Profile(desired_roles=["Product Manager", "lead"], skills=["Figma"], languages={"de": "B2"}),
+        Profile(skills=["react", "sql", "golang"], location="Munich", languages={"en": "C1"}, salary_min=95000),
+    ]
+    matcher = BatchMatcher(
+        [(index, extract_profile_features(profile)) for index, profile in enumerate(profiles)],
+        limit=len(vacancies),
+    )
+    matcher.feed(vacancies[:50])
+    matcher.feed(vacancies[50:])
+
+    for index, ranked in matcher.results().items():
+        features = extract_profile_features(profiles[index])
+        expected = {
+            vacancy.id: score_vacancy(profiles[index], vacancy)[0]
+            for vacancy in vacancies
+            if within_salary_floor(features, vacancy)
+        }
+        assert dict(ranked) == expected
+        assert [score for _, score in ranked] == sorted(expected.values(), reverse=True)
+
+
+def test_compute_matches_for_all_keeps_top_matches():
+    db = SessionLocal()
+    try:
+        user = _seed(db, 300)
+        assert refresh_token_stats(db)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        weights = load_token_weights(db)
+        expected = sorted(
+            build_matches(profile, db.query(Vacancy).all(), weights=weights), key=lambda m: m.score, reverse=True
+        )
+
+        tasks.compute_matches_for_all()
+
+        stored = db.query(Match).filter(Match.user_id == user.id).all()
+        assert sorted(m.score for m in stored) == sorted(m.score for m in expected[: tasks.MATCH_LIMIT])
+        assert all(m.reasons for m in stored)
+    finally:
+        db.close()
+
+
+def test_build_matches_limit_keeps_best_in_order():
+    db = SessionLocal()
+    try:
+        user = _seed(db, 200)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        vacancies = db.query(Vacancy).all()
+        full = build_matches(profile, vacancies)
+        assert [m.score for m in full] == sorted((m.score for m in full), reverse=True)
+
+        limited = build_matches(profile, vacancies, limit=20)
+
+        assert [(m.vacancy_id, m.score) for m in limited] == [(m.vacancy_id, m.score) for m in full[:20]]
+        assert [m.reasons for m in limited] == [m.reasons for m in full[:20]]
+        profile_features = extract_profile_features(profile)
+        for vacancy in vacancies:
+            features = stored_vacancy_features(vacancy)
+            assert score_value(profile_features, vacancy, features) == score_features(
+                profile_features, vacancy, features
+            )[0]
+    finally:
+        db.close()
+
+
+def test_compute_matches_merges_changed_vacancies_incrementally():
+    db = SessionLocal()
+    try:
+        user = _seed(db, 300)
+        tasks.compute_matches(str(user.id))
+        day = timedelta(days=1)
+        now = datetime.now(timezone.utc)
+        db.query(Vacancy).update({Vacancy.updated_at: now - 2 * day}, synchronize_session=False)
+        db.query(Profile).update({Profile.updated_at: now - 2 * day}, synchronize_session=False)
+        db.query(User).update({User.last_matching_run_at: now - day}, synchronize_session=False)
+        db.commit()
+        before = {m.vacancy_id: m.id for m in db.query(Match).filter(Match.user_id == user.id)}
+        fresh = [
+            Vacancy(
+                title="Backend Engineer",
+                location="Berlin",
+                remote=True,
+                salary_max=90000,
+                description="python sql senior c1",
+                source=VacancySource.manual,
+            )
+            for _ in range(5)
+        ]
+        db.add_all(fresh)
+        index_vacancies(db, fresh)
+        db.commit()
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        expected = sorted(build_matches(profile, db.query(Vacancy).all()), key=lambda m: m.score, reverse=True)
+
+        tasks.compute_matches(str(user.id))
+
+        stored = db.query(Match).filter(Match.user_id == user.id).all()
+        assert sorted(m.score for m in stored) == sorted(m.score for m in expected[: tasks.MATCH_LIMIT])
+        assert {vacancy.id for vacancy in fresh} <= {m.vacancy_id for m in stored}
+        kept = [m for m in stored if m.vacancy_id in before]
+        assert kept and all(before[m.vacancy_id] == m.id for m in kept)
+    finally:
+        db.close()
+
+
+def test_compute_matches_for_all_skips_unchanged_users(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        _seed(db, 80)
+        tasks.compute_matches_for_all()
+        tasks.compute_matches_for_all()
+        assert [(stats["users_full"], stats["users_skipped"]) for stats in recorded] == [(1, 0), (0, 1)]
+
+        profile = db.query(Profile).first()
+        profile.version += 1
+        db.commit()
+        tasks.compute_matches_for_all()
+        assert (recorded[-1]["users_full"], recorded[-1]["users_skipped"]) == (1, 0)
+    finally:
+        db.close()
+
+
+def test_compute_matches_for_all_in_process_pool(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    monkeypatch.setattr(tasks.settings, "matching_workers", 2)
+    monkeypatch.setattr(match_pool, "MIN_SHARD_USERS", 1)
+    db = SessionLocal()
+    try:
+        first = _seed(db, 150)
+        second = User(email="second@example.com", hashed_password="x")
+        db.add(second)
+        db.flush()
+        db.add(Profile(user_id=second.id, desired_roles=["Product Manager"], skills=["Figma", "Roadmap"]))
+        db.commit()
+        refresh_token_stats(db)
+        weights = load_token_weights(db)
+        expected = {}
+        for user in (first, second):
+            profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+            ranked = sorted(
+                build_matches(profile, db.query(Vacancy).all(), weights=weights), key=lambda m: m.score, reverse=True
+            )
+            expected[user.id] = sorted(m.score for m in ranked[: tasks.MATCH_LIMIT])
+
+        tasks.compute_matches_for_all()
+
+        for user in (first, second):
+            stored = db.query(Match).filter(Match.user_id == user.id).all()
+            assert sorted(m.score for m in stored) == expected[user.id]
+        assert len(recorded[-1]["shards"]) == 2
+        assert all(shard["pid"] != os.getpid() for shard in recorded[-1]["shards"])
+        assert recorded[-1]["corpus_loads"] == 2 and recorded[-1]["corpus_load_seconds"] > 0
+
+        # Too few users to pay for a corpus load per process: rank in-process.
+        monkeypatch.setattr(match_pool, "MIN_SHARD_USERS", 50)
+        tasks.compute_matches_for_all(force_full=True)
+        assert [shard["pid"] for shard in recorded[-1]["shards"]] == [os.getpid()]
+        assert recorded[-1]["corpus_loads"] == 1
+    finally:
+        db.close()
+
+
+def test_vacancy_records_score_like_orm_rows():
+    db = SessionLocal()
+    try:
+        user = _seed(db, 40)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        records = {record.id: record for record in stream_vacancies(vacancy_records(db), batch_size=7)}
+        vacancies = db.query(Vacancy).all()
+        assert set(records) == {vacancy.id for vacancy in vacancies}
+        for vacancy in vacancies:
+            assert records[vacancy.id].features == stored_vacancy_features(vacancy)
+            assert score_vacancy(profile, records[vacancy.id]) == score_vacancy(profile, vacancy)
+        from_records = build_matches(profile, records.values(), limit=10)
+        from_rows = build_matches(profile, vacancies, limit=10)
+        assert [(m.vacancy_id, m.score) for m in from_records] == [(m.vacancy_id, m.score) for m in from_rows]
+    finally:
+        db.close()
+
+
+def test_recompute_writes_only_changed_matches(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        user = _seed(db, 80)
+        tasks.compute_matches_for_all()
+        before = {m.vacancy_id: m.id for m in db.query(Match).filter(Match.user_id == user.id)}
+        notifications = db.query(Notification).filter(Notification.user_id == user.id).count()
+        assert recorded[-1]["rows_written"] == len(before) == tasks.MATCH_LIMIT
+
+        tasks.compute_matches_for_all(force_full=True)
+        assert recorded[-1]["rows_written"] == 0
+        assert db.query(Notification).filter(Notification.user_id == user.id).count() == notifications
+
+        top = db.query(Match).filter(Match.user_id == user.id).order_by(Match.score.desc()).first()
+        vacancy = db.get(Vacancy, top.vacancy_id)
+        vacancy.remote = not vacancy.remote
+        db.commit()
+        tasks.compute_matches_for_all(force_full=True)
+        db.expire_all()
+        after = {m.vacancy_id: m.id for m in db.query(Match).filter(Match.user_id == user.id)}
+        assert recorded[-1]["rows_written"] == 1
+        assert after == before
+    finally:
+        db.close()
+
+
+def test_csv_upload_pushes_vacancies_to_backfilled_profiles(monkeypatch):
+    jobs = []
+    monkeypatch.setattr(ingestion, "Queue", lambda *args, **kwargs: RetryingQueue(jobs))
+    monkeypatch.setattr(ingestion.Redis, "from_url", staticmethod(lambda _url: FakeRedis()))
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: None)
+    db = SessionLocal()
+    try:
+        user = _seed(db, 20)
+        # Profiles saved before the reverse index existed have no tokens yet.
+        assert reindex_profiles(db) == 1
+        db.commit()
+        tasks.compute_matches_for_all()
+        upload = UploadFile(
+            io.BytesIO(b"title,location,remote,description\nBackend Engineer,Berlin,true,python sql\n"),
+            filename="vacancies.csv",
+        )
+        (created,) = vacancies_api.import_csv(file=upload, db=db, _user=user)
+        assert jobs == [(([str(created.id)],), {})]
+        assert db.query(Match).filter(Match.user_id == user.id, Match.vacancy_id == created.id).count() == 1
+    finally:
+        db.close()
+
+
+def test_new_vacancy_is_pushed_to_overlapping_users(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        user = _seed(db, 80)
+        designer = User(email="design@example.com", hashed_password="x")
+        db.add(designer)
+        db.flush()
+        db.add(Profile(user_id=designer.id, desired_roles=["Illustrator"], skills=["Watercolor"]))
+        db.flush()
+        for profile in db.query(Profile):
+            index_profile(db, profile)
+        db.commit()
+        tasks.compute_matches_for_all()
+        notifications = db.query(Notification).filter(Notification.user_id == user.id).count()
+
+        vacancy = Vacancy(
+            title="Backend Engineer",
+            description="python sql",
+            location="Berlin",
+            remote=True,
+            salary_max=90000,
+            source=VacancySource.manual,
+        )
+        db.add(vacancy)
+        index_vacancies(db, [vacancy])
+        db.commit()
+        tasks.match_new_vacancies([str(vacancy.id)])
+        assert (recorded[-1]["users_overlapping"], recorded[-1]["users_pushed"]) == (1, 1)
+
+        db.expire_all()
+        pushed = {match.vacancy_id: match.score for match in db.query(Match).filter(Match.user_id == user.id)}
+        assert vacancy.id in pushed
+        assert len(pushed) == tasks.MATCH_LIMIT
+        assert db.query(Notification).filter(Notification.user_id == user.id).count() == notifications + 1
+        assert not db.query(Match).filter(Match.user_id == designer.id, Match.vacancy_id == vacancy.id).count()
+
+        tasks.compute_matches_for_all(force_full=True)
+        db.expire_all()
+        recomputed = db.query(Match).filter(Match.user_id == user.id).all()
+        assert sorted(match.score for match in recomputed) == sorted(pushed.values())
+    finally:
+        db.close()
+
+
+def test_preview_scores_cached_corpus_snapshot():
+    preview_cache.clear()
+    db = SessionLocal()
+    try:
+        user = _seed(db, 120)
+        assert refresh_token_stats(db)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        weights = load_token_weights(db)
+        expected = build_matches(profile, db.query(Vacancy).all(), weights=weights)
+        matcher = preview_cache.snapshot(db).matcher
+        ranked = matcher.top(extract_profile_features(profile, weights=weights), len(expected))
+        assert dict(ranked) == {match.vacancy_id: match.score for match in expected}
+
+        items = preview_matches(limit=10, db=db, current_user=user)
+        assert [item.score for item in items] == sorted((m.score for m in expected), reverse=True)[:10]
+        stats = preview_cache.stats()
+        assert (stats["misses"], stats["hits"], stats["corpus_size"]) == (1, 1, 120)
+
+        vacancy = Vacancy(
+            title="Backend Engineer",
+            description="python sql",
+            location="Berlin",
+            remote=True,
+            salary_max=90000,
+            source=VacancySource.manual,
+        )
+        db.add(vacancy)
+        index_vacancies(db, [vacancy])
+        db.commit()
+        # The previous snapshot is served while it rebuilds in the background.
+        items = preview_matches(limit=3, db=db, current_user=user)
+        assert vacancy.id not in {item.vacancy_id for item in items}
+        preview_cache.wait()
+        items = preview_matches(limit=3, db=db, current_user=user)
+        assert items[0].vacancy_id == vacancy.id
+        stats = preview_cache.stats()
+        assert (stats["misses"], stats["stale"], stats["rebuilds"], stats["corpus_size"]) == (1, 1, 1, 121)
+        assert stats["latency_p95_ms"] is not None
+    finally:
+        preview_cache.clear()
+        db.close()
+
+
+def _recounted_frequencies(db) -> dict:
+    return dict(db.query(VacancyToken.token, func.count()).group_by(VacancyToken.token))
+
+
+def _live_frequencies(db) -> dict:
+    return dict(
+        db.query(VacancyTokenStat.token, VacancyTokenStat.document_frequency).filter(
+            VacancyTokenStat.document_frequency > 0
+        )
+    )
+
+
+def test_token_stats_follow_index_writes():
+    db = SessionLocal()
+    try:
+        _seed(db, 60)
+        assert _live_frequencies(db) == _recounted_frequencies(db)
+        assert db.get(CorpusState, 1).document_count == 60
+
+        vacancies = db.query(Vacancy).order_by(Vacancy.id).all()
+        vacancies[0].description = "rust terraform rust"
+        index_vacancies(db, vacancies[:5])
+        remove_from_index(db, [vacancy.id for vacancy in vacancies[5:10]])
+        db.commit()
+        assert _live_frequencies(db) == _recounted_frequencies(db)
+        db.expire_all()
+        assert db.get(CorpusState, 1).document_count == 55
+
+        reindex_all(db)
+        assert _live_frequencies(db) == _recounted_frequencies(db)
+        db.expire_all()
+        assert db.get(CorpusState, 1).document_count == 60
+    finally:
+        db.close()
+
+
+def test_index_writes_shared_stats_once_at_the_end():
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        _seed(db, BATCH_SIZE * 2 + 10)
+        shared = [
+            index
+            for index, statement in enumerate(statements)
+            if "vacancy_token_stats" in statement or statement.lstrip().startswith("UPDATE corpus_state")
+        ]
+        # Concurrent ingestion writers lock these rows last and only once, so they cannot deadlock.
+        assert sum("vacancy_token_stats" in statements[index] for index in shared) == 1
+        writes = [index for index, statement in enumerate(statements) if "vacancy_lsh_buckets" in statement]
+        assert min(shared) > max(writes)
+        assert _live_frequencies(db) == _recounted_frequencies(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+        db.close()
+
+
+def test_token_weights_favour_rare_tokens():
+    weights = TokenWeights(version=1, document_count=100, frequencies={"pytho": 90, "golang": 2})
+    assert weights.weight("golang") > weights.weight("pytho")
+    assert weights.weight("unseen") == 2.0
+    assert all((weights.weight(token) * 8).is_integer() for token in ("pytho", "golang", "unseen"))
+    assert TokenWeights().weight("pytho") == 1.0
+
+
+def test_active_saved_filters_prefilter_candidates_in_sql(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        user = _seed(db, 200)
+        db.add(SavedFilter(user_id=user.id, name="Remote", remote=True, is_active=True))
+        db.add(SavedFilter(user_id=user.id, name="Munich", location="munich"))
+        db.commit()
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        eligible = [
+            vacancy
+            for vacancy in db.query(Vacancy).filter(Vacancy.remote.is_(True))
+            if not vacancy.salary_max or vacancy.salary_max >= 60000
+        ]
+
+        tasks.compute_matches_for_all()
+
+        expected = sorted(
+            build_matches(profile, eligible, weights=load_token_weights(db)), key=lambda m: m.score, reverse=True
+        )[: tasks.MATCH_LIMIT]
+
+        stored = db.query(Match).filter(Match.user_id == user.id).order_by(Match.score.desc()).all()
+        assert [match.score for match in stored] == [match.score for match in expected]
+        assert {match.vacancy_id for match in stored} <= {vacancy.id for vacancy in eligible}
+        assert recorded[-1]["users_prefiltered"] == 1
+        assert 0 < recorded[-1]["prefilter_candidates"] <= len(eligible) < 200
+
+        items = preview_matches(limit=10, db=db, current_user=user)
+        assert [item.score for item in items] == [match.score for match in expected[:10]]
+        assert {item.vacancy_id for item in items} <= {vacancy.id for vacancy in eligible}
+    finally:
+        db.close()
+
+
+def test_matching_daemon_ranks_prefiltered_users_among_eligible_vacancies(monkeypatch):
+    recorded = []
+    daemon = None
+    redis_conn = FakeRedis(on_wait=lambda name: name.startswith("matching:replies:") and daemon.serve_one())
+    monkeypatch.setattr(tasks.Redis, "from_url", staticmethod(lambda _url: redis_conn))
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        user = _seed(db, 200)
+        db.add(SavedFilter(user_id=user.id, name="Remote", remote=True, is_active=True))
+        db.commit()
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        eligible = [
+            vacancy
+            for vacancy in db.query(Vacancy).filter(Vacancy.remote.is_(True))
+            if not vacancy.salary_max or vacancy.salary_max >= 60000
+        ]
+        daemon = MatchingDaemon(redis_conn)
+        daemon.load()
+        redis_conn.set(HEARTBEAT_KEY, datetime.now(timezone.utc).isoformat())
+        monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", True)
+
+        tasks.compute_matches_for_all()
+
+        expected = sorted(
+            build_matches(profile, eligible, weights=load_token_weights(db)), key=lambda m: m.score, reverse=True
+        )[: tasks.MATCH_LIMIT]
+        stored = db.query(Match).filter(Match.user_id == user.id).order_by(Match.score.desc()).all()
+        assert recorded[-1]["ranked_by"] == "daemon" and recorded[-1]["users_prefiltered"] == 1
+        assert [match.score for match in stored] == [match.score for match in expected]
+        assert {match.vacancy_id for match in stored} <= {vacancy.id for vacancy in eligible}
+    finally:
+        db.close()
+
+
+def test_publish_token_stats_locks_tokens_in_sorted_batches(monkeypatch):
+    monkeypatch.setattr(corpus_stats, "TOKEN_BATCH_SIZE", 7)
+    batches = []
+    locked_batches = corpus_stats._locked_token_batches
+
+    def recorded(db):
+        for tokens in locked_batches(db):
+            batches.append(tokens)
+            yield tokens
+
+    monkeypatch.setattr(corpus_stats, "_locked_token_batches", recorded)
+    db = SessionLocal()
+    try:
+        _seed(db, 30)
+        db.add(VacancyTokenStat(token="zz-retired", document_frequency=0, snapshot_frequency=3))
+        db.commit()
+        tokens = [token for (token,) in db.query(VacancyTokenStat.token).order_by(VacancyTokenStat.token)]
+
+        assert publish_token_stats(db) == 1
+        db.commit()
+
+        assert [token for batch in batches for token in batch] == tokens
+        assert len(batches) > 1 and all(len(batch) <= 7 for batch in batches)
+        stats = db.query(VacancyTokenStat).all()
+        assert "zz-retired" not in {stat.token for stat in stats}
+        assert all(stat.snapshot_frequency == stat.document_frequency > 0 for stat in stats)
+    finally:
+        db.close()
+
+
+def test_weighted_batch_matcher_matches_score_vacancy():
+    db = SessionLocal()
+    try:
+        _seed(db, 120)
+        publish_token_stats(db)
+        db.commit()
+        weights = load_token_weights(db)
+        assert weights.version == 1 and weights.document_count == 120
+        vacancies = db.query(Vacancy).all()
+        profiles = [
+            db.query(Profile).first(),
+            Profile(desired_roles=["Product Manager"], skills=["Figma", "roadmap", "team"], languages={"de": "B2"}),
+        ]
+        matcher = BatchMatcher(
+            [(index, extract_profile_features(profile, weights=weights)) for index, profile in enumerate(profiles)],
+            limit=len(vacancies),
+        )
+        matcher.feed(vacancies)
+        for index, ranked in matcher.results().items():
+            features = extract_profile_features(profiles[index], weights=weights)
+            expected = {
+                vacancy.id: score_vacancy(profiles[index], vacancy, weights=weights)[0]
+                for vacancy in vacancies
+                if within_salary_floor(features, vacancy)
+            }
+            assert dict(ranked) == expected
+    finally:
+        db.close()
+
+
+def test_published_stats_force_full_recompute(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        _seed(db, 100)
+        tasks.compute_matches_for_all()
+        assert recorded[-1]["stats_version"] == 1
+
+        extra = [Vacancy(title="Backend Engineer", description="python", source=VacancySource.manual) for _ in range(5)]
+        db.add_all(extra)
+        index_vacancies(db, extra)
+        db.commit()
+        tasks.compute_matches_for_all()
+        assert (recorded[-1]["stats_version"], recorded[-1]["users_full"]) == (1, 0)
+
+        extra = [Vacancy(title="Data Analyst", description="sql", source=VacancySource.manual) for _ in range(20)]
+        db.add_all(extra)
+        index_vacancies(db, extra)
+        db.commit()
+        tasks.compute_matches_for_all()
+        assert (recorded[-1]["stats_version"], recorded[-1]["users_full"]) == (2, 1)
+    finally:
+        db.close()
+
+
+POSTING = (
+    "We are looking for a backend engineer to design and operate our payment services. "
+    "You will build APIs in Python and Go, own PostgreSQL schemas, run services on Kubernetes "
+    "and work closely with product and data teams on fraud detection and reporting."
+)
+
+
+def test_near_duplicate_postings_collapse_to_one_canonical():
+    db = SessionLocal()
+    try:
+        original = Vacancy(title="Backend Engineer", company="Acme", description=POSTING, source=VacancySource.rss)
+        db.add(original)
+        index_vacancies(db, [original])
+        db.commit()
+        reposts = [
+            Vacancy(
+                title="Backend Engineer (m/f/d)",
+                company="ACME ",
+                description=POSTING + " Apply online.",
+                source=VacancySource.html,
+            ),
+            Vacancy(title="Backend Engineer", company="Acme", description=POSTING, source=VacancySource.csv),
+        ]
+        other_company = Vacancy(title="Backend Engineer", company="Globex", description=POSTING)
+        no_company = Vacancy(title="Backend Engineer", company=None, description=POSTING)
+        short = [Vacancy(title="Backend Engineer", company="Acme", description="Python") for _ in range(2)]
+        db.add_all(reposts + [other_company, no_company] + short)
+        index_vacancies(db, reposts + [other_company, no_company] + short)
+        db.commit()
+
+        assert [vacancy.canonical_id for vacancy in reposts] == [original.id, original.id]
+        assert (other_company.canonical_id, no_company.canonical_id) == (None, None)
+        assert [vacancy.canonical_id for vacancy in short] == [None, None]
+        canonical = {record.id for record in stream_vacancies(vacancy_records(db))}
+        assert canonical == {original.id, other_company.id, no_company.id} | {vacancy.id for vacancy in short}
+
+        remove_from_index(db, [original.id])
+        db.query(Vacancy).filter(Vacancy.id == original.id).delete(synchronize_session=False)
+        db.commit()
+        db.expire_all()
+        promoted, follower = sorted(reposts, key=lambda vacancy: (vacancy.created_at, vacancy.id))
+        assert promoted.canonical_id is None
+        assert follower.canonical_id == promoted.id
+    finally:
+        db.close()
+
+
+def test_same_text_for_distinct_openings_stays_separate():
+    db = SessionLocal()
+    try:
+        def posting(**fields) -> Vacancy:
+            values = {"title": "Backend Engineer", "company": "Acme", "description": POSTING, "location": "Berlin"}
+            return Vacancy(**{**values, **fields})
+
+        original = posting(salary_min=60000, salary_max=60000)
+        db.add(original)
+        index_vacancies(db, [original])
+        db.commit()
+        openings = [
+            posting(location=None, remote=True, salary_min=90000, salary_max=90000),
+            posting(location="Munich", salary_min=60000, salary_max=60000),
+            posting(salary_min=90000, salary_max=95000),
+        ]
+        repost = posting(location=" berlin", salary_min=55000, salary_max=65000)
+        db.add_all(openings + [repost])
+        index_vacancies(db, openings + [repost])
+        db.commit()
+        assert [vacancy.canonical_id for vacancy in openings] == [None, None, None]
+        assert repost.canonical_id == original.id
+
+        # Moving the canonical posting to another city releases its repost.
+        original.location = "Hamburg"
+        index_vacancies(db, [original])
+        db.commit()
+        db.expire_all()
+        assert repost.canonical_id is None
+        canonical = {record.id for record in stream_vacancies(vacancy_records(db))}
+        assert canonical == {original.id, repost.id} | {vacancy.id for vacancy in openings}
+    finally:
+        db.close()
+
+
+def test_rewritten_canonical_releases_its_duplicates():
+    db = SessionLocal()
+    try:
+        original = Vacancy(title="Backend Engineer", company="Acme", description=POSTING, source=VacancySource.rss)
+        db.add(original)
+        index_vacancies(db, [original])
+        db.commit()
+        reposts = [
+            Vacancy(title="Backend Engineer", company="Acme", description=POSTING, source=VacancySource.html)
+            for _ in range(2)
+        ]
+        db.add_all(reposts)
+        index_vacancies(db, reposts)
+        db.commit()
+        assert [vacancy.canonical_id for vacancy in reposts] == [original.id, original.id]
+
+        index_vacancies(db, [original])
+        db.commit()
+        assert [vacancy.canonical_id for vacancy in reposts] == [original.id, original.id]
+
+        original.title = "Chef"
+        original.description = "Cook seasonal dishes for our restaurant kitchen team in the city centre every evening."
+        index_vacancies(db, [original])
+        db.commit()
+        db.expire_all()
+        first, second = sorted(reposts, key=lambda vacancy: (vacancy.created_at, vacancy.id))
+        assert (first.canonical_id, second.canonical_id) == (None, first.id)
+        canonical = {record.id for record in stream_vacancies(vacancy_records(db))}
+        assert canonical == {original.id, first.id}
+    finally:
+        db.close()
+
+
+def test_minhash_similarity_tracks_jaccard():
+    words = POSTING.split()
+    left = {" ".join(words[i : i + 3]) for i in range(len(words) - 2)}
+    right = set(list(left)[: int(len(left) * 0.9)]) | {"extra shingle one", "extra shingle two"}
+    jaccard = len(left & right) / len(left | right)
+    assert abs(similarity(minhash(left), minhash(right)) - jaccard) < 0.15
+    assert minhash({"too few"}) is None
+
+
+def test_match_detail_artifacts_are_stored(monkeypatch):
+    db = SessionLocal()
+    try:
+        user = _seed(db, 30)
+        tasks.compute_matches(str(user.id))
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        match = db.query(Match).filter(Match.user_id == user.id).first()
+        expected = build_match_detail(profile, match.vacancy, Match())
+
+        def fail(*_args, **_kwargs):
+            raise AssertionError("detail was rescored")
+
+        monkeypatch.setattr(matching, "score_vacancy", fail)
+        assert build_match_detail(profile, match.vacancy, match) == expected
+        assert match.tokens and match.skill_gap_plan is not None
+    finally:
+        db.close()
+
+
+class FakeRedis:
+    def __init__(self, on_wait=None):
+        self.hashes: dict[str, dict] = {}
+        self.on_wait = on_wait
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        values = self.hashes.setdefault(name, {})
+        values.update(mapping or {key: value})
+
+    def hget(self, name, key):
+        value = self.hashes.get(name, {}).get(key)
+        return None if value is None else str(value)
+
+    def hgetall(self, name):
+        return {key: str(value) for key, value in self.hashes.get(name, {}).items()}
+
+    def hlen(self, name):
+        return len(self.hashes.get(name, {}))
+
+    def hsetnx(self, name, key, value):
+        values = self.hashes.setdefault(name, {})
+        if key in values:
+            return False
+        values[key] = value
+        return True
+
+    def expire(self, name, seconds):
+        return True
+
+    def set(self, name, value):
+        self.hashes[name] = value
+
+    def get(self, name):
+        return self.hashes.get(name)
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        stream = self.hashes.setdefault(name, [])
+        message_id = f"{len(stream) + 1}-0".encode()
+        stream.append((message_id, {key.encode(): value.encode() for key, value in fields.items()}))
+        return message_id
+
+    def xrevrange(self, name, count=None):
+        return list(reversed(self.hashes.get(name, [])))[:count]
+
+    def xread(self, streams, count=None, block=None):
+        entries = []
+        for name, last_id in streams.items():
+            last = int(last_id.split("-")[0])
+            messages = [message for message in self.hashes.get(name, []) if int(message[0].split(b"-")[0]) > last]
+            if messages:
+                entries.append((name.encode(), messages[:count]))
+        return entries
+
+    def rpush(self, name, value):
+        self.hashes.setdefault(name, []).append(value)
+
+    def blpop(self, names, timeout=0):
+        for name in names:
+            if not self.hashes.get(name) and self.on_wait:
+                self.on_wait(name)
+            if self.hashes.get(name):
+                return name.encode(), self.hashes[name].pop(0)
+        return None
+
+
+class FakePipeline:
+    def __init__(self, redis_conn):
+        self.redis_conn = redis_conn
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis_conn, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class RetryingQueue:
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+    def enqueue(self, func, *args, retry=None, **kwargs):
+        self.jobs.append((args, kwargs))
+        if isinstance(func, str):
+            func = import_attribute(func)
+        try:
+            func(*args, **kwargs)
+        except RuntimeError:
+            func(*args, **kwargs)
+
+
+def test_coordinated_recompute_tracks_chunks(monkeypatch):
+    redis_conn = FakeRedis()
+    jobs = []
+    recorded = []
+    monkeypatch.setattr(tasks.Redis, "from_url", staticmethod(lambda _url: redis_conn))
+    monkeypatch.setattr(tasks, "Queue", lambda *args, **kwargs: RetryingQueue(jobs))
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    monkeypatch.setattr(tasks.settings, "matching_chunk_size", 2)
+    recompute_users = tasks._recompute_users
+    failures = []
+
+    def flaky(db, users, force_full):
+        if len(failures) == 0 and len(users) == 1:
+            failures.append(users[0].id)
+            raise RuntimeError("chunk failed")
+        return recompute_users(db, users, force_full)
+
+    monkeypatch.setattr(tasks, "_recompute_users", flaky)
+    db = SessionLocal()
+    try:
+        _seed(db, 40)
+        for index in range(2):
+            user = User(email=f"user{index}@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            db.add(Profile(user_id=user.id, desired_roles=["Data Analyst"], skills=["SQL"]))
+        db.commit()
+
+        run_id = tasks.coordinate_match_recompute()
+
+        assert len(jobs) == 2
+        assert failures
+        assert len(recorded) == 1
+        summary = recorded[0]
+        assert summary["run_id"] == run_id
+        assert (summary["chunks_total"], summary["chunks_done"]) == (2, 2)
+        assert (summary["users_total"], summary["users_full"]) == (3, 3)
+        assert summary["wall_seconds"] >= 0
+        assert summary["corpus_loads"] == 2 and summary["corpus_load_seconds"] > 0
+        assert all(user.last_matching_run_at for user in db.query(User).all())
+    finally:
+        db.close()
+
+
+def test_retried_coordinator_resumes_its_run(monkeypatch):
+    redis_conn = FakeRedis()
+    jobs = []
+    recorded = []
+    monkeypatch.setattr(tasks.Redis, "from_url", staticmethod(lambda _url: redis_conn))
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    monkeypatch.setattr(tasks, "get_current_job", lambda: SimpleNamespace(id="coordinator-job"))
+    monkeypatch.setattr(tasks.settings, "matching_chunk_size", 1)
+
+    class FailingQueue(RetryingQueue):
+        def enqueue(self, func, *args, **kwargs):
+            if len(self.jobs) == 1:
+                raise RedisError("connection reset")
+            super().enqueue(func, *args, **kwargs)
+
+    db = SessionLocal()
+    try:
+        _seed(db, 20)
+        for index in range(2):
+            db.add(User(email=f"user{index}@example.com", hashed_password="x"))
+        db.commit()
+
+        monkeypatch.setattr(tasks, "Queue", lambda *args, **kwargs: FailingQueue(jobs))
+        with pytest.raises(RedisError):
+            tasks.coordinate_match_recompute()
+        monkeypatch.setattr(tasks, "Queue", lambda *args, **kwargs: RetryingQueue(jobs))
+        assert tasks.coordinate_match_recompute() == "coordinator-job"
+
+        assert [args[1] for args, _kwargs in jobs] == [0, 1, 2]
+        assert len(recorded) == 1
+        assert (recorded[0]["run_id"], recorded[0]["chunks_done"], recorded[0]["users_total"]) == (
+            "coordinator-job",
+            3,
+            3,
+        )
+    finally:
+        db.close()
+
+
+def test_streamed_matching_memory_is_flat(monkeypatch):
+    rng = random.Random(11)
+    filler = " ".join(["responsibilities include building and operating services"] * 3)
+    db = SessionLocal()
+    try:
+        for _ in range(10):
+            db.execute(
+                insert(Vacancy),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "title": rng.choice(TITLES),
+                        "location": rng.choice(LOCATIONS),
+                        "remote": rng.random() < 0.3,
+                        "salary_max": rng.choice([None, 50000, 90000]),
+                        "description": f"{' '.join(rng.sample(WORDS, 4))} {filler}",
+                        "source": VacancySource.manual,
+                    }
+                    for _ in range(10_000)
+                ],
+            )
+        db.commit()
+
+        live = []
+
+        def watched(profile, vacancies, limit=None, weights=None):
+            def rows():
+                for vacancy in vacancies:
+                    live.append(len(db.identity_map))
+                    yield vacancy
+
+            return build_matches(profile, rows(), limit=limit, weights=weights)
+
+        monkeypatch.setattr(tasks, "build_matches", watched)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        matches, scored = tasks._top_matches(db, None, TokenWeights())
+        rss_growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+        assert len(live) == scored == 100_000 and len(matches) == tasks.MATCH_LIMIT
+        assert max(live) <= 2 * BATCH_SIZE
+        # Materializing all rows takes well over 150 MB with these descriptions.
+        assert rss_growth_kb < 64 * 1024
+    finally:
+        db.close()
+
+
+def test_recompute_ranks_with_matching_daemon(monkeypatch):
+    recorded = []
+    daemon = None
+    redis_conn = FakeRedis(on_wait=lambda name: name.startswith("matching:replies:") and daemon.serve_one())
+    monkeypatch.setattr(tasks.Redis, "from_url", staticmethod(lambda _url: redis_conn))
+    monkeypatch.setattr(tasks, "record_job_stats", lambda name, stats: recorded.append(stats))
+    db = SessionLocal()
+    try:
+        user = _seed(db, 120)
+        tasks.compute_matches_for_all()
+        assert recorded[-1]["ranked_by"] == "pool"
+        daemon = MatchingDaemon(redis_conn)
+        daemon.load()
+        redis_conn.set(HEARTBEAT_KEY, datetime.now(timezone.utc).isoformat())
+        monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", True)
+
+        vacancy = Vacancy(
+            title="Backend Engineer",
+            description="python sql",
+            location="Berlin",
+            remote=True,
+            salary_max=90000,
+            source=VacancySource.manual,
+        )
+        db.add(vacancy)
+        generation = index_vacancies(db, [vacancy]).generation
+        db.commit()
+        publish_deltas(VACANCIES, [vacancy.id], generation=generation)
+        profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+        profile.skills = ["Python", "SQL", "Kubernetes"]
+        profile.version += 1
+        db.commit()
+        publish_deltas(PROFILES, [user.id])
+
+        tasks.compute_matches_for_all(force_full=True)
+        assert recorded[-1]["ranked_by"] == "daemon"
+        assert daemon.stats["requests_served"] == 1 and daemon.stats["deltas_applied"] == 2
+        assert daemon.stats["reloads"] == 0 and daemon.generation == generation
+        db.expire_all()
+        from_daemon = {m.vacancy_id: m.score for m in db.query(Match).filter(Match.user_id == user.id)}
+        assert vacancy.id in from_daemon
+
+        monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", False)
+        tasks.compute_matches_for_all(force_full=True)
+        assert recorded[-1]["ranked_by"] == "pool"
+        db.expire_all()
+        from_pool = {m.vacancy_id: m.score for m in db.query(Match).filter(Match.user_id == user.id)}
+        assert sorted(from_pool.values()) == sorted(from_daemon.values())
+    finally:
+        db.close()
+
+
+def test_matching_daemon_reloads_when_it_missed_a_generation(monkeypatch):
+    redis_conn = FakeRedis()
+    monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", True)
+    db = SessionLocal()
+    try:
+        user = _seed(db, 20)
+        daemon = MatchingDaemon(redis_conn)
+        daemon.load()
+        # Written without publishing a delta, like a dropped XADD.
+        vacancy = Vacancy(title="Python Engineer", description="python sql", source=VacancySource.manual)
+        db.add(vacancy)
+        generation = index_vacancies(db, [vacancy]).generation
+        db.commit()
+        stats_version = load_token_weights(db).version
+
+        request = {"users": [[str(user.id), 0]], "limit": 50, "stats_version": stats_version}
+        daemon.handle({**request, "generation": generation - 1})
+        assert daemon.stats["reloads"] == 0
+        ranked = daemon.handle({**request, "generation": generation})
+        assert daemon.stats["reloads"] == 1 and daemon.generation == generation
+        assert str(vacancy.id) in {vacancy_id for vacancy_id, _score in ranked[str(user.id)]}
+    finally:
+        db.close()
+
+
+def test_matching_daemon_follows_duplicates_that_become_canonical(monkeypatch):
+    redis_conn = FakeRedis()
+    monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", True)
+    db = SessionLocal()
+    try:
+        original, repost, copy = [
+            Vacancy(title="Backend Engineer", company="Acme", description=POSTING, source=VacancySource.manual)
+            for _ in range(3)
+        ]
+        for vacancy in (original, repost, copy):
+            db.add(vacancy)
+            index_vacancies(db, [vacancy])
+            db.commit()
+        daemon = MatchingDaemon(redis_conn)
+        daemon.load()
+        assert set(daemon._overlay) | {vacancy.id for vacancy in daemon._base.vacancies} == {original.id}
+
+        # Rewriting the canonical posting detaches its duplicates; the older one becomes canonical.
+        repost, copy = sorted((repost, copy), key=lambda vacancy: (vacancy.created_at, vacancy.id))
+        original.description = "Cook seasonal dishes for our restaurant kitchen team in the city centre every evening."
+        change = index_vacancies(db, [original])
+        db.commit()
+        assert set(change.vacancy_ids) == {original.id, repost.id, copy.id}
+        publish_deltas(VACANCIES, change.vacancy_ids, redis_conn, change.generation)
+        daemon.drain_deltas()
+        assert set(daemon._overlay) == {original.id, repost.id}
+
+        # Deleting it promotes the remaining copy.
+        repost_id = repost.id
+        change = remove_from_index(db, [repost_id])
+        db.query(Vacancy).filter(Vacancy.id == repost_id).delete(synchronize_session=False)
+        db.commit()
+        assert set(change.vacancy_ids) == {repost_id, copy.id}
+        publish_deltas(VACANCIES, change.vacancy_ids, redis_conn, change.generation)
+        daemon.drain_deltas()
+        assert set(daemon._overlay) == {original.id, copy.id}
+        assert daemon.generation == change.generation
+    finally:
+        db.close()
+
+
+def test_matching_daemon_survives_bad_requests_and_errors(monkeypatch):
+    redis_conn = FakeRedis()
+    daemon = MatchingDaemon(redis_conn)
+    redis_conn.rpush(REQUEST_QUEUE, "not json")
+    assert daemon.serve_one() and daemon.stats["requests_failed"] == 1
+
+    monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", True)
+    redis_conn.set(HEARTBEAT_KEY, datetime.now(timezone.utc).isoformat())
+    redis_conn.on_wait = lambda name: name.startswith("matching:replies:") and daemon.serve_one()
+    # The daemon answers with a null reply, so the caller falls back without waiting.
+    assert request_rankings([("not-a-user-id", 1)], 10, 0, 0, redis_conn) is None
+    assert daemon.stats["requests_failed"] == 2
+
+    stop_event = threading.Event()
+    calls = []
+
+    def flaky_apply_deltas(*_args):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RedisError("connection reset")
+        stop_event.set()
+        return 0
+
+    monkeypatch.setattr(daemon, "load", lambda: None)
+    monkeypatch.setattr(daemon, "apply_deltas", flaky_apply_deltas)
+    monkeypatch.setattr(matching_daemon, "record_job_stats", lambda name, stats: None)
+    monkeypatch.setattr(matching_daemon, "ERROR_BACKOFF_SECONDS", 0)
+    daemon.run(stop_event)
+    assert (len(calls), daemon.stats["errors"]) == (2, 1)
+
+
+def test_request_rankings_skips_a_daemon_without_a_fresh_heartbeat(monkeypatch):
+    redis_conn = FakeRedis()
+    monkeypatch.setattr(tasks.settings, "matching_daemon_enabled", True)
+    assert request_rankings([("user", 1)], 10, 0, 0, redis_conn) is None
+    stale = datetime.now(timezone.utc) - timedelta(minutes=5)
+    redis_conn.set(HEARTBEAT_KEY, stale.isoformat())
+    assert request_rankings([("user", 1)], 10, 0, 0, redis_conn) is None
+    assert not redis_conn.hashes.get(REQUEST_QUEUE)
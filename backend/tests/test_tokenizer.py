@@ -0,0 +1,54 @@
+from app.services.tokenizer import STOPWORDS, stem, tokenize, tokenize_many
+
+
+def test_tokenize_english():
+    assert tokenize("The Senior Python developer, working with C++ and C# on CI-CD pipelines") == [
+        "senior",
+        "pytho",
+        "develop",
+        "work",
+        "c++",
+        "c#",
+        "ci-cd",
+        "pipelin",
+    ]
+
+
+def test_tokenize_german():
+    assert tokenize("Wir suchen einen Entwickler für die Datenplattform in München", "de") == [
+        "such",
+        "ein",
+        "entwickl",
+        "datenplattform",
+        "münch",
+    ]
+
+
+def test_tokenize_russian():
+    assert tokenize("Опыт разработки на Python и знание SQL для аналитиков", "RU") == [
+        "опыт",
+        "разработки",
+        "pytho",
+        "знание",
+        "sql",
+        "аналитик",
+    ]
+
+
+def test_unknown_locale_uses_english_stopwords():
+    assert tokenize("the data and the team", "fr") == tokenize("the data and the team") == ["data", "team"]
+    assert all(isinstance(words, frozenset) for words in STOPWORDS.values())
+
+
+def test_tokenize_many_matches_tokenize():
+    texts = ["Backend Engineer (Python, SQL)", "", "Werkstudent im Vertrieb", "Инженер данных"]
+    for locale in (None, "de", "ru"):
+        assert tokenize_many(texts, locale) == [tokenize(text, locale) for text in texts]
+
+
+def test_stem_is_memoized():
+    stem.cache_clear()
+    stem("engineering")
+    stem("engineering")
+    info = stem.cache_info()
+    assert (info.hits, info.misses) == (1, 1)